@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from classes.indice_hamming import faixas_de_bits
+
+
+# Abaixo disto os pares calculam-se no próprio processo (arrancar o pool custa mais do que poupa)
+MINIMO_PARA_POOL = 4096
+
+
+class ModoAgrupamento(str, Enum):
+    """Como os pHash próximos viram grupos de quase-duplicados."""
+    GULOSO = "guloso"            # cada foto entra no 1.º grupo cujo representante está perto (depende da ordem)
+    COMPONENTES = "componentes"  # componentes ligadas de "distância <= t" (A~B, B~C => {A, B, C}); não depende da ordem
+
+
+class UniaoDisjunta:
+    """
+    Union-find sobre 0..n-1 (compressão de caminho por halving + união pelo menor índice).
+
+    A raiz de cada conjunto é sempre o seu menor elemento: o resultado não depende da ordem
+    em que as uniões são feitas (fragmentos processados em qualquer ordem dão o mesmo).
+    """
+
+    def __init__(self, n: int) -> None:
+        self._pai = list(range(n))
+
+    def encontrar(self, i: int) -> int:
+        pai = self._pai
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    def unir(self, a: int, b: int) -> None:
+        ra, rb = self.encontrar(a), self.encontrar(b)
+        if ra == rb:
+            return
+        if rb < ra:
+            ra, rb = rb, ra
+        self._pai[rb] = ra
+
+    def unir_pares(self, pares: Iterable[Tuple[int, int]]) -> None:
+        for a, b in pares:
+            self.unir(a, b)
+
+    def componentes(self) -> List[List[int]]:
+        """Conjuntos (cada um por ordem crescente), ordenados pelo menor elemento; inclui os isolados."""
+        por_raiz: Dict[int, List[int]] = {}
+        for i in range(len(self._pai)):
+            por_raiz.setdefault(self.encontrar(i), []).append(i)
+        return list(por_raiz.values())
+
+
+def fragmentar(valores: Sequence[int], distancia_maxima: int, bits: int = 64) -> List[List[Tuple[int, int]]]:
+    """
+    Parte os hashes em fragmentos independentes: um por (faixa, valor da faixa) com 2+ hashes.
+
+    Como no IndiceHamming, dois hashes a distância <= t coincidem numa das t+1 faixas, logo
+    todo o par próximo aparece junto em pelo menos um fragmento. Cada fragmento é uma lista
+    de (índice global, hash) e pode ser processado noutro processo (pares_do_fragmento).
+    """
+    if distancia_maxima < 0:
+        return []
+    if distancia_maxima >= bits:
+        # tudo está perto de tudo: um único fragmento
+        return [list(enumerate(valores))] if len(valores) > 1 else []
+    fragmentos: List[List[Tuple[int, int]]] = []
+    for deslocamento, mascara in faixas_de_bits(bits, distancia_maxima + 1):
+        baldes: Dict[int, List[Tuple[int, int]]] = {}
+        for i, v in enumerate(valores):
+            baldes.setdefault((v >> deslocamento) & mascara, []).append((i, v))
+        fragmentos.extend(balde for balde in baldes.values() if len(balde) > 1)
+    return fragmentos
+
+
+def pares_do_fragmento(fragmento: Sequence[Tuple[int, int]], distancia_maxima: int) -> List[Tuple[int, int]]:
+    """Pares (i, j) de índices globais, i < j, a distância <= distancia_maxima dentro do fragmento."""
+    pares = []
+    for a in range(len(fragmento)):
+        i, vi = fragmento[a]
+        for j, vj in fragmento[a + 1:]:
+            if (vi ^ vj).bit_count() <= distancia_maxima:
+                pares.append((i, j) if i < j else (j, i))
+    return pares
+
+
+def _pares_dos_fragmentos(fragmentos: List[List[Tuple[int, int]]], distancia_maxima: int) -> List[Tuple[int, int]]:
+    pares: List[Tuple[int, int]] = []
+    for fragmento in fragmentos:
+        pares.extend(pares_do_fragmento(fragmento, distancia_maxima))
+    return pares
+
+
+def agrupar_componentes(
+    valores: Sequence[int],
+    distancia_maxima: int,
+    bits: int = 64,
+    workers: int = 1,
+) -> List[List[int]]:
+    """
+    Componentes ligadas do grafo "distância de Hamming <= distancia_maxima" (índices em `valores`).
+
+    Fragmentos (fragmentar) -> pares de cada fragmento (num pool de `workers` processos se
+    workers != 1 e houver pelo menos MINIMO_PARA_POOL hashes; 0 = um por core) -> fusão numa
+    UniaoDisjunta. O resultado é o mesmo para qualquer nº de workers e qualquer ordem de fusão;
+    cada componente vem ordenada e as componentes vêm pelo menor índice (isolados incluídos).
+    """
+    uniao = UniaoDisjunta(len(valores))
+    fragmentos = fragmentar(valores, distancia_maxima, bits)
+    workers = (workers or os.cpu_count() or 1) if workers != 1 else 1
+    if workers == 1 or len(valores) < MINIMO_PARA_POOL or len(fragmentos) < 2:
+        uniao.unir_pares(_pares_dos_fragmentos(fragmentos, distancia_maxima))
+        return uniao.componentes()
+
+    # fragmentos distribuídos em lotes (um por worker, aproximadamente do mesmo tamanho)
+    lotes: List[List[List[Tuple[int, int]]]] = [[] for _ in range(workers)]
+    for i, fragmento in enumerate(sorted(fragmentos, key=len, reverse=True)):
+        lotes[i % workers].append(fragmento)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(_pares_dos_fragmentos, lote, distancia_maxima) for lote in lotes if lote]
+        for futuro in futuros:
+            uniao.unir_pares(futuro.result())
+    return uniao.componentes()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import stat
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image
+
+from classes.foto import Foto
+from classes.hash_visual import hash_visual_de_imagem
+from classes.leitor_exif import exif_de_bytes, exif_de_pillow
+from classes.motor_de_hash import LIMIAR_MMAP, mapear_ficheiro
+from classes.tipo_de_ficheiro import descrever_falha
+
+
+# Blocos grandes: menos chamadas Python por ficheiro (o hashlib liberta o GIL em updates grandes)
+TAMANHO_BLOCO = 1024 * 1024
+
+
+@dataclass
+class AnalisadorDeFotos:
+    """
+    Análise "uma leitura por ficheiro".
+
+    Lê os bytes do ficheiro UMA vez, calculando o hash à medida que lê, e entrega o mesmo
+    buffer em memória ao Pillow para dimensões, EXIF (data/GPS) e pHash.
+    Substitui: check de dimensões + extrair_metadados + calcular_hash + _calcular_phash,
+    que abriam o ficheiro 4 vezes.
+
+    Falhas do Pillow (ficheiro não-imagem, HEIC sem plugin, truncado) não impedem o hash:
+    a data cai para o mtime, como em Foto.extrair_metadados, e a falha fica registada na Foto
+    (as fases seguintes, ex.: pHash dos quase-duplicados, já não voltam a abrir o ficheiro).
+
+    Ficheiros com `limiar_mmap` bytes ou mais (None = nunca) não são copiados para memória:
+    são mapeados (mmap) e o mesmo mapeamento serve o hash e o Pillow.
+
+    calcular_phash=False deixa o pHash para a deteção de quase-duplicados, que só o calcula
+    para as fotos que não ficaram marcadas como duplicados exatos.
+
+    calcular_hash=False deixa o hash para a deteção de duplicados exatos, que o calcula por
+    níveis (tamanho -> início/fim -> completo): o ficheiro não é lido todo nem copiado para
+    memória, o Pillow lê do disco só o que precisa (cabeçalho/EXIF; a imagem só para o pHash).
+    O pipeline do main usa as duas opções: cada foto é lida por inteiro no máximo uma vez
+    (para o pHash, se não for duplicado exato), mais os níveis de hash se tiver o tamanho de outra.
+    """
+    algoritmo: str = "md5"
+    calcular_phash: bool = True
+    calcular_hash: bool = True
+    limiar_mmap: Optional[int] = LIMIAR_MMAP
+
+    def analisar(self, foto: Foto) -> None:
+        caminho = foto.caminho
+        st = foto.obter_stat()  # do scan, se já existir
+        if st is None or not stat.S_ISREG(st.st_mode):
+            return
+
+        if not self.calcular_hash:
+            with caminho.open("rb") as f:
+                self._analisar_imagem(foto, None, f)
+            return
+
+        # Ficheiros grandes: mmap, partilhado pelo hash (memoryview) e pelo Pillow (sem cópias)
+        if self.limiar_mmap is not None and st.st_size >= self.limiar_mmap:
+            with caminho.open("rb") as f:
+                mapa = mapear_ficheiro(f)
+                if mapa is not None:
+                    with mapa:
+                        hash_ = hashlib.new(self.algoritmo)
+                        with memoryview(mapa) as vista:
+                            hash_.update(vista)
+                        foto.definir_hash_conteudo(hash_.hexdigest())
+                        self._analisar_imagem(foto, mapa, mapa)
+                    return
+
+        # 1) leitura única + hash incremental: um bloco reaproveitado (readinto) copiado para um
+        #    único BytesIO já com o tamanho do ficheiro (uma cópia do conteúdo, sem join no fim)
+        hash_ = hashlib.new(self.algoritmo)
+        ficheiro = io.BytesIO()
+        if st.st_size:
+            ficheiro.seek(st.st_size - 1)
+            ficheiro.write(b"\0")
+            ficheiro.seek(0)
+        bloco = bytearray(max(1, min(TAMANHO_BLOCO, st.st_size)))
+        with caminho.open("rb") as f, memoryview(bloco) as vista:
+            while True:
+                n = f.readinto(bloco)
+                if not n:
+                    break
+                hash_.update(vista[:n])
+                ficheiro.write(vista[:n])
+        ficheiro.truncate()  # o ficheiro pode ter encolhido desde o stat
+        foto.definir_hash_conteudo(hash_.hexdigest())
+        del bloco
+
+        # 2) Pillow sobre o buffer em memória (sem voltar ao disco)
+        ficheiro.seek(0)
+        self._analisar_imagem(foto, ficheiro.getbuffer(), ficheiro)
+
+    def _analisar_imagem(self, foto: Foto, dados, ficheiro) -> None:
+        """
+        Dimensões, EXIF e pHash a partir do conteúdo já em memória (memoryview ou mmap) ou,
+        com dados=None, do ficheiro aberto (EXIF pelo Pillow).
+        """
+        if not foto.decodificavel:
+            foto.preencher_a_partir_do_exif({})  # sem EXIF => data do mtime
+            return
+
+        try:
+            with Image.open(ficheiro) as img:
+                foto.definir_dimensoes(img.size)
+                exif = exif_de_bytes(dados) if dados is not None else None
+                if exif is None:
+                    exif = exif_de_pillow(img.getexif())
+                foto.preencher_a_partir_do_exif(exif)
+                if self.calcular_phash:
+                    try:
+                        # JPEG grandes: descodificação já em escala reduzida (draft)
+                        foto.definir_hash_visual(hash_visual_de_imagem(img))
+                    except Exception as e:
+                        # EXIF/dimensões continuam válidos mesmo que a descodificação falhe
+                        foto.registar_falha_descodificacao(descrever_falha(e))
+        except Exception as e:
+            foto.registar_falha_descodificacao(descrever_falha(e))
+            foto.preencher_a_partir_do_exif({})
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import imagehash
+
+from classes.campos_foto import CAMPO_HASH, valor_conhecido
+from classes.foto import Foto
+
+
+NOME_CACHE = "metadados.sqlite3"
+VERSAO_CACHE = 2  # 2: coluna data = só a data do EXIF (antes: a data final, com nome/mtime)
+
+# Tamanho máximo (dados vivos) antes de despejar as entradas menos usadas
+TAMANHO_MAXIMO_CACHE = 512 * 1024 * 1024
+
+# Escritas agrupadas numa só transação (WAL + commit a cada N alterações)
+_COMMIT_A_CADA = 500
+
+_Chave = Tuple[int, int, int, int]  # (st_dev, st_ino, st_size, st_mtime_ns)
+
+
+def caminho_cache_por_defeito() -> Path:
+    """Pasta de cache do utilizador (XDG_CACHE_HOME / LOCALAPPDATA / ~/.cache)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    pasta = Path(base) if base else Path.home() / ".cache"
+    return pasta / "organizador_de_fotografias" / NOME_CACHE
+
+
+def _chave(st: os.stat_result) -> _Chave:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class CacheMetadados:
+    """
+    Cache persistente (SQLite em modo WAL) de EXIF + hashes, partilhada entre execuções
+    e entre pastas de origem diferentes.
+
+    - Chave: (st_dev, st_ino, st_size, st_mtime_ns) — o mesmo ficheiro físico, sem
+      alterações, mesmo que tenha mudado de nome/pasta. Qualquer edição muda a chave.
+    - Valores: data do EXIF (NULL = sem data no EXIF; nome/mtime são reaplicados ao reutilizar),
+      local_gps, hash_conteudo (+ algoritmo; NULL = não foi calculado), dimensões e pHash.
+      Linhas só com o pHash (guardar_phash) não têm algoritmo e não contam para reutilizar()
+    - Despejo por tamanho: acima de `tamanho_maximo` bytes saem as entradas usadas há mais tempo
+    - Thread-safe (uma ligação protegida por lock); processos worker não lhe tocam
+
+    Uma base de dados corrompida/de outra versão é recriada vazia.
+    """
+
+    def __init__(self, caminho: Path, tamanho_maximo: int = TAMANHO_MAXIMO_CACHE) -> None:
+        self._caminho = Path(caminho)
+        self._tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._acedidos: List[Tuple[int, int, int, int, int]] = []
+        self.acertos = 0
+        self.falhas = 0
+
+        self._caminho.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._ligacao = self._ligar()
+        except sqlite3.DatabaseError:
+            # ficheiro corrompido/não é SQLite: recomeça do zero
+            for sufixo in ("", "-wal", "-shm"):
+                Path(str(self._caminho) + sufixo).unlink(missing_ok=True)
+            self._ligacao = self._ligar()
+
+    @property
+    def caminho(self) -> Path:
+        return self._caminho
+
+    def _ligar(self) -> sqlite3.Connection:
+        ligacao = sqlite3.connect(self._caminho, check_same_thread=False)
+        ligacao.execute("PRAGMA journal_mode=WAL")
+        ligacao.execute("PRAGMA synchronous=NORMAL")
+        versao = ligacao.execute("PRAGMA user_version").fetchone()[0]
+        if versao != VERSAO_CACHE:
+            ligacao.execute("DROP TABLE IF EXISTS metadados")
+        ligacao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metadados (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                data TEXT,
+                lat REAL,
+                lon REAL,
+                algoritmo TEXT,
+                hash TEXT,
+                largura INTEGER,
+                altura INTEGER,
+                phash TEXT,
+                acedido INTEGER NOT NULL,
+                PRIMARY KEY (dev, ino, tamanho, mtime_ns)
+            ) WITHOUT ROWID
+            """
+        )
+        ligacao.execute("CREATE INDEX IF NOT EXISTS metadados_acedido ON metadados (acedido)")
+        ligacao.execute(f"PRAGMA user_version={VERSAO_CACHE}")
+        ligacao.commit()
+        return ligacao
+
+    # ------------------------
+    # API usada pelo construtor
+    # ------------------------
+
+    def reutilizar(self, foto: Foto, st: os.stat_result, algoritmo: str = "md5") -> bool:
+        """Se o ficheiro já foi analisado (mesmo algoritmo de hash), preenche a Foto."""
+        chave = _chave(st)
+        with self._lock:
+            linha = self._ligacao.execute(
+                "SELECT data, lat, lon, algoritmo, hash, largura, altura, phash FROM metadados "
+                "WHERE dev=? AND ino=? AND tamanho=? AND mtime_ns=?",
+                chave,
+            ).fetchone()
+            if linha is None or linha[3] != algoritmo:
+                self.falhas += 1
+                return False
+            self.acertos += 1
+            self._marcar_acedido(chave)
+
+        data, lat, lon, _algoritmo, hash_conteudo, largura, altura, phash = linha
+        foto.reaplicar_metadados(
+            datetime.fromisoformat(data) if data else None,
+            (lat, lon) if lat is not None and lon is not None else None,
+            hash_conteudo,
+        )
+        if largura is not None and altura is not None:
+            foto.definir_dimensoes((largura, altura))
+        if phash is not None:
+            foto.definir_hash_visual(imagehash.hex_to_hash(phash))
+        return True
+
+    def registar(self, foto: Foto, st: os.stat_result, algoritmo: str = "md5") -> None:
+        # sem forçar o hash: só existe se alguém o calculou (os níveis de DetetarDuplicados decidem)
+        hash_conteudo = valor_conhecido(foto, CAMPO_HASH)
+        lat, lon = foto.local_gps if foto.local_gps else (None, None)
+        largura, altura = foto.dimensoes if foto.dimensoes else (None, None)
+        data = foto.data_do_exif.isoformat() if foto.data_do_exif else None
+        phash = str(foto.hash_visual) if foto.hash_visual is not None else None
+        with self._lock:
+            self._ligacao.execute(
+                "INSERT INTO metadados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dev, ino, tamanho, mtime_ns) DO UPDATE SET "
+                "data=excluded.data, lat=excluded.lat, lon=excluded.lon, algoritmo=excluded.algoritmo, "
+                "hash=excluded.hash, largura=excluded.largura, altura=excluded.altura, "
+                "phash=COALESCE(excluded.phash, metadados.phash), acedido=excluded.acedido",
+                (*_chave(st), data, lat, lon, algoritmo, hash_conteudo, largura, altura, phash, _agora()),
+            )
+            self._depois_de_escrever()
+
+    # ------------------------
+    # API usada pelo DetetarDuplicados
+    # ------------------------
+
+    def obter_phash(self, st: os.stat_result) -> Optional[imagehash.ImageHash]:
+        chave = _chave(st)
+        with self._lock:
+            linha = self._ligacao.execute(
+                "SELECT phash FROM metadados WHERE dev=? AND ino=? AND tamanho=? AND mtime_ns=?",
+                chave,
+            ).fetchone()
+            if linha is None or linha[0] is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self._marcar_acedido(chave)
+        return imagehash.hex_to_hash(linha[0])
+
+    def guardar_phash(self, st: os.stat_result, phash: imagehash.ImageHash) -> None:
+        """Acrescenta o pHash (cria a entrada só com o pHash se ainda não existir)."""
+        with self._lock:
+            self._ligacao.execute(
+                "INSERT INTO metadados (dev, ino, tamanho, mtime_ns, phash, acedido) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dev, ino, tamanho, mtime_ns) DO UPDATE SET phash=excluded.phash",
+                (*_chave(st), str(phash), _agora()),
+            )
+            self._depois_de_escrever()
+
+    # ------------------------
+    # Manutenção
+    # ------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._ligacao.execute("SELECT COUNT(*) FROM metadados").fetchone()[0]
+
+    def tamanho_em_bytes(self) -> int:
+        """Bytes ocupados por dados vivos (páginas usadas, sem as livres)."""
+        with self._lock:
+            return self._tamanho_em_bytes()
+
+    def despejar(self) -> int:
+        """Remove as entradas menos usadas até ficar abaixo de 90% do máximo. Devolve quantas saíram."""
+        with self._lock:
+            self._gravar_acedidos()
+            return self._despejar()
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._gravar_acedidos()
+            self._despejar()
+            self._ligacao.commit()
+            self._ligacao.close()
+
+    # ------------------------
+    # Helpers (chamados com o lock)
+    # ------------------------
+
+    def _marcar_acedido(self, chave: _Chave) -> None:
+        # atualizado em lote (evita uma escrita por leitura)
+        self._acedidos.append((_agora(), *chave))
+        self._depois_de_escrever()
+
+    def _depois_de_escrever(self) -> None:
+        self._pendentes += 1
+        if self._pendentes >= _COMMIT_A_CADA:
+            self._gravar_acedidos()
+            self._ligacao.commit()
+            self._pendentes = 0
+
+    def _gravar_acedidos(self) -> None:
+        if self._acedidos:
+            self._ligacao.executemany(
+                "UPDATE metadados SET acedido=? WHERE dev=? AND ino=? AND tamanho=? AND mtime_ns=?",
+                self._acedidos,
+            )
+            self._acedidos.clear()
+
+    def _tamanho_em_bytes(self) -> int:
+        paginas = self._ligacao.execute("PRAGMA page_count").fetchone()[0]
+        livres = self._ligacao.execute("PRAGMA freelist_count").fetchone()[0]
+        tamanho_pagina = self._ligacao.execute("PRAGMA page_size").fetchone()[0]
+        return (paginas - livres) * tamanho_pagina
+
+    def _despejar(self) -> int:
+        self._ligacao.commit()  # page_count só reflete o que já foi escrito
+        removidas = 0
+        alvo = int(self._tamanho_maximo * 0.9)  # margem: não despejar em todas as execuções
+        # páginas meio vazias não são libertadas logo: repete até caber
+        for _ in range(10):
+            tamanho = self._tamanho_em_bytes()
+            if tamanho <= (alvo if removidas else self._tamanho_maximo):
+                break
+            total = self._ligacao.execute("SELECT COUNT(*) FROM metadados").fetchone()[0]
+            if not total:
+                break
+            a_remover = max(1, total - int(total * alvo / tamanho))
+            self._ligacao.execute(
+                "DELETE FROM metadados WHERE (dev, ino, tamanho, mtime_ns) IN ("
+                "SELECT dev, ino, tamanho, mtime_ns FROM metadados ORDER BY acedido LIMIT ?)",
+                (a_remover,),
+            )
+            self._ligacao.commit()
+            removidas += a_remover
+        return removidas
+
+
+def _agora() -> int:
+    return time.time_ns()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class ContadorStat:
+    """
+    Conta chamadas a stat feitas e evitadas (stat já guardado do scan/1.ª consulta).
+    Em NFS/SMB cada stat é uma ida e volta ao servidor: "poupadas" mostra o ganho.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.feitas = 0
+        self.poupadas = 0
+
+    def feita(self) -> None:
+        with self._lock:
+            self.feitas += 1
+
+    def poupada(self) -> None:
+        with self._lock:
+            self.poupadas += 1
+
+    def repor(self) -> None:
+        with self._lock:
+            self.feitas = 0
+            self.poupadas = 0
+
+
+# Contador partilhado pelo processo (scan, Foto, DetetarDuplicados, executor)
+CONTADOR_STAT = ContadorStat()
+
+
+def stat_caminho(caminho: Path) -> Optional[os.stat_result]:
+    """os.stat contado; None se o ficheiro não existir/não for acessível."""
+    CONTADOR_STAT.feita()
+    try:
+        return os.stat(caminho)
+    except OSError:
+        return None
+
+
+def stat_de_foto(foto) -> Optional[os.stat_result]:
+    """stat de qualquer objeto tipo Foto: usa o guardado se existir (Foto.obter_stat)."""
+    obter = getattr(foto, "obter_stat", None)
+    if obter is not None:
+        return obter()
+    return stat_caminho(foto.caminho)
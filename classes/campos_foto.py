@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import FrozenSet
+
+
+# Nomes dos campos de uma Foto que custam I/O a obter (usados por regras/detetores
+# para declarar o que precisam, e pelo construtor para só extrair isso)
+CAMPO_DATA = "data_de_captura"
+CAMPO_GPS = "local_gps"
+CAMPO_HASH = "hash_conteudo"
+CAMPO_PHASH = "hash_visual"
+CAMPO_DIMENSOES = "dimensoes"
+
+CAMPOS_EXIF: FrozenSet[str] = frozenset({CAMPO_DATA, CAMPO_GPS})
+
+
+def valor_conhecido(foto, campo: str):
+    """
+    Valor do campo SEM o calcular: numa Foto preguiçosa devolve None se ainda não foi
+    extraído. Outros objetos tipo Foto (ex.: LinhaFoto) devolvem o atributo normal.
+    """
+    metodo = getattr(foto, "valor_conhecido", None)
+    if metodo is not None:
+        return metodo(campo)
+    return getattr(foto, campo, None)
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Deque, FrozenSet, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import imagehash
+from PIL import Image
+
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.cache_metadados import CacheMetadados
+from classes.campos_foto import (
+    CAMPO_DATA,
+    CAMPO_DIMENSOES,
+    CAMPO_GPS,
+    CAMPO_HASH,
+    CAMPO_PHASH,
+    CAMPOS_EXIF,
+    valor_conhecido,
+)
+from classes.data_do_nome import DataPeloNome
+from classes.foto import Foto
+from classes.manifesto_scan import ManifestoScan
+from classes.scanner_de_ficheiros import FicheiroEncontrado
+
+T = TypeVar("T")
+
+_FIM = object()
+
+# O construtor aceita caminhos simples ou o resultado do scan (com formato já detetado)
+ItemFoto = Union[Path, FicheiroEncontrado]
+
+
+def _desembrulhar(item: ItemFoto) -> FicheiroEncontrado:
+    if isinstance(item, FicheiroEncontrado):
+        return item
+    return FicheiroEncontrado(Path(item))
+
+
+# Campos que obrigam a ler o ficheiro todo (aí compensa a leitura única do AnalisadorDeFotos)
+_CAMPOS_LEITURA_COMPLETA = frozenset({CAMPO_HASH, CAMPO_PHASH, CAMPO_DIMENSOES})
+
+# Campos que o manifesto/cache guardam
+_CAMPOS_REGISTO = (CAMPO_DATA, CAMPO_GPS, CAMPO_HASH)
+# ... e os que uma Foto tem de ter para ser registada (o hash é opcional: os níveis de
+# DetetarDuplicados só o calculam para fotos com o tamanho de outra)
+_CAMPOS_OBRIGATORIOS_REGISTO = (CAMPO_DATA, CAMPO_GPS)
+
+
+def _nova_foto(
+    encontrado: FicheiroEncontrado,
+    preguicosa: bool = False,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> Foto:
+    return Foto(
+        encontrado.caminho,
+        formato=encontrado.formato,
+        dimensoes=encontrado.dimensoes,
+        stat_ficheiro=encontrado.stat,
+        preguicosa=preguicosa,
+        data_pelo_nome=data_pelo_nome,
+        falha_descodificacao=encontrado.falha,
+    )
+
+
+def _preencher(
+    foto: Foto,
+    analisador: Optional[AnalisadorDeFotos],
+    campos: Optional[FrozenSet[str]] = None,
+) -> None:
+    if campos is None:
+        if analisador is not None:
+            analisador.analisar(foto)
+        else:
+            foto.extrair_metadados()
+            foto.calcular_hash()
+        return
+
+    # só o que foi pedido; o resto fica para quando (e se) for lido
+    if analisador is not None and campos & _CAMPOS_LEITURA_COMPLETA:
+        analisador.analisar(foto)
+        return
+    if campos & CAMPOS_EXIF:
+        foto.extrair_metadados(campos=campos & CAMPOS_EXIF)
+    if CAMPO_HASH in campos:
+        foto.calcular_hash()
+
+
+def construir_foto(
+    item: ItemFoto,
+    analisador: Optional[AnalisadorDeFotos] = None,
+    campos: Optional[FrozenSet[str]] = None,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> Foto:
+    """
+    Cria a Foto e preenche metadados + hash (o que o pipeline precisa).
+    Com `analisador`, tudo (incluindo dimensões e pHash) sai de uma única leitura.
+    Com `campos`, a Foto é preguiçosa: só esses campos são extraídos já; os outros
+    são calculados no primeiro acesso.
+    Com `data_pelo_nome`, a data pode vir do nome do ficheiro (ver PoliticaData).
+    """
+    foto = _nova_foto(_desembrulhar(item), campos is not None, data_pelo_nome)
+    _preencher(foto, analisador, campos)
+    return foto
+
+
+@dataclass(frozen=True)
+class RegistoFoto:
+    """
+    Resultado compacto devolvido pelos processos worker (em vez de um objeto Foto em pickle).
+    O processo principal aplica-o à Foto que já tem do seu lado.
+    """
+    data_de_captura: Optional[datetime]
+    local_gps: Optional[Tuple[float, float]]
+    hash_conteudo: Optional[str]
+    dimensoes: Optional[Tuple[int, int]]
+    hash_visual: Optional[str]  # pHash em hex
+    conhecidos: FrozenSet[str] = frozenset(_CAMPOS_REGISTO)  # data/GPS/hash já extraídos
+    falha_descodificacao: Optional[str] = None  # primeira falha do Pillow no worker
+    data_do_exif: Optional[datetime] = None  # só a do EXIF (vai para o manifesto/cache)
+    exif_consultado: bool = False  # False: a data veio só do nome (data_do_exif desconhecida)
+
+
+# (caminho, formato, dimensões, stat, falha): o mínimo para recriar a Foto no worker
+_Pedido = Tuple[str, Optional[str], Optional[Tuple[int, int]], Optional[os.stat_result], Optional[str]]
+
+
+def _analisar_lote(
+    pedidos: List[_Pedido],
+    analisador: Optional[AnalisadorDeFotos],
+    max_pixeis: Optional[int],
+    campos: Optional[FrozenSet[str]] = None,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> List[RegistoFoto]:
+    """Corre num processo worker: preenche cada foto e devolve só os campos."""
+    # o processo pode não ter herdado as decisões do principal (ex.: spawn)
+    Image.MAX_IMAGE_PIXELS = max_pixeis
+    warnings.filterwarnings("ignore", category=Image.DecompressionBombWarning)
+
+    registos = []
+    for caminho, formato, dimensoes, st, falha in pedidos:
+        foto = Foto(
+            Path(caminho), formato=formato, dimensoes=dimensoes, stat_ficheiro=st,
+            preguicosa=campos is not None, data_pelo_nome=data_pelo_nome, falha_descodificacao=falha,
+        )
+        _preencher(foto, analisador, campos)
+        registos.append(RegistoFoto(
+            data_de_captura=valor_conhecido(foto, CAMPO_DATA),
+            local_gps=valor_conhecido(foto, CAMPO_GPS),
+            hash_conteudo=valor_conhecido(foto, CAMPO_HASH),
+            dimensoes=foto.dimensoes,
+            hash_visual=str(foto.hash_visual) if foto.hash_visual is not None else None,
+            conhecidos=frozenset(c for c in _CAMPOS_REGISTO if foto.conhecido(c)),
+            falha_descodificacao=foto.falha_descodificacao,
+            data_do_exif=foto.data_do_exif,
+            exif_consultado=foto.data_do_exif_conhecida,
+        ))
+    return registos
+
+
+def _aplicar_registo(foto: Foto, registo: RegistoFoto) -> None:
+    if CAMPO_DATA in registo.conhecidos:
+        foto.definir_data_de_captura(registo.data_de_captura)
+    if registo.exif_consultado:
+        foto.definir_data_do_exif(registo.data_do_exif)
+    if CAMPO_GPS in registo.conhecidos:
+        foto.definir_local_gps(registo.local_gps)
+    if CAMPO_HASH in registo.conhecidos:
+        foto.definir_hash_conteudo(registo.hash_conteudo)
+    foto.definir_dimensoes(registo.dimensoes)
+    if registo.hash_visual is not None:
+        foto.definir_hash_visual(imagehash.hex_to_hash(registo.hash_visual))
+    if registo.falha_descodificacao is not None:
+        foto.registar_falha_descodificacao(registo.falha_descodificacao)
+
+
+def _lotes(iteravel: Iterable[T], tamanho: int) -> Iterator[List[T]]:
+    it = iter(iteravel)
+    while True:
+        lote = list(islice(it, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def em_buffer(iteravel: Iterable[T], tamanho: int = 256) -> Iterator[T]:
+    """
+    Consome `iteravel` numa thread produtora e entrega os itens por uma fila limitada.
+
+    - O produtor (ex.: scan) avança enquanto o consumidor (ex.: EXIF/hash) trabalha
+    - No máximo `tamanho` itens ficam em memória à espera
+    - Exceções do produtor são relançadas do lado do consumidor
+    - Se o consumidor parar a meio (break/close), o produtor é avisado e termina
+    """
+    fila: queue.Queue = queue.Queue(maxsize=max(1, tamanho))
+    parar = threading.Event()
+
+    def colocar(item) -> bool:
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor() -> None:
+        it = iter(iteravel)
+        try:
+            for item in it:
+                if not colocar((item, None)):
+                    return
+            colocar((_FIM, None))
+        except BaseException as e:  # noqa: BLE001 — relançada no consumidor
+            colocar((_FIM, e))
+        finally:
+            fechar = getattr(it, "close", None)
+            if fechar is not None:
+                fechar()
+
+    thread = threading.Thread(target=produtor, name="buffer-produtor", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, erro = fila.get()
+            if item is _FIM:
+                if erro is not None:
+                    raise erro
+                return
+            yield item
+    finally:
+        parar.set()
+
+
+@dataclass
+class ConstrutorDeFotos:
+    """
+    Constrói objetos Foto a partir de caminhos.
+
+    - construir(): lista completa (comportamento clássico)
+    - iterar(): streaming — cada Foto sai assim que está pronta, sem esperar
+      pelo resto dos caminhos (funciona com geradores vindos do scan)
+    - manifesto (opcional): ficheiros sem alterações desde o último scan
+      reutilizam os resultados guardados (nem EXIF nem hash)
+    - analisador (opcional): uma leitura por ficheiro para hash + dimensões + EXIF + pHash
+    - cache (opcional): cache SQLite partilhada entre execuções/pastas, por (dev, inode,
+      tamanho, mtime); consultada depois do manifesto
+    - campos (opcional): só estes campos são extraídos à cabeça (ex.: RegraPorData sem
+      duplicados => só a data; nem GPS nem hash). As Fotos ficam preguiçosas: um campo não
+      pedido é calculado no primeiro acesso. None = tudo (comportamento clássico).
+    - data_pelo_nome (opcional): data pelo nome do ficheiro (IMG_20230514_183012.jpg ...)
+      segundo a política. Manifesto/cache guardam só a data do EXIF e, ao reutilizar, a data
+      volta a passar por EXIF -> nome -> mtime com a política desta execução; fotos cuja
+      data veio do nome sem consultar o EXIF não são registadas.
+    - workers > 1: EXIF/hash/pHash em processos separados (ProcessPoolExecutor), em lotes de
+      `tamanho_lote`. A ordem e os resultados são os mesmos do caminho serial; manifesto e
+      cache continuam a ser lidos/escritos só no processo principal.
+    """
+    manifesto: Optional[ManifestoScan] = None
+    analisador: Optional[AnalisadorDeFotos] = None
+    workers: int = 1
+    tamanho_lote: int = 64
+    cache: Optional[CacheMetadados] = None
+    campos: Optional[FrozenSet[str]] = None
+    data_pelo_nome: Optional[DataPeloNome] = None
+
+    def iterar(self, caminhos: Iterable[ItemFoto]) -> Iterator[Foto]:
+        if self.workers > 1:
+            yield from self._iterar_paralelo(caminhos)
+            return
+        for item in caminhos:
+            encontrado = _desembrulhar(item)
+            if self.manifesto is None and self.cache is None:
+                yield construir_foto(encontrado, self.analisador, self.campos, self.data_pelo_nome)
+            else:
+                yield self._construir_incremental(encontrado)
+
+    def construir(self, caminhos: Iterable[ItemFoto]) -> List[Foto]:
+        return list(self.iterar(caminhos))
+
+    def _iterar_paralelo(self, caminhos: Iterable[ItemFoto]) -> Iterator[Foto]:
+        # no máximo 2 lotes por worker em voo: memória limitada mesmo com scans enormes
+        em_voo: Deque[Tuple[List[Tuple[Foto, Optional[os.stat_result], bool]], Optional[Future]]] = deque()
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            for lote in _lotes(caminhos, max(1, self.tamanho_lote)):
+                em_voo.append(self._submeter(executor, lote))
+                while len(em_voo) >= self.workers * 2:
+                    yield from self._recolher(*em_voo.popleft())
+            while em_voo:
+                yield from self._recolher(*em_voo.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submeter(self, executor: ProcessPoolExecutor, lote: List[ItemFoto]):
+        """Prepara um lote: o que o manifesto/cache já conhece fica feito aqui, o resto vai para o pool."""
+        entradas: List[Tuple[Foto, Optional[os.stat_result], bool]] = []
+        pedidos: List[_Pedido] = []
+        for item in lote:
+            encontrado = _desembrulhar(item)
+            foto = self._nova_foto(encontrado)
+            st = None
+            if self.manifesto is not None or self.cache is not None:
+                st = foto.obter_stat()
+                if st is not None and self._reutilizar(foto, st):
+                    entradas.append((foto, st, False))
+                    continue
+            entradas.append((foto, st, True))
+            pedidos.append(
+                (str(encontrado.caminho), encontrado.formato, encontrado.dimensoes, foto.stat_ficheiro,
+                 encontrado.falha)
+            )
+
+        futuro = None
+        if pedidos:
+            futuro = executor.submit(
+                _analisar_lote,
+                pedidos,
+                self.analisador,
+                Image.MAX_IMAGE_PIXELS,
+                self.campos,
+                self.data_pelo_nome,
+            )
+        return entradas, futuro
+
+    def _recolher(
+        self,
+        entradas: List[Tuple[Foto, Optional[os.stat_result], bool]],
+        futuro: Optional[Future],
+    ) -> Iterator[Foto]:
+        registos = iter(futuro.result() if futuro is not None else ())
+        for foto, st, pedida in entradas:
+            if pedida:
+                _aplicar_registo(foto, next(registos))
+                if st is not None:
+                    self._registar(foto, st)
+            yield foto
+
+    def _construir_incremental(self, encontrado: FicheiroEncontrado) -> Foto:
+        foto = self._nova_foto(encontrado)
+        st = foto.obter_stat()  # do scan, se já existir
+        if st is None:
+            _preencher(foto, self.analisador, self.campos)
+            return foto
+
+        if self._reutilizar(foto, st):
+            return foto
+
+        _preencher(foto, self.analisador, self.campos)
+        self._registar(foto, st)
+        return foto
+
+    def _nova_foto(self, encontrado: FicheiroEncontrado) -> Foto:
+        return _nova_foto(encontrado, self.campos is not None, self.data_pelo_nome)
+
+    @property
+    def _algoritmo(self) -> str:
+        return self.analisador.algoritmo if self.analisador is not None else "md5"
+
+    def _reutilizar(self, foto: Foto, st: os.stat_result) -> bool:
+        # ambos reaplicam a política de data desta execução à data do EXIF guardada
+        if self.manifesto is not None and self.manifesto.reutilizar(foto, st):
+            return True
+        if self.cache is not None and self.cache.reutilizar(foto, st, self._algoritmo):
+            if self.manifesto is not None:
+                self.manifesto.registar(foto, st)  # mantém o manifesto completo
+            return True
+        return False
+
+    def _registar(self, foto: Foto, st: os.stat_result) -> None:
+        # extração parcial (campos): não grava entradas incompletas, nem força o que falta
+        if not all(foto.conhecido(c) for c in _CAMPOS_OBRIGATORIOS_REGISTO):
+            return
+        # data tirada do nome sem consultar o EXIF: não há data do EXIF para guardar
+        if not foto.data_do_exif_conhecida:
+            return
+        if self.manifesto is not None:
+            self.manifesto.registar(foto, st)
+        if self.cache is not None:
+            self.cache.registar(foto, st, self._algoritmo)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Optional, Pattern, Tuple
+
+
+class PoliticaData(str, Enum):
+    """De onde vem a data de captura quando o nome do ficheiro também a tem."""
+    EXIF_PRIMEIRO = "exif"   # EXIF; se não houver, nome; depois mtime
+    NOME_PRIMEIRO = "nome"   # nome (sem abrir o ficheiro); se não tiver data, EXIF; depois mtime
+    SO_NOME = "so-nome"      # nome; se não tiver data, mtime (o ficheiro nunca é aberto)
+
+
+# Grupos com nome: ano, mes, dia (obrigatórios); hora, minuto, segundo, milis (opcionais)
+PADROES_DATA_NOME: Tuple[Pattern[str], ...] = (
+    # IMG_20230514_183012.jpg, PXL_20230514_183012345.jpg, VID_..., Screenshot_20230514-183012.png
+    re.compile(
+        r"(?<!\d)(?P<ano>(?:19|20)\d{2})(?P<mes>\d{2})(?P<dia>\d{2})[_-]"
+        r"(?P<hora>\d{2})(?P<minuto>\d{2})(?P<segundo>\d{2})(?P<milis>\d{3})?(?!\d)"
+    ),
+    # WhatsApp Image 2023-05-14 at 18.30.12.jpeg, Screenshot_2023-05-14-18-30-12.png, 2023-05-14 18.30.12.jpg
+    re.compile(
+        r"(?<!\d)(?P<ano>(?:19|20)\d{2})-(?P<mes>\d{2})-(?P<dia>\d{2})[ _-](?:at )?"
+        r"(?P<hora>\d{2})[.:-](?P<minuto>\d{2})[.:-](?P<segundo>\d{2})(?!\d)"
+    ),
+    # IMG-20230514-WA0001.jpg (WhatsApp Android: só a data)
+    re.compile(r"(?<!\d)(?P<ano>(?:19|20)\d{2})(?P<mes>\d{2})(?P<dia>\d{2})-WA\d+"),
+    # 2023-05-14.jpg, Foto 2023-05-14 (1).jpg
+    re.compile(r"(?<!\d)(?P<ano>(?:19|20)\d{2})-(?P<mes>\d{2})-(?P<dia>\d{2})(?![\d-])"),
+)
+
+
+def data_do_nome(nome: str, padroes: Iterable[Pattern[str]] = PADROES_DATA_NOME) -> Optional[datetime]:
+    """
+    Data codificada no nome do ficheiro (sem I/O). O primeiro padrão que dê uma data
+    válida ganha; None se nenhum servir.
+    """
+    for padrao in padroes:
+        m = padrao.search(nome)
+        if m is None:
+            continue
+        grupos = m.groupdict()
+        try:
+            return datetime(
+                int(grupos["ano"]),
+                int(grupos["mes"]),
+                int(grupos["dia"]),
+                int(grupos.get("hora") or 0),
+                int(grupos.get("minuto") or 0),
+                int(grupos.get("segundo") or 0),
+                int(grupos.get("milis") or 0) * 1000,
+            )
+        except (KeyError, ValueError):
+            continue  # ex.: 20231399 não é data: tenta o padrão seguinte
+    return None
+
+
+@dataclass(frozen=True)
+class DataPeloNome:
+    """
+    Configuração da data pelo nome do ficheiro (partilhada por todas as Fotos de um scan).
+
+    padroes: expressões regulares com os grupos ano/mes/dia[/hora/minuto/segundo/milis];
+    por defeito IMG_/PXL_/VID_/Screenshot_/WhatsApp.
+    """
+    politica: PoliticaData = PoliticaData.EXIF_PRIMEIRO
+    padroes: Tuple[Pattern[str], ...] = PADROES_DATA_NOME
+
+    @classmethod
+    def com_padroes_extra(cls, politica: PoliticaData, extra: Iterable[str]) -> "DataPeloNome":
+        """Padrões do utilizador (texto) primeiro, depois os de origem."""
+        return cls(politica, tuple(re.compile(p) for p in extra) + PADROES_DATA_NOME)
+
+    @property
+    def prefere_nome(self) -> bool:
+        return self.politica is not PoliticaData.EXIF_PRIMEIRO
+
+    def data(self, nome: str) -> Optional[datetime]:
+        return data_do_nome(nome, self.padroes)
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+Texto = Union[str, bytes, None]
+
+# Tags de data EXIF, por ordem de preferência: (data, subsegundos, fuso)
+#   DateTimeOriginal  + SubSecTimeOriginal  + OffsetTimeOriginal
+#   DateTimeDigitized + SubSecTimeDigitized + OffsetTimeDigitized
+#   DateTime          + SubSecTime          + OffsetTime
+TAGS_DATA_EXIF = (
+    (36867, 37521, 36881),
+    (36868, 37522, 36882),
+    (306, 37520, 36880),
+)
+
+_EPOCA_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+_DIGITOS = frozenset("0123456789")
+
+
+def interpretar_data_exif(valor: Texto, subsegundos: Texto = None, fuso: Texto = None) -> Optional[datetime]:
+    """
+    Interpreta "AAAA:MM:DD HH:MM:SS" por posição (sem strptime).
+
+    Tolera as variantes comuns de câmaras/software:
+      - NULs/espaços no fim, bytes em vez de str
+      - separadores "-", "/", "." ou "T" em vez de ":"/" ", e espaços em vez de zeros ("2020:01:02  3:04:05")
+      - só data ("2020:01:02") ou sem segundos ("2020:01:02 03:04")
+      - fração e fuso no próprio texto ("...05.123+01:00", "...Z")
+    subsegundos (SubSecTime*, ex.: "123" => .123) e fuso (OffsetTime*, ex.: "+01:00")
+    completam o resultado; com fuso o datetime vem com tzinfo (hora local da foto).
+
+    None para datas vazias/"0000:00:00 00:00:00" ou impossíveis: quem chama passa à tag seguinte.
+    """
+    texto = _limpar(valor)
+    base = _data_canonica(texto) or _data_tolerante(texto)
+    if base is None:
+        return None
+    dt, cauda = base
+
+    # fração e fuso no próprio texto têm prioridade sobre as tags separadas
+    fracao, fuso_texto = _partir_cauda(cauda) if cauda else ("", "")
+    micro = _microssegundos(fracao or _limpar(subsegundos))
+    if micro:
+        dt = dt.replace(microsecond=micro)
+    tz = _fuso(fuso_texto or _limpar(fuso))
+    if tz is not None:
+        dt = dt.replace(tzinfo=tz)
+    return dt
+
+
+def data_de_exif(exif) -> Optional[datetime]:
+    """Primeira data válida de um mapeamento EXIF (ver TAGS_DATA_EXIF)."""
+    for tag_data, tag_subsegundos, tag_fuso in TAGS_DATA_EXIF:
+        valor = exif.get(tag_data)
+        if not valor:
+            continue
+        dt = interpretar_data_exif(valor, exif.get(tag_subsegundos), exif.get(tag_fuso))
+        if dt is not None:
+            return dt
+    return None
+
+
+def instante_em_microssegundos(dt: datetime) -> int:
+    """
+    Microssegundos desde 1970 (UTC), exatos e comparáveis entre datas com e sem fuso.
+    Sem fuso => hora local da máquina (como o mtime que serve de fallback).
+    """
+    if dt.tzinfo is None:
+        try:
+            dt = dt.astimezone()
+        except (OverflowError, OSError, ValueError):
+            dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCA_UTC) // _MICROSSEGUNDO
+
+
+# ------------------------
+# Helpers
+# ------------------------
+
+def _data_canonica(texto: str) -> Optional[tuple[datetime, str]]:
+    """Caminho rápido: "AAAA:MM:DD HH:MM:SS" exato vai direto ao fromisoformat (em C)."""
+    if len(texto) != 19 or texto[4] != ":" or texto[7] != ":":
+        return None
+    try:
+        return datetime.fromisoformat(f"{texto[0:4]}-{texto[5:7]}-{texto[8:]}"), ""
+    except ValueError:
+        return None
+
+
+def _data_tolerante(texto: str) -> Optional[tuple[datetime, str]]:
+    """Campo a campo por posição; devolve também o que sobra depois dos segundos (fração/fuso)."""
+    if len(texto) < 10 or texto[4] in _DIGITOS or texto[7] in _DIGITOS:
+        return None
+    try:
+        ano, mes, dia = int(texto[0:4]), int(texto[5:7]), int(texto[8:10])
+        hora = minuto = segundo = 0
+        cauda = ""
+        if len(texto) >= 16:
+            if texto[10] in _DIGITOS or texto[13] in _DIGITOS:
+                return None
+            hora, minuto = int(texto[11:13]), int(texto[14:16])
+            if len(texto) >= 19 and texto[16] not in _DIGITOS:
+                segundo = int(texto[17:19])
+                cauda = texto[19:]
+            else:
+                cauda = texto[16:]
+        elif len(texto) > 10:
+            return None
+    except ValueError:
+        return None
+
+    if not ano or not mes or not dia:
+        return None
+
+    # 24:00:00 => meia-noite do dia seguinte; segundo 60 (bissexto) => 59
+    dia_seguinte = hora == 24 and not minuto and not segundo
+    if dia_seguinte:
+        hora = 0
+    segundo = min(segundo, 59)
+    try:
+        dt = datetime(ano, mes, dia, hora, minuto, segundo)
+    except ValueError:
+        return None
+    if dia_seguinte:
+        dt += timedelta(days=1)
+    return dt, cauda
+
+def _limpar(valor: Texto) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, (bytes, bytearray)):
+        valor = valor.decode("latin-1")
+    return str(valor).split("\x00", 1)[0].strip()
+
+
+def _partir_cauda(cauda: str) -> tuple[str, str]:
+    """".123+01:00" => ("123", "+01:00")"""
+    cauda = cauda.strip()
+    fracao = ""
+    if cauda[:1] in (".", ","):
+        i = 1
+        while i < len(cauda) and cauda[i] in _DIGITOS:
+            i += 1
+        fracao, cauda = cauda[1:i], cauda[i:].strip()
+    return fracao, cauda
+
+
+def _microssegundos(digitos: str) -> int:
+    if not digitos or not all(c in _DIGITOS for c in digitos):
+        return 0
+    return int(digitos[:6].ljust(6, "0"))
+
+
+def _fuso(texto: str) -> Optional[timezone]:
+    if not texto:
+        return None
+    if texto in ("Z", "z"):
+        return timezone.utc
+    if len(texto) < 3 or texto[0] not in "+-":
+        return None
+    digitos = texto[1:].replace(":", "")
+    try:
+        horas = int(digitos[0:2])
+        minutos = int(digitos[2:4]) if len(digitos) > 2 else 0
+        delta = timedelta(hours=horas, minutes=minutos)
+        return timezone(-delta if texto[0] == "-" else delta)
+    except ValueError:
+        return None
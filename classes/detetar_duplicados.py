@@ -1,14 +1,32 @@
 from __future__ import annotations
 
+import os
+import stat
+import sys
 from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
-from PIL import Image
 import imagehash
 
+from classes.agrupamento_hamming import ModoAgrupamento, agrupar_componentes
+from classes.cache_metadados import CacheMetadados
+from classes.cache_stat import stat_de_foto
+from classes.campos_foto import CAMPO_DATA, CAMPO_HASH, CAMPO_PHASH, valor_conhecido
+from classes.data_exif import instante_em_microssegundos
 from classes.foto import Foto
+from classes.hash_visual import calcular_hash_visual, calcular_hashes_visuais, hash_visual_da_miniatura
+from classes.indice_hamming import IndiceHamming
+from classes.motor_hamming import IndiceHammingNumPy
+from classes.motor_de_hash import TAMANHO_EXTREMOS, MotorDeHash
+from classes.tipo_de_ficheiro import descrever_falha
+
+
+# Fotos sem data nem stat ficam por último na escolha do original
+_SEM_DATA = sys.maxsize
+
+# Fábrica de índices de Hamming: (distância máxima, bits) -> objeto com adicionar/primeiro_dentro
+FabricaIndice = Callable[[int, int], Union[IndiceHamming, IndiceHammingNumPy]]
 
 
 @dataclass(frozen=True)
@@ -39,25 +57,67 @@ class DetetarDuplicados:
       - Marca as restantes como duplicadas (foto.marcar_como_duplicado())
     """
 
-    def __init__(self, algoritmo: str = "md5") -> None:
+    @staticmethod
+    def campos_necessarios(quase_duplicados: bool = True) -> FrozenSet[str]:
+        """
+        Campos da Foto que a deteção precisa extraídos à cabeça (o pipeline fá-lo de uma vez).
+        O hash não entra: detetar() calcula-o por níveis, só para fotos com o tamanho de outra.
+        """
+        campos = {CAMPO_DATA}  # data: escolher o original mais antigo
+        if quase_duplicados:
+            campos.add(CAMPO_PHASH)
+        return frozenset(campos)
+
+    def __init__(
+        self,
+        algoritmo: str = "md5",
+        motor_de_hash: Optional[MotorDeHash] = None,
+        cache: Optional[CacheMetadados] = None,
+        indice_hamming: FabricaIndice = IndiceHamming,
+        workers_phash: int = 1,
+        phash_da_miniatura: bool = False,
+        verificar_miniatura: bool = False,
+        agrupamento: Union[ModoAgrupamento, str] = ModoAgrupamento.GULOSO,
+    ) -> None:
         self._algoritmo = algoritmo
+        # procura de quase-duplicados: IndiceHamming (faixas) ou IndiceHammingNumPy (força bruta vetorizada)
+        self._indice_hamming = indice_hamming
+        # pHash de execuções anteriores (SQLite), consultado antes de abrir a imagem
+        self._cache = cache
+        # hashes em falta são calculados em paralelo (thread pool), não um ficheiro de cada vez
+        self._motor_de_hash = motor_de_hash or MotorDeHash(algoritmo=algoritmo)
+        # pHash em falta: 1 = no próprio processo; N > 1 (ou 0 = um por core) = pool de processos
+        self._workers_phash = workers_phash
+        # pHash em falta tirado da miniatura EXIF (alguns KB) em vez da imagem descodificada;
+        # verificar_miniatura: grupos com pHash de miniaturas são confirmados com a imagem completa
+        self._phash_da_miniatura = phash_da_miniatura
+        self._verificar_miniatura = verificar_miniatura
+        # guloso (1.º representante, depende da ordem) ou componentes (union-find, não depende)
+        self._agrupamento = ModoAgrupamento(agrupamento)
 
     # ------------------------
     # Duplicados EXATOS (hash bytes)
     # ------------------------
 
     def detetar(self, fotos: Iterable[Foto]) -> List[GrupoDuplicados]:
+        """
+        Agrupa fotos com conteúdo igual.
+
+        Fotos sem hash só são lidas se puderem ter um duplicado (ver _preencher_hashes_por_niveis):
+        uma foto com tamanho único fica sem hash e, como antes, fora de qualquer grupo.
+        """
+        fotos = list(fotos)
         por_hash: Dict[str, List[Foto]] = {}
 
-        # 1) Garantir hash e agrupar
+        # 1) Garantir hash onde é preciso (em níveis, em paralelo) e agrupar
+        self._preencher_hashes_por_niveis(fotos)
         for foto in fotos:
-            if foto.hash_conteudo is None:
-                foto.calcular_hash(self._algoritmo)
-
-            if foto.hash_conteudo is None:
+            # sem disparar o hash de fotos preguiçosas que os níveis mostraram ser únicas
+            h = valor_conhecido(foto, CAMPO_HASH)
+            if h is None:
                 continue
 
-            por_hash.setdefault(foto.hash_conteudo, []).append(foto)
+            por_hash.setdefault(h, []).append(foto)
 
         # 2) Marcar duplicados (mantém mais antigo como original)
         grupos: List[GrupoDuplicados] = []
@@ -86,28 +146,45 @@ class DetetarDuplicados:
         Deteta "quase duplicados" por pHash.
 
         - Só considera fotos ainda NÃO marcadas como duplicadas
+        - Agrupamento GULOSO: cada foto entra no grupo mais antigo cujo representante está a
+          distância <= threshold (ou abre um grupo novo); a procura usa um IndiceHamming em vez
+          de comparar com todos os representantes
+        - Agrupamento COMPONENTES: todos os pares a distância <= threshold são unidos
+          (union-find), logo A~B e B~C ficam no mesmo grupo; grupos, fotos e representante
+          (a 1.ª foto por caminho) não dependem da ordem das fotos
+        - Com phash_da_miniatura, o pHash em falta vem da miniatura EXIF quando existe; com
+          verificar_miniatura, os grupos em que entrou algum desses pHash são refeitos com o
+          pHash da imagem completa (só para essas fotos)
         - Marca duplicadas dentro de cada grupo, escolhendo o "original" mais antigo
         """
         candidatas = [f for f in fotos if not f.duplicada]
+        # id(foto) das fotos cujo pHash veio da miniatura
+        miniaturas: Set[int] = set()
 
-        # grupos representados por (hash_representante, lista_fotos)
-        grupos: List[Tuple[imagehash.ImageHash, List[Foto]]] = []
+        # pHash em falta calculados à cabeça num pool de processos (se pedido); id(foto) -> pHash
+        calculados = self._phash_em_paralelo(
+            [f for f in candidatas if f.decodificavel and f.hash_visual is None], miniaturas
+        )
+        # (foto, pHash com que é agrupada)
+        entradas: List[Tuple[Foto, imagehash.ImageHash]] = []
 
         for foto in candidatas:
-            h = self._calcular_phash(foto.caminho)
-            if h is None:
+            if not foto.decodificavel:
+                # formato que o Pillow não abre (ex.: HEIC sem plugin) ou que já falhou numa fase anterior
                 continue
+            # reutiliza o pHash se já veio da análise de uma leitura (AnalisadorDeFotos)
+            h = foto.hash_visual
+            if h is None:
+                h = calculados[id(foto)] if id(foto) in calculados else self._phash_de(foto, miniaturas)
+            if h is not None:
+                entradas.append((foto, h))
 
-            colocado = False
-            for h_rep, lista in grupos:
-                # distância de Hamming (ImageHash implementa subtração)
-                if (h - h_rep) <= threshold:
-                    lista.append(foto)
-                    colocado = True
-                    break
+        # grupos representados por (hash_representante, lista_fotos)
+        grupos = self._agrupar(entradas, threshold)
 
-            if not colocado:
-                grupos.append((h, [foto]))
+        if self._verificar_miniatura and miniaturas:
+            usados = {id(foto): h for foto, h in entradas}
+            grupos = self._confirmar_grupos(grupos, miniaturas, usados, threshold)
 
         # marcar duplicados em grupos com mais de 1
         saida: List[GrupoQuaseDuplicados] = []
@@ -137,29 +214,258 @@ class DetetarDuplicados:
     # Helpers
     # ------------------------
 
-    def _calcular_phash(self, caminho: Path) -> Optional[imagehash.ImageHash]:
+    def _preencher_hashes_por_niveis(self, fotos: List[Foto]) -> None:
         """
-        Calcula pHash da imagem.
-        Se o Pillow não conseguir abrir (ex.: HEIC sem suporte), devolve None.
+        Calcula só os hashes completos que podem mudar o resultado:
+
+          1) tamanho (stat): tamanho único => não pode ter duplicado exato
+          2) hash parcial (início + fim, TAMANHO_EXTREMOS cada) dentro de cada tamanho
+          3) hash completo só quando os parciais coincidem
+
+        Caminhos com o mesmo (st_dev, st_ino) são o mesmo ficheiro (hard links): lidos uma vez
+        e o hash é copiado para os outros caminhos.
         """
+        if all(valor_conhecido(f, CAMPO_HASH) is not None for f in fotos):
+            return
+
+        # 1) tamanho
+        por_tamanho: Dict[int, List[Tuple[Foto, object]]] = {}
+        for foto in fotos:
+            st = stat_de_foto(foto)  # do scan, se já existir
+            if st is None or not stat.S_ISREG(st.st_mode):
+                continue
+            # inode 0 (alguns sistemas de ficheiros) => sem identidade fiável
+            identidade = (st.st_dev, st.st_ino) if st.st_ino else id(foto)
+            por_tamanho.setdefault(st.st_size, []).append((foto, identidade))
+
+        completos: List[List[Tuple[Foto, object]]] = []
+        por_parcial: List[List[Tuple[Foto, object]]] = []
+        for tamanho, grupo in por_tamanho.items():
+            if len(grupo) < 2 or all(valor_conhecido(f, CAMPO_HASH) is not None for f, _ in grupo):
+                continue
+            if tamanho <= 2 * TAMANHO_EXTREMOS or len({i for _, i in grupo}) == 1:
+                # ficheiro pequeno (parcial = completo) ou tudo o mesmo ficheiro
+                completos.append(grupo)
+            else:
+                por_parcial.append(grupo)
+
+        # 2) hash parcial (um por ficheiro físico)
+        representantes = {i: f.caminho for grupo in por_parcial for f, i in reversed(grupo)}
+        parciais = self._motor_de_hash.calcular_parcial(set(representantes.values()))
+        for grupo in por_parcial:
+            subgrupos: Dict[str, List[Tuple[Foto, object]]] = {}
+            for foto, identidade in grupo:
+                h = parciais.get(representantes[identidade])
+                if h is not None:
+                    subgrupos.setdefault(h, []).append((foto, identidade))
+            completos.extend(g for g in subgrupos.values() if len(g) > 1)
+
+        # 3) hash completo (um por ficheiro físico; reaproveita hashes já conhecidos)
+        conhecidos: Dict[object, str] = {}
+        a_ler: Dict[object, Path] = {}
+        for grupo in completos:
+            for foto, identidade in grupo:
+                h = valor_conhecido(foto, CAMPO_HASH)
+                if h is not None:
+                    conhecidos.setdefault(identidade, h)
+        for grupo in completos:
+            for foto, identidade in grupo:
+                if valor_conhecido(foto, CAMPO_HASH) is None and identidade not in conhecidos:
+                    a_ler.setdefault(identidade, foto.caminho)
+
+        lidos = self._motor_de_hash.calcular(set(a_ler.values()))
+        for identidade, caminho in a_ler.items():
+            if lidos.get(caminho) is not None:
+                conhecidos[identidade] = lidos[caminho]
+
+        for grupo in completos:
+            for foto, identidade in grupo:
+                if valor_conhecido(foto, CAMPO_HASH) is None and identidade in conhecidos:
+                    foto.definir_hash_conteudo(conhecidos[identidade])
+
+    def _agrupar(
+        self,
+        entradas: List[Tuple[Foto, imagehash.ImageHash]],
+        threshold: int,
+    ) -> List[Tuple[imagehash.ImageHash, List[Foto]]]:
+        """(hash_representante, fotos) de cada grupo, isolados incluídos, segundo o modo de agrupamento."""
+        if self._agrupamento is ModoAgrupamento.COMPONENTES:
+            return self._agrupar_componentes(entradas, threshold)
+        return self._agrupar_guloso(entradas, threshold)
+
+    def _agrupar_guloso(
+        self,
+        entradas: List[Tuple[Foto, imagehash.ImageHash]],
+        threshold: int,
+    ) -> List[Tuple[imagehash.ImageHash, List[Foto]]]:
+        """Cada foto (pela ordem dada) entra no grupo do representante mais antigo a distância <= threshold."""
+        grupos: List[Tuple[imagehash.ImageHash, List[Foto]]] = []
+        # um índice por tamanho de hash: posição no índice -> posição em `grupos`
+        indices: Dict[int, Tuple[Union[IndiceHamming, IndiceHammingNumPy], List[int]]] = {}
+        for foto, h in entradas:
+            valor = int(str(h), 16)
+            bits = h.hash.size
+            if bits not in indices:
+                # o backend NumPy só aceita hashes que caibam em uint64
+                fabrica = self._indice_hamming if bits <= 64 else IndiceHamming
+                indices[bits] = (fabrica(threshold, bits), [])
+            indice, grupo_de = indices[bits]
+
+            # representante mais antigo a distância de Hamming <= threshold
+            posicao = indice.primeiro_dentro(valor)
+            if posicao is not None:
+                grupos[grupo_de[posicao]][1].append(foto)
+            else:
+                indice.adicionar(valor)
+                grupo_de.append(len(grupos))
+                grupos.append((h, [foto]))
+        return grupos
+
+    def _agrupar_componentes(
+        self,
+        entradas: List[Tuple[Foto, imagehash.ImageHash]],
+        threshold: int,
+    ) -> List[Tuple[imagehash.ImageHash, List[Foto]]]:
+        """
+        Componentes ligadas (agrupamento_hamming.agrupar_componentes) sobre as fotos ordenadas
+        por caminho: dentro do grupo as fotos vêm por caminho, o representante é a primeira e os
+        grupos vêm pelo caminho do representante. Os fragmentos do índice usam o pool de
+        workers_phash processos.
+        """
+        ordenadas = sorted(entradas, key=lambda e: str(e[0].caminho))
+        por_bits: Dict[int, List[Tuple[Foto, imagehash.ImageHash]]] = {}
+        for foto, h in ordenadas:
+            por_bits.setdefault(h.hash.size, []).append((foto, h))
+
+        grupos: List[Tuple[imagehash.ImageHash, List[Foto]]] = []
+        for bits, lista in por_bits.items():
+            valores = [int(str(h), 16) for _foto, h in lista]
+            for componente in agrupar_componentes(valores, threshold, bits, self._workers_phash):
+                grupos.append((lista[componente[0]][1], [lista[i][0] for i in componente]))
+        grupos.sort(key=lambda g: str(g[1][0].caminho))
+        return grupos
+
+    def _confirmar_grupos(
+        self,
+        grupos: List[Tuple[imagehash.ImageHash, List[Foto]]],
+        miniaturas: Set[int],
+        usados: Dict[int, imagehash.ImageHash],
+        threshold: int,
+    ) -> List[Tuple[imagehash.ImageHash, List[Foto]]]:
+        """
+        Refaz, com o pHash da imagem completa, os grupos onde entrou algum pHash de miniatura
+        (mesmo modo de agrupamento, mesma ordem). Um grupo pode partir-se em vários ou desaparecer.
+        """
+        confirmados: List[Tuple[imagehash.ImageHash, List[Foto]]] = []
+        for h_rep, lista in grupos:
+            if len(lista) < 2 or not any(id(f) in miniaturas for f in lista):
+                confirmados.append((h_rep, lista))
+                continue
+            entradas: List[Tuple[Foto, imagehash.ImageHash]] = []
+            for foto in lista:
+                h = self._phash_de(foto) if id(foto) in miniaturas else usados[id(foto)]
+                if h is not None:
+                    # sem pHash: a imagem completa não descodifica e fica fora (falha registada)
+                    entradas.append((foto, h))
+            confirmados.extend(self._agrupar(entradas, threshold))
+        if self._agrupamento is ModoAgrupamento.COMPONENTES:
+            confirmados.sort(key=lambda g: str(g[1][0].caminho))
+        return confirmados
+
+    def _phash_em_paralelo(
+        self,
+        fotos: List[Foto],
+        miniaturas: Optional[Set[int]] = None,
+    ) -> Dict[int, Optional[imagehash.ImageHash]]:
+        """
+        pHash (cache, miniatura ou pool de processos) de todas as fotos de uma vez; {} se
+        workers_phash == 1 (aí cada foto segue por _phash_de, uma de cada vez).
+        Falhas ficam registadas na Foto.
+        """
+        if self._workers_phash == 1 or len(fotos) < 2:
+            return {}
+        resultado: Dict[int, Optional[imagehash.ImageHash]] = {}
+        em_falta: List[Tuple[Foto, Optional[os.stat_result]]] = []
+        for foto in fotos:
+            st, h = self._phash_da_cache(foto)
+            if h is None and miniaturas is not None:
+                h = self._phash_de_miniatura(foto, miniaturas)
+            if h is not None:
+                resultado[id(foto)] = h
+            else:
+                em_falta.append((foto, st))
+
+        calculados = calcular_hashes_visuais([f.caminho for f, _st in em_falta], self._workers_phash)
+        for foto, st in em_falta:
+            h, motivo = calculados[foto.caminho]
+            if motivo is not None:
+                foto.registar_falha_descodificacao(motivo)
+            if h is not None and st is not None:
+                self._cache.guardar_phash(st, h)
+            resultado[id(foto)] = h
+        return resultado
+
+    def _phash_da_cache(self, foto: Foto) -> Tuple[Optional[os.stat_result], Optional[imagehash.ImageHash]]:
+        """(stat usado como chave da cache, pHash guardado); (None, None) sem cache."""
+        st = stat_de_foto(foto) if self._cache is not None else None
+        if st is None:
+            return None, None
+        return st, self._cache.obter_phash(st)
+
+    def _phash_de_miniatura(self, foto: Foto, miniaturas: Set[int]) -> Optional[imagehash.ImageHash]:
+        """pHash da miniatura EXIF (se a opção estiver ligada e houver miniatura); regista a origem."""
+        if not self._phash_da_miniatura:
+            return None
+        h = hash_visual_da_miniatura(foto.caminho)
+        if h is not None:
+            miniaturas.add(id(foto))
+        return h
+
+    def _phash_de(self, foto: Foto, miniaturas: Optional[Set[int]] = None) -> Optional[imagehash.ImageHash]:
+        """
+        pHash da cache (se existir e o ficheiro não mudou) ou calculado e guardado na cache.
+        Com `miniaturas` (e phash_da_miniatura), tenta a miniatura EXIF antes de descodificar;
+        esse pHash não vai para a cache, que só guarda pHash da imagem completa.
+        """
+        st, h = self._phash_da_cache(foto)
+        if h is not None:
+            return h
+        if miniaturas is not None:
+            h = self._phash_de_miniatura(foto, miniaturas)
+            if h is not None:
+                return h
         try:
-            with Image.open(caminho) as img:
-                return imagehash.phash(img)
-        except Exception:
+            h = self._calcular_phash(foto.caminho)
+        except Exception as e:
+            # fica registado na Foto: nenhuma fase seguinte volta a tentar
+            foto.registar_falha_descodificacao(descrever_falha(e))
             return None
+        if h is not None and st is not None:
+            self._cache.guardar_phash(st, h)
+        return h
 
-    def _chave_antiguidade(self, foto: Foto) -> datetime:
+    def _calcular_phash(self, caminho: Path) -> Optional[imagehash.ImageHash]:
+        """
+        Calcula pHash da imagem (JPEG grandes descodificados já em escala reduzida, ver hash_visual).
+        Se o Pillow não conseguir abrir/descodificar (ex.: HEIC sem suporte, truncado), a exceção
+        sobe para _phash_de, que a regista na Foto.
+        """
+        return calcular_hash_visual(caminho)
+
+    def _chave_antiguidade(self, foto: Foto) -> Tuple[int, str]:
         """
         Define como comparamos "original mais antigo":
-        1) data_de_captura (EXIF ou mtime já preenchido na Foto)
-        2) fallback mtime direto do sistema se necessário
+        1) data_de_captura (EXIF com subsegundos/fuso, ou mtime já preenchido na Foto)
+        2) fallback mtime do stat (guardado na Foto desde o scan, se existir)
+        3) empate (ex.: rajadas no mesmo instante): caminho, para não depender da ordem do scan
+        Instantes em microssegundos inteiros: comparações exatas, mesmo entre fusos diferentes.
         """
         if foto.data_de_captura is not None:
-            return foto.data_de_captura
-        try:
-            return datetime.fromtimestamp(foto.caminho.stat().st_mtime)
-        except Exception:
-            return datetime.max
+            return (instante_em_microssegundos(foto.data_de_captura), str(foto.caminho))
+        st = stat_de_foto(foto)
+        if st is None:
+            return (_SEM_DATA, str(foto.caminho))
+        return (st.st_mtime_ns // 1000, str(foto.caminho))
 
     def _marcar_grupo_com_original_mais_antigo(self, lista: List[Foto]) -> None:
         """
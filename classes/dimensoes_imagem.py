@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import struct
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from PIL import Image
+
+from classes.tipo_de_ficheiro import descrever_falha
+
+Dimensoes = Tuple[int, int]  # (largura, altura)
+
+# Leitura inicial: chega para PNG/WebP/TIFF e para a maioria dos JPEG sem EXIF enorme
+TAMANHO_LEITURA = 64 * 1024
+
+# Marcadores SOF (Start Of Frame) do JPEG: trazem altura/largura
+_SOF_JPEG = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def ler_dimensoes(caminho: Path, falhas: Optional[Dict[Path, str]] = None) -> Optional[Dimensoes]:
+    """
+    Lê (largura, altura) só a partir dos cabeçalhos, sem descodificar a imagem.
+
+    - JPEG (SOFn), PNG (IHDR), WebP (VP8/VP8L/VP8X) e TIFF (IFD0) são lidos à mão
+    - Outros formatos (ex.: HEIF com plugin): fallback para Image.open (que também é lazy)
+    - None se não for possível ler; se foi o Pillow a falhar, o motivo fica em `falhas`
+    """
+    try:
+        with open(caminho, "rb") as f:
+            inicio = f.read(TAMANHO_LEITURA)
+            dims = _dimensoes_do_cabecalho(inicio, f)
+        if dims is not None:
+            return dims
+    except (OSError, struct.error, ValueError):
+        return None
+    return _dimensoes_pillow(caminho, falhas)
+
+
+def ler_dimensoes_em_lote(
+    caminhos: Iterable[Path],
+    max_workers: int = 8,
+    falhas: Optional[Dict[Path, str]] = None,
+) -> Dict[Path, Optional[Dimensoes]]:
+    """Sonda várias imagens em paralelo (I/O-bound => threads). `falhas`: como em ler_dimensoes."""
+    caminhos = list(caminhos)
+    if max_workers <= 1 or len(caminhos) <= 1:
+        return {c: ler_dimensoes(c, falhas) for c in caminhos}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dimensoes") as ex:
+        return dict(zip(caminhos, ex.map(lambda c: ler_dimensoes(c, falhas), caminhos)))
+
+
+# ------------------------
+# Parsers de cabeçalho
+# ------------------------
+
+def _dimensoes_do_cabecalho(dados: bytes, f: BinaryIO) -> Optional[Dimensoes]:
+    if dados.startswith(b"\xff\xd8"):
+        return _dimensoes_jpeg(dados, f)
+    if dados.startswith(b"\x89PNG\r\n\x1a\n") and dados[12:16] == b"IHDR":
+        return struct.unpack(">II", dados[16:24])
+    if dados[:4] == b"RIFF" and dados[8:12] == b"WEBP":
+        return _dimensoes_webp(dados)
+    if dados[:4] in (b"II*\x00", b"MM\x00*"):
+        return _dimensoes_tiff(dados)
+    return None
+
+
+def _dimensoes_jpeg(dados: bytes, f: BinaryIO) -> Optional[Dimensoes]:
+    """
+    Percorre os segmentos a partir do SOI. Se o SOF estiver para lá da leitura inicial
+    (ex.: APP1 com miniatura grande), continua a partir do ficheiro saltando payloads.
+    """
+    pos = 2
+    while True:
+        if pos + 4 > len(dados):
+            # acabou o buffer: continua diretamente no ficheiro
+            return _dimensoes_jpeg_ficheiro(f, pos)
+        if dados[pos] != 0xFF:
+            return None
+        marcador = dados[pos + 1]
+        if marcador == 0xFF:  # padding
+            pos += 1
+            continue
+        if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7:  # sem payload
+            pos += 2
+            continue
+        if marcador == 0xD9 or marcador == 0xDA:  # EOI / SOS sem SOF antes
+            return None
+        (tamanho,) = struct.unpack(">H", dados[pos + 2:pos + 4])
+        if marcador in _SOF_JPEG:
+            if pos + 9 > len(dados):
+                return _dimensoes_jpeg_ficheiro(f, pos)
+            altura, largura = struct.unpack(">HH", dados[pos + 5:pos + 9])
+            return (largura, altura)
+        pos += 2 + tamanho
+
+
+def _dimensoes_jpeg_ficheiro(f: BinaryIO, pos: int) -> Optional[Dimensoes]:
+    """Igual ao anterior, mas lê 4 bytes por segmento e salta o payload com seek."""
+    f.seek(pos)
+    while True:
+        cab = f.read(4)
+        if len(cab) < 4 or cab[0] != 0xFF:
+            return None
+        marcador = cab[1]
+        if marcador == 0xFF:
+            f.seek(-3, 1)
+            continue
+        if marcador in (0xD9, 0xDA):
+            return None
+        (tamanho,) = struct.unpack(">H", cab[2:4])
+        if tamanho < 2:
+            return None
+        if marcador in _SOF_JPEG:
+            sof = f.read(5)
+            if len(sof) < 5:
+                return None
+            altura, largura = struct.unpack(">HH", sof[1:5])
+            return (largura, altura)
+        f.seek(tamanho - 2, 1)
+
+
+def _dimensoes_webp(dados: bytes) -> Optional[Dimensoes]:
+    chunk = dados[12:16]
+    if chunk == b"VP8X" and len(dados) >= 30:
+        largura = int.from_bytes(dados[24:27], "little") + 1
+        altura = int.from_bytes(dados[27:30], "little") + 1
+        return (largura, altura)
+    if chunk == b"VP8 " and len(dados) >= 30 and dados[23:26] == b"\x9d\x01\x2a":
+        largura, altura = struct.unpack("<HH", dados[26:30])
+        return (largura & 0x3FFF, altura & 0x3FFF)
+    if chunk == b"VP8L" and len(dados) >= 25 and dados[20] == 0x2F:
+        bits = int.from_bytes(dados[21:25], "little")
+        return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    return None
+
+
+def _dimensoes_tiff(dados: bytes) -> Optional[Dimensoes]:
+    fmt = "<" if dados[:2] == b"II" else ">"
+    (ifd,) = struct.unpack(fmt + "I", dados[4:8])
+    if ifd + 2 > len(dados):
+        return None
+    (n,) = struct.unpack(fmt + "H", dados[ifd:ifd + 2])
+
+    largura = altura = None
+    for i in range(n):
+        base = ifd + 2 + i * 12
+        if base + 12 > len(dados):
+            break
+        tag, tipo, _contagem = struct.unpack(fmt + "HHI", dados[base:base + 8])
+        if tag not in (256, 257):
+            continue
+        # SHORT (3) ocupa os 2 primeiros bytes do campo de valor; LONG (4) os 4
+        if tipo == 3:
+            (valor,) = struct.unpack(fmt + "H", dados[base + 8:base + 10])
+        elif tipo == 4:
+            (valor,) = struct.unpack(fmt + "I", dados[base + 8:base + 12])
+        else:
+            continue
+        if tag == 256:
+            largura = valor
+        else:
+            altura = valor
+
+    if largura is None or altura is None:
+        return None
+    return (largura, altura)
+
+
+def _dimensoes_pillow(caminho: Path, falhas: Optional[Dict[Path, str]] = None) -> Optional[Dimensoes]:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(caminho) as img:
+                return img.size
+    except Exception as e:
+        if falhas is not None:
+            falhas[caminho] = descrever_falha(e)  # cada thread escreve a sua chave
+        return None
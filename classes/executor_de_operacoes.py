@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import os
 import shutil
+import stat
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable, Optional, Set, List
 
+from classes.cache_stat import CONTADOR_STAT
 from classes.monitor_de_operacoes import MonitorDeOperacoes, MonitorProtocol
 from classes.operacao import Operacao, TipoOperacao
 
 
+_MOTIVO_SEM_ORIGEM = "origem não existe ou não é ficheiro"
+
+
 # -------------------------
 # Modelos de resultado
 # -------------------------
@@ -184,9 +190,17 @@ class ExecutorDeOperacoes:
         origem = op.origem
         destino = destino_override or op.destino
 
-        # 2) valida origem
-        if not origem.exists() or not origem.is_file():
-            return ExecResultadoOp(status="SKIPPED", motivo="origem não existe ou não é ficheiro")
+        # 2) valida origem (com o stat do scan, se existir, não volta ao disco;
+        #    se o ficheiro entretanto desapareceu, o move falha e vira SKIPPED abaixo)
+        if op.stat_origem is not None:
+            CONTADOR_STAT.poupada()
+            if not stat.S_ISREG(op.stat_origem.st_mode):
+                return ExecResultadoOp(status="SKIPPED", motivo=_MOTIVO_SEM_ORIGEM)
+            # em preview não há move para falhar: um lstat confirma que ainda existe
+            if modo_preview and not os.path.lexists(origem):
+                return ExecResultadoOp(status="SKIPPED", motivo=_MOTIVO_SEM_ORIGEM)
+        elif not origem.exists() or not origem.is_file():
+            return ExecResultadoOp(status="SKIPPED", motivo=_MOTIVO_SEM_ORIGEM)
 
         # 3) preview não mexe no disco
         if modo_preview:
@@ -197,6 +211,10 @@ class ExecutorDeOperacoes:
             self._ensure_dir(destino.parent)
             shutil.move(str(origem), str(destino))
             return ExecResultadoOp(status="MOVED", motivo="OK", destino_final=destino)
+        except FileNotFoundError as e:
+            if not os.path.lexists(origem):
+                return ExecResultadoOp(status="SKIPPED", motivo=_MOTIVO_SEM_ORIGEM)
+            return ExecResultadoOp(status="ERROR", motivo=f"{type(e).__name__}: {e}", destino_final=destino)
         except Exception as e:
             return ExecResultadoOp(status="ERROR", motivo=f"{type(e).__name__}: {e}", destino_final=destino)
 
@@ -1,24 +1,84 @@
+# Módulos os/stat para guardar e interpretar o stat do ficheiro (tamanho, mtime, tipo)
+import os
+import stat
 # Classe path vai buscar os caminhos de pastas/ficheiros em Windows/Linux
 from pathlib import Path
 # Classe datetime representa a data/hora num objeto
 from datetime import datetime
 # Opção de tipo que vai permitir que em anotações de tipo exista a possibilidade de ser None sem erro
 from typing import Optional
-# Módulo que vai permitir calcular hash para comparação de duplicados
-import hashlib
+# Função que vai permitir calcular hash para comparação de duplicados
+from classes.motor_de_hash import hash_ficheiro
 # Classe Image permite abrir o ficheiro imagem e aceder a metadados do objeto imagem
 # Dicionário TAGS é um tradutor de IDs numéricos para do EXIF para nomes legíveis
 from PIL import Image, ExifTags
+# stat contado/partilhado (evita repetir exists/is_file/stat no mesmo ficheiro)
+from classes.cache_stat import CONTADOR_STAT, stat_caminho
+# Nomes dos campos (para extração preguiçosa/por pedido)
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPO_HASH, CAMPOS_EXIF
+# Interpretação rápida/tolerante das datas EXIF
+from classes.data_exif import data_de_exif
+# Data codificada no nome do ficheiro (IMG_20230514_183012.jpg, WhatsApp ...)
+from classes.data_do_nome import DataPeloNome, PoliticaData
+# Leitor de EXIF mínimo (data/GPS) sem abrir a imagem no Pillow
+from classes.leitor_exif import exif_de_pillow, ler_exif
+# Formato detetado pelos magic bytes no scan (ver tipo_de_ficheiro.py)
+from classes.tipo_de_ficheiro import descrever_falha, formato_decodificavel
 TAGS = ExifTags.TAGS
 
-class Foto:
+# bits de Foto._conhecidos (campos já extraídos numa Foto preguiçosa)
+_BITS_CAMPOS = {CAMPO_DATA: 0x1, CAMPO_GPS: 0x2, CAMPO_HASH: 0x4}
+# o EXIF já foi consultado para a data (_data_do_exif é fiável, incluindo None = sem data no EXIF)
+_BIT_DATA_EXIF = 0x8
 
-    def __init__(self, caminho: Path) -> None:
+class Foto:
+    # __slots__: sem __dict__ por instância (milhões de fotos em memória => muito menos RAM)
+    __slots__ = (
+        "_caminho",
+        "_formato",
+        "_dimensoes",
+        "_hash_visual",
+        "_data_de_captura",
+        "_data_do_exif",
+        "_local_gps",
+        "_hash_conteudo",
+        "_duplicada",
+        "_stat",
+        "_preguicosa",
+        "_conhecidos",
+        "_data_pelo_nome",
+        "_falha_descodificacao",
+    )
+
+    def __init__(
+        self,
+        caminho: Path,
+        formato: Optional[str] = None,
+        dimensoes: Optional[tuple[int, int]] = None,
+        stat_ficheiro: Optional[os.stat_result] = None,
+        preguicosa: bool = False,
+        data_pelo_nome: Optional[DataPeloNome] = None,
+        falha_descodificacao: Optional[str] = None,
+    ) -> None:
         self._caminho: Path = Path(caminho)
+        self._formato: Optional[str] = formato
+        self._dimensoes: Optional[tuple[int, int]] = dimensoes
+        self._hash_visual = None  # pHash (imagehash.ImageHash), se já foi calculado
         self._data_de_captura: Optional[datetime] = None
+        # só a data do EXIF (sem nome/mtime): é esta que o manifesto/cache guardam
+        self._data_do_exif: Optional[datetime] = None
         self._local_gps: Optional[tuple[float, float]] = None
         self._hash_conteudo: Optional[str] = None
         self._duplicada: bool = False
+        # stat do scan (DirEntry) ou da primeira consulta; reaproveitado por todas as fases
+        self._stat: Optional[os.stat_result] = stat_ficheiro
+        # preguiçosa: data/GPS/hash só são extraídos quando alguém os lê (e ficam memorizados)
+        self._preguicosa: bool = preguicosa
+        self._conhecidos: int = 0
+        # data pelo nome do ficheiro (política + padrões, partilhada pelo scan); None = só EXIF/mtime
+        self._data_pelo_nome: Optional[DataPeloNome] = data_pelo_nome
+        # primeira falha do Pillow com este ficheiro (motivo); as fases seguintes já nem tentam
+        self._falha_descodificacao: Optional[str] = falha_descodificacao
 
     # --- Atributos ---
     @property
@@ -29,68 +89,225 @@ class Foto:
     def nome_de_ficheiro(self) -> str:
         return self._caminho.name
 
+    @property
+    def formato(self) -> Optional[str]:
+        """Formato real ("JPEG", "PNG", ...) se o scan o detetou; None se não foi verificado."""
+        return self._formato
+
+    @property
+    def decodificavel(self) -> bool:
+        """False quando já se sabe que o Pillow não abre este ficheiro (evita tentativas inúteis)."""
+        return self._falha_descodificacao is None and formato_decodificavel(self._formato)
+
+    @property
+    def falha_descodificacao(self) -> Optional[str]:
+        """Porque é que o ficheiro não é descodificável (formato sem suporte ou falha registada); None se for."""
+        if self._falha_descodificacao is not None:
+            return self._falha_descodificacao
+        if not formato_decodificavel(self._formato):
+            return f"formato sem suporte no Pillow: {self._formato}"
+        return None
+
+    @property
+    def dimensoes(self) -> Optional[tuple[int, int]]:
+        """(largura, altura) se já foram lidas (ex.: no check de imagens grandes)."""
+        return self._dimensoes
+
     @property
     def data_de_captura(self) -> Optional[datetime]:
+        if self._preguicosa and not self._conhecidos & _BITS_CAMPOS[CAMPO_DATA]:
+            self.extrair_metadados(campos=(CAMPO_DATA,))
         return self._data_de_captura
 
+    @property
+    def data_do_exif(self) -> Optional[datetime]:
+        """Data tirada do EXIF (None se o EXIF não a tem ou ainda não foi consultado)."""
+        return self._data_do_exif
+
+    @property
+    def data_do_exif_conhecida(self) -> bool:
+        """O EXIF já foi consultado para a data? (não, p.ex., se a data veio só do nome)"""
+        return bool(self._conhecidos & _BIT_DATA_EXIF)
+
     @property
     def local_gps(self) -> Optional[tuple[float, float]]:
+        if self._preguicosa and not self._conhecidos & _BITS_CAMPOS[CAMPO_GPS]:
+            self.extrair_metadados(campos=(CAMPO_GPS,))
         return self._local_gps
 
     @property
     def hash_conteudo(self) -> Optional[str]:
+        if self._preguicosa and not self._conhecidos & _BITS_CAMPOS[CAMPO_HASH]:
+            self.calcular_hash()
         return self._hash_conteudo
 
+    @property
+    def hash_visual(self):
+        """pHash já calculado (ex.: pelo AnalisadorDeFotos) ou None."""
+        return self._hash_visual
+
     @property
     def duplicada(self) -> bool:
         return self._duplicada
 
+    @property
+    def stat_ficheiro(self) -> Optional[os.stat_result]:
+        """stat já conhecido (scan ou consulta anterior); None se ainda não foi lido."""
+        return self._stat
+
+    def obter_stat(self) -> Optional[os.stat_result]:
+        """stat do ficheiro, pedido ao sistema no máximo uma vez. None se não existir."""
+        if self._stat is not None:
+            CONTADOR_STAT.poupada()
+            return self._stat
+        self._stat = stat_caminho(self._caminho)
+        return self._stat
+
+    def conhecido(self, campo: str) -> bool:
+        """O campo já foi extraído? (numa Foto não preguiçosa: sempre True)"""
+        bit = _BITS_CAMPOS.get(campo)
+        return not self._preguicosa or bit is None or bool(self._conhecidos & bit)
+
+    def valor_conhecido(self, campo: str):
+        """Valor do campo sem o extrair (None se ainda não foi extraído)."""
+        if not self.conhecido(campo):
+            return None
+        return getattr(self, "_" + campo)
+
+    def registar_falha_descodificacao(self, motivo: str) -> None:
+        """Guarda a primeira falha do Pillow (ficheiro truncado, HEIC sem plugin, ...)."""
+        if self._falha_descodificacao is None:
+            self._falha_descodificacao = motivo
+
+    def _marcar_conhecidos(self, campos) -> None:
+        for campo in campos:
+            self._conhecidos |= _BITS_CAMPOS.get(campo, 0)
+
+    def _e_ficheiro(self) -> bool:
+        st = self.obter_stat()
+        return st is not None and stat.S_ISREG(st.st_mode)
+
     # --- métodos ---
 
-    def extrair_metadados(self) -> None:
+    def extrair_metadados(self, campos=None) -> None:
         """
         Preenche data_de_captura e local_gps.
 
-        - Data: tenta EXIF (DateTimeOriginal/Digitized/DateTime); se falhar usa mtime.
+        - Data: tenta EXIF (DateTimeOriginal/Digitized/DateTime, com subsegundos e fuso); se falhar usa mtime.
+          Com data_pelo_nome, o nome do ficheiro entra segundo a política (ver PoliticaData);
+          nome primeiro/só nome: se o nome resolver a data, o ficheiro nem é aberto para ela.
         - GPS: tenta EXIF GPSInfo; se falhar ou não existir fica None.
+        - campos: só estes (ex.: ("data_de_captura",) nem interpreta o GPS); None = ambos
         """
+        campos = CAMPOS_EXIF if campos is None else CAMPOS_EXIF.intersection(campos)
 
-        # Se o ficheiro não existir
-        if not self._caminho.exists() or not self._caminho.is_file():
+        # Se o ficheiro não existir (stat do scan, sem voltar ao disco)
+        if not self._e_ficheiro():
+            self._marcar_conhecidos(campos)
             return
 
-        self._data_de_captura = None
-        self._local_gps = None
+        if CAMPO_DATA in campos and self.aplicar_data_do_nome():
+            campos = campos - {CAMPO_DATA}
+            if not campos:
+                return
+
+        if CAMPO_DATA in campos:
+            self._data_de_captura = None
+        if CAMPO_GPS in campos:
+            self._local_gps = None
+
+        # Formato sem suporte no Pillow (ex.: HEIC sem plugin) ou que já falhou antes: nem tenta abrir
+        if not self.decodificavel:
+            if CAMPO_DATA in campos:
+                self._preencher_data({})
+            self._marcar_conhecidos(campos)
+            return
 
         try:
-            with Image.open(self._caminho) as img:
-                exif = img.getexif()
+            # JPEG/TIFF: só os IFD necessários, lidos à mão; o resto (ou se falhar) vai pelo Pillow
+            exif = ler_exif(self._caminho, campos)
+            if exif is None:
+                with Image.open(self._caminho) as img:
+                    exif = exif_de_pillow(img.getexif())
+            self.preencher_a_partir_do_exif(exif, campos)
+
+        except Exception as e:
+            # mantém o comportamento simples: se algo falhar, pelo menos a data vem do nome/sistema
+            self.registar_falha_descodificacao(descrever_falha(e))
+            if CAMPO_DATA in campos:
+                self._preencher_data({})
+            self._marcar_conhecidos(campos)
+
+    def preencher_a_partir_do_exif(self, exif, campos=None) -> None:
+        """
+        Preenche data_de_captura e local_gps a partir de um mapeamento EXIF já lido
+        (ex.: img.getexif() de uma imagem aberta noutro sítio, sem voltar a abrir o ficheiro).
+        Um mapeamento vazio equivale a "sem EXIF": data do nome (se configurado) ou do mtime, e sem GPS.
+        campos: como em extrair_metadados.
+        """
+        campos = CAMPOS_EXIF if campos is None else CAMPOS_EXIF.intersection(campos)
 
-            # 36867: DateTimeOriginal | 36868: DateTimeDigitized | 306: DateTime
-            data_str = exif.get(36867) or exif.get(36868) or exif.get(306)
+        if CAMPO_DATA in campos:
+            self._preencher_data(exif)
 
-            if data_str:
-                try:
-                    self._data_de_captura = datetime.strptime(str(data_str), "%Y:%m:%d %H:%M:%S")
-                except ValueError:
-                    self._preencher_data_a_partir_do_sistema()
-            else:
-                self._preencher_data_a_partir_do_sistema()
+        if CAMPO_GPS in campos:
+            self._local_gps = None
 
             # GPSInfo (34853) — fica None se não existir/der erro
             gps_info = exif.get(34853)
             if gps_info:
                 self._local_gps = self._extrair_gps(gps_info)
 
-        except Exception:
-            # mantém o comportamento simples: se algo falhar, pelo menos a data vem do sistema
+        self._marcar_conhecidos(campos)
+
+    def aplicar_data_do_nome(self) -> bool:
+        """
+        Política nome primeiro/só nome: resolve a data sem abrir o ficheiro.
+        Devolve True se a data ficou resolvida (pelo nome; ou mtime, em só nome).
+        """
+        config = self._data_pelo_nome
+        if config is None or not config.prefere_nome:
+            return False
+        data = config.data(self.nome_de_ficheiro)
+        if data is None and config.politica is not PoliticaData.SO_NOME:
+            return False
+        self._data_de_captura = data
+        if data is None:
+            self._preencher_data_a_partir_do_sistema()
+        self._marcar_conhecidos((CAMPO_DATA,))
+        return True
+
+    def _preencher_data(self, exif) -> None:
+        """Data segundo a política: EXIF e/ou nome do ficheiro; mtime em último recurso."""
+        # 36867: DateTimeOriginal | 36868: DateTimeDigitized | 306: DateTime
+        # (+ SubSecTime*/OffsetTime*); uma data inválida passa à tag seguinte, não ao mtime
+        self._data_do_exif = data_de_exif(exif)
+        self._conhecidos |= _BIT_DATA_EXIF
+        self._resolver_data()
+
+    def _resolver_data(self) -> None:
+        """data_de_captura a partir da data do EXIF já conhecida, do nome e do mtime, segundo a política."""
+        config = self._data_pelo_nome
+        if config is None:
+            data = self._data_do_exif
+        elif config.politica is PoliticaData.SO_NOME:
+            data = config.data(self.nome_de_ficheiro)
+        elif config.politica is PoliticaData.NOME_PRIMEIRO:
+            data = config.data(self.nome_de_ficheiro) or self._data_do_exif
+        else:
+            data = self._data_do_exif or config.data(self.nome_de_ficheiro)
+
+        self._data_de_captura = data
+        if data is None:
             self._preencher_data_a_partir_do_sistema()
 
     def _preencher_data_a_partir_do_sistema(self) -> None:
         """ Em caso de EXIF não existir, usa-se a data da modificação do ficheiro."""
 
-        # Recebe os metadados fornecidos pelo métodoo '.stat()'
-        info = self._caminho.stat()
+        # Recebe os metadados fornecidos pelo stat (guardado do scan, se existir)
+        info = self.obter_stat()
+        if info is None:
+            return
 
         # Funciona para todos os sistemas operativos
         ts = info.st_mtime
@@ -102,19 +319,69 @@ class Foto:
         risco de segurança, a não ser que seja definido outra acho no parâmetro
         quando chamar função (ex.: .calcular_hash("sha256"))
         """
+        self._marcar_conhecidos((CAMPO_HASH,))
         # Se o ficheiro não existir ou não for um ficheiro normal
-        if not self._caminho.exists() or not self._caminho.is_file():
+        if not self._e_ficheiro():
             return
-        # Instanciação de um objeto hash_
-        hash_ = hashlib.new(algoritmo)
-
-        # Abre o ficheiro e lê em modo binário 'rb'
-        with self._caminho.open("rb") as f:
-            for bloco in iter(lambda: f.read(8192), b""):
-                hash_.update(bloco)
-
-        # Guarda o hash final como uma string hexadecimal
-        self._hash_conteudo = hash_.hexdigest()
+        # Blocos grandes (1 MB) com buffer reaproveitado
+        hash_conteudo = hash_ficheiro(self._caminho, algoritmo, verificar=False)
+        if hash_conteudo is not None:
+            # Guarda o hash final como uma string hexadecimal
+            self._hash_conteudo = hash_conteudo
+
+    def aplicar_metadados(
+        self,
+        data_de_captura: Optional[datetime],
+        local_gps: Optional[tuple[float, float]],
+        hash_conteudo: Optional[str],
+    ) -> None:
+        """Preenche os campos com resultados já conhecidos (ex.: manifesto de um scan anterior)."""
+        self._data_de_captura = data_de_captura
+        self._local_gps = local_gps
+        self._hash_conteudo = hash_conteudo
+        self._marcar_conhecidos((CAMPO_DATA, CAMPO_GPS, CAMPO_HASH))
+
+    def reaplicar_metadados(
+        self,
+        data_do_exif: Optional[datetime],
+        local_gps: Optional[tuple[float, float]],
+        hash_conteudo: Optional[str],
+    ) -> None:
+        """
+        Preenche os campos guardados no manifesto/cache. A data guardada é só a do EXIF
+        (None = sem data no EXIF): a data de captura volta a passar por EXIF -> nome -> mtime
+        segundo a política desta execução, que pode não ser a da execução que a guardou.
+        Sem hash guardado (None: não foi calculado), o hash fica por conhecer.
+        """
+        self.definir_data_do_exif(data_do_exif)
+        self._resolver_data()
+        self._local_gps = local_gps
+        self._marcar_conhecidos((CAMPO_DATA, CAMPO_GPS))
+        if hash_conteudo is not None:
+            self._hash_conteudo = hash_conteudo
+            self._marcar_conhecidos((CAMPO_HASH,))
+
+    def definir_data_do_exif(self, data_do_exif: Optional[datetime]) -> None:
+        self._data_do_exif = data_do_exif
+        self._conhecidos |= _BIT_DATA_EXIF
+
+    def definir_data_de_captura(self, data_de_captura: Optional[datetime]) -> None:
+        self._data_de_captura = data_de_captura
+        self._marcar_conhecidos((CAMPO_DATA,))
+
+    def definir_local_gps(self, local_gps: Optional[tuple[float, float]]) -> None:
+        self._local_gps = local_gps
+        self._marcar_conhecidos((CAMPO_GPS,))
+
+    def definir_dimensoes(self, dimensoes: Optional[tuple[int, int]]) -> None:
+        self._dimensoes = dimensoes
+
+    def definir_hash_conteudo(self, hash_conteudo: Optional[str]) -> None:
+        self._hash_conteudo = hash_conteudo
+        self._marcar_conhecidos((CAMPO_HASH,))
+
+    def definir_hash_visual(self, hash_visual) -> None:
+        self._hash_visual = hash_visual
 
     def marcar_como_duplicado(self) -> None:
         """Apenas altera o estado de duplicado: Boolean """
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import io
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import imagehash
+from PIL import Image
+
+from classes.leitor_exif import ler_miniatura_exif
+from classes.tipo_de_ficheiro import descrever_falha
+
+
+# O pHash reduz tudo a 32×32: descodificar mais do que isto (lado menor) é desperdício.
+# Imagens com lado menor < 2 × LADO_PHASH são descodificadas como antes (hash igual ao de sempre).
+LADO_PHASH = 512
+
+# Modos em que reduce() faz a média dos pixels; os outros (1, P/PA com índices de paleta,
+# I;16*) passam primeiro a "L", que é o que o pHash usa de qualquer forma
+_MODOS_REDUZIVEIS = frozenset({"L", "LA", "I", "F", "RGB", "RGBA", "RGBX", "CMYK", "YCbCr"})
+
+# Fotos por tarefa enviada ao pool (menos idas e voltas entre processos)
+LOTE_PHASH = 16
+
+
+def reduzir_para_phash(img: Image.Image, lado: int = LADO_PHASH) -> Image.Image:
+    """
+    Imagem pronta para o imagehash.phash, sem descodificar a resolução nativa quando não é preciso.
+
+    - JPEG: draft() pede ao descodificador 1/2, 1/4 ou 1/8 da escala (e só a luminância, que é o
+      que o pHash usa): um JPEG de 48 MP sai com ~750 k pixels, sem nunca existir em tamanho real
+    - outros formatos: descodificação normal seguida de reduce() (média por blocos, rápida) para
+      que o resize final do pHash trabalhe sobre poucos pixels; modos que o reduce() não aceita
+      (paleta, 1 bit, 16 bits) são convertidos para "L" antes
+    Tem de ser chamada antes de a imagem ser carregada (load) para o draft ter efeito.
+    """
+    largura, altura = img.size
+    fator = min(largura, altura) // lado
+    if fator < 2:
+        return img
+    if img.format == "JPEG":
+        img.draft("L", (lado, lado))
+        largura, altura = img.size
+        fator = min(largura, altura) // lado
+        if fator < 2:
+            return img
+    if img.mode not in _MODOS_REDUZIVEIS:
+        img = img.convert("L")
+    return img.reduce(fator)
+
+
+def hash_visual_de_imagem(img: Image.Image) -> imagehash.ImageHash:
+    """pHash de uma imagem já aberta (ainda não carregada), via reduzir_para_phash."""
+    return imagehash.phash(reduzir_para_phash(img))
+
+
+def calcular_hash_visual(caminho: Path) -> imagehash.ImageHash:
+    """pHash do ficheiro. Erros do Pillow (HEIC sem plugin, truncado, ...) sobem para quem chama."""
+    with Image.open(caminho) as img:
+        return hash_visual_de_imagem(img)
+
+
+def hash_visual_da_miniatura(caminho: Path) -> Optional[imagehash.ImageHash]:
+    """
+    pHash da miniatura JPEG embutida no EXIF (160×120 chega para o 32×32 do pHash): lê alguns KB
+    do APP1 em vez de descodificar a imagem. None se não houver miniatura ou se não abrir
+    (quem chama faz a descodificação completa).
+
+    Atenção: a miniatura pode não corresponder à imagem (editores que recortam sem a atualizar,
+    barras pretas em 16:9); ver DetetarDuplicados(verificar_miniatura=True).
+    """
+    dados = ler_miniatura_exif(caminho)
+    if dados is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(dados)) as img:
+            return imagehash.phash(img)
+    except Exception:
+        return None
+
+
+def _hash_visual_ou_falha(caminho: str, max_pixeis: Optional[int]) -> Tuple[Optional[str], Optional[str]]:
+    """Corre num processo worker: (pHash em hex, None) ou (None, motivo da falha)."""
+    # o processo pode não ter herdado as decisões do principal (ex.: spawn)
+    Image.MAX_IMAGE_PIXELS = max_pixeis
+    warnings.filterwarnings("ignore", category=Image.DecompressionBombWarning)
+    try:
+        return str(calcular_hash_visual(Path(caminho))), None
+    except Exception as e:
+        return None, descrever_falha(e)
+
+
+def _lote_hash_visual(caminhos: List[str], max_pixeis: Optional[int]) -> List[Tuple[Optional[str], Optional[str]]]:
+    return [_hash_visual_ou_falha(c, max_pixeis) for c in caminhos]
+
+
+def calcular_hashes_visuais(
+    caminhos: Sequence[Path],
+    workers: int,
+    tamanho_lote: int = LOTE_PHASH,
+) -> Dict[Path, Tuple[Optional[imagehash.ImageHash], Optional[str]]]:
+    """
+    pHash de vários ficheiros num pool de `workers` processos (0 = um por core).
+    Devolve {caminho: (pHash, None) ou (None, motivo)}; nenhuma exceção do Pillow sobe.
+    """
+    workers = workers or os.cpu_count() or 1
+    nomes = [str(c) for c in caminhos]
+    lotes = [nomes[i:i + tamanho_lote] for i in range(0, len(nomes), max(1, tamanho_lote))]
+    resultados: Dict[Path, Tuple[Optional[imagehash.ImageHash], Optional[str]]] = {}
+    with ProcessPoolExecutor(max_workers=min(workers, max(1, len(lotes)))) as executor:
+        futuros = [executor.submit(_lote_hash_visual, lote, Image.MAX_IMAGE_PIXELS) for lote in lotes]
+        for lote, futuro in zip(lotes, futuros):
+            for caminho, (hex_, motivo) in zip(lote, futuro.result()):
+                h = imagehash.hex_to_hash(hex_) if hex_ is not None else None
+                resultados[Path(caminho)] = (h, motivo)
+    return resultados
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+
+class IndiceHamming:
+    """
+    Índice de hashes (inteiros de `bits` bits) para "quais estão a distância de Hamming <= t?".
+
+    Multi-index hashing: o hash é partido em t+1 faixas contíguas e cada faixa tem a sua
+    tabela (valor da faixa -> posições). Pelo princípio da gaveta, dois hashes a distância
+    <= t coincidem exatamente em pelo menos uma faixa: basta verificar os candidatos dos
+    baldes dessas faixas, em vez de comparar com todos os hashes já inseridos.
+
+    As posições são a ordem de inserção (0, 1, 2, ...), o que permite responder "qual é o
+    primeiro dentro da distância" exatamente como uma pesquisa linear pela mesma ordem.
+    """
+
+    def __init__(self, distancia_maxima: int, bits: int = 64) -> None:
+        self._distancia = distancia_maxima
+        self._bits = bits
+        self._valores: List[int] = []
+        # distância >= bits: tudo corresponde (faixas não ajudam); < 0: nada corresponde
+        n_faixas = distancia_maxima + 1 if 0 <= distancia_maxima < bits else 0
+        self._faixas: List[Tuple[int, int]] = faixas_de_bits(bits, n_faixas)
+        self._tabelas: List[Dict[int, List[int]]] = [{} for _ in self._faixas]
+
+    @property
+    def distancia_maxima(self) -> int:
+        return self._distancia
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+    def adicionar(self, valor: int) -> int:
+        """Insere o hash e devolve a sua posição."""
+        posicao = len(self._valores)
+        self._valores.append(valor)
+        for (deslocamento, mascara), tabela in zip(self._faixas, self._tabelas):
+            tabela.setdefault((valor >> deslocamento) & mascara, []).append(posicao)
+        return posicao
+
+    def primeiro_dentro(self, valor: int) -> Optional[int]:
+        """Posição do hash mais antigo a distância <= distancia_maxima (None se nenhum)."""
+        if not self._faixas:
+            return 0 if self._valores and self._distancia >= 0 else None
+        melhor: Optional[int] = None
+        for (deslocamento, mascara), tabela in zip(self._faixas, self._tabelas):
+            for posicao in tabela.get((valor >> deslocamento) & mascara, ()):
+                # posições crescentes dentro do balde: a partir daqui nenhuma melhora
+                if melhor is not None and posicao >= melhor:
+                    break
+                if (self._valores[posicao] ^ valor).bit_count() <= self._distancia:
+                    melhor = posicao
+                    break
+        return melhor
+
+    def dentro(self, valor: int) -> List[int]:
+        """Posições (por ordem) de todos os hashes a distância <= distancia_maxima."""
+        if not self._faixas:
+            return list(range(len(self._valores))) if self._distancia >= 0 else []
+        candidatos = set()
+        for (deslocamento, mascara), tabela in zip(self._faixas, self._tabelas):
+            candidatos.update(tabela.get((valor >> deslocamento) & mascara, ()))
+        return sorted(p for p in candidatos if (self._valores[p] ^ valor).bit_count() <= self._distancia)
+
+
+def faixas_de_bits(bits: int, n: int) -> List[Tuple[int, int]]:
+    """(deslocamento, máscara) de n faixas contíguas que cobrem os bits (tamanhos a diferir no máximo 1)."""
+    faixas = []
+    inicio = 0
+    for i in range(n):
+        largura = bits // n + (1 if i < bits % n else 0)
+        faixas.append((inicio, (1 << largura) - 1))
+        inicio += largura
+    return faixas
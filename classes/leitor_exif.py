@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPOS_EXIF
+from classes.data_exif import TAGS_DATA_EXIF
+
+
+# Leitura inicial: chega para o APP0/APP1 de quase todos os JPEG (o APP1 tem no máximo 64 KB)
+TAMANHO_LEITURA_EXIF = 64 * 1024
+
+# Tags usadas por Foto.preencher_a_partir_do_exif
+TAG_DATA_ORIGINAL = 36867
+TAG_DATA_DIGITALIZADA = 36868
+TAG_DATA = 306
+TAG_IFD_EXIF = 0x8769
+TAG_IFD_GPS = 34853  # GPSInfo (0x8825)
+# Miniatura JPEG no IFD1 (JPEGInterchangeFormat / JPEGInterchangeFormatLength)
+TAG_MINIATURA_INICIO = 0x0201
+TAG_MINIATURA_TAMANHO = 0x0202
+
+# datas + SubSecTime* + OffsetTime* (ver data_exif.TAGS_DATA_EXIF)
+_TAGS_DATA = tuple(tag for trio in TAGS_DATA_EXIF for tag in trio)
+_TAGS_GPS = (1, 2, 3, 4)  # LatitudeRef, Latitude, LongitudeRef, Longitude
+
+# Bytes por valor de cada tipo TIFF (1 BYTE, 2 ASCII, 3 SHORT, 4 LONG, 5 RATIONAL, 7 UNDEFINED, ...)
+_TAMANHO_TIPO = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+_ASCII = 2
+_RATIONAL = 5
+_SRATIONAL = 10
+
+# Proteção contra ficheiros corrompidos (contagens absurdas)
+_MAX_ENTRADAS_IFD = 1024
+
+Bloco = Union[bytes, memoryview]
+_Entrada = Tuple[int, int, int]  # (tipo, contagem, posição do valor)
+
+
+def ler_exif(caminho: Path, campos: Optional[Iterable[str]] = None) -> Optional[Dict[int, object]]:
+    """
+    Lê só a data e o GPS do EXIF, sem Image.open nem o getexif() completo.
+
+    Percorre os segmentos do JPEG até ao APP1 "Exif" (ou lê o IFD0 de um TIFF) a partir de
+    uma leitura limitada do início do ficheiro, e visita apenas os IFD necessários.
+
+    Devolve um dicionário no formato que Foto.preencher_a_partir_do_exif espera:
+      {36867/36868/306: "AAAA:MM:DD HH:MM:SS", 34853: {1: "N", 2: ((num, den), ...), ...}}
+    - {} => JPEG/TIFF sem EXIF (resposta definitiva)
+    - None => formato não suportado ou estrutura inesperada: usar o Pillow
+    campos: como em Foto.extrair_metadados (None = data e GPS)
+    """
+    try:
+        with open(caminho, "rb") as f:
+            tiff = _bloco_tiff(f.read(TAMANHO_LEITURA_EXIF), f)
+            return _exif_de_bloco(tiff, campos)
+    except OSError:
+        return None
+
+
+def exif_de_bytes(dados, campos: Optional[Iterable[str]] = None) -> Optional[Dict[int, object]]:
+    """Igual a ler_exif, mas sobre o ficheiro já em memória (bytes ou mmap, ex.: AnalisadorDeFotos)."""
+    return _exif_de_bloco(_bloco_tiff(dados, None), campos)
+
+
+def ler_miniatura_exif(caminho: Path) -> Optional[bytes]:
+    """
+    Bytes da miniatura JPEG embutida no EXIF (IFD1; tipicamente 160×120), lidos do APP1
+    sem descodificar a imagem. None se não houver miniatura ou se o EXIF não for legível.
+    """
+    try:
+        with open(caminho, "rb") as f:
+            tiff = _bloco_tiff(f.read(TAMANHO_LEITURA_EXIF), f)
+    except OSError:
+        return None
+    if not tiff:
+        return None
+    try:
+        return _miniatura_de_bloco(tiff)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def exif_de_pillow(exif) -> Mapping:
+    """
+    Normaliza o img.getexif() do Pillow para o mesmo formato.
+
+    O getexif() só traz o IFD0: DateTimeOriginal/Digitized (e SubSec/Offset) vivem no IFD Exif e em 34853
+    fica apenas o offset do IFD GPS. Mapeamentos simples (sem get_ifd) passam tal como estão.
+    """
+    get_ifd = getattr(exif, "get_ifd", None)
+    if get_ifd is None:
+        return exif
+
+    mapa = dict(exif)
+    try:
+        ifd_exif = get_ifd(TAG_IFD_EXIF)
+        gps = get_ifd(0x8825)
+    except Exception:
+        mapa.pop(TAG_IFD_GPS, None)
+        return mapa
+
+    for tag in _TAGS_DATA:
+        if ifd_exif.get(tag):
+            mapa[tag] = ifd_exif[tag]
+    if gps:
+        mapa[TAG_IFD_GPS] = dict(gps)
+    else:
+        mapa.pop(TAG_IFD_GPS, None)
+    return mapa
+
+
+# ------------------------
+# Contentor (JPEG/TIFF) -> bloco TIFF
+# ------------------------
+
+def _bloco_tiff(dados: bytes, f: Optional[BinaryIO]) -> Optional[Bloco]:
+    """Bloco TIFF com o EXIF; b"" se o ficheiro não tiver EXIF; None se não souber ler."""
+    # dados pode ser bytes ou um mmap (ficheiros grandes): só slicing/indexação
+    if dados[:2] == b"\xff\xd8":
+        return _app1_exif(dados, f)
+    if dados[:4] in (b"II*\x00", b"MM\x00*"):
+        # TIFF (e RAW baseados em TIFF): os offsets são relativos ao início do ficheiro
+        return memoryview(dados)
+    return None
+
+
+def _app1_exif(dados: bytes, f: Optional[BinaryIO]) -> Optional[Bloco]:
+    pos = 2
+    while True:
+        if pos + 4 > len(dados):
+            return None  # o APP1 (se existir) está para lá da leitura inicial
+        if dados[pos] != 0xFF:
+            return None
+        marcador = dados[pos + 1]
+        if marcador == 0xFF:  # padding
+            pos += 1
+            continue
+        if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7:  # sem payload
+            pos += 2
+            continue
+        if marcador in (0xD9, 0xDA):  # EOI / início da imagem: não há EXIF
+            return b""
+        (tamanho,) = struct.unpack_from(">H", dados, pos + 2)
+        if tamanho < 2:
+            return None
+        fim = pos + 2 + tamanho
+        if marcador == 0xE1 and dados[pos + 4:pos + 10] == b"Exif\x00\x00":
+            if fim > len(dados):
+                # APP1 cortado pela leitura inicial: lê só o que falta do segmento
+                if f is None:
+                    return None
+                dados = dados + f.read(fim - len(dados))
+                if fim > len(dados):
+                    return None
+            return memoryview(dados)[pos + 10:fim]
+        pos = fim
+
+
+# ------------------------
+# Bloco TIFF -> tags
+# ------------------------
+
+def _exif_de_bloco(tiff: Optional[Bloco], campos: Optional[Iterable[str]]) -> Optional[Dict[int, object]]:
+    if tiff is None:
+        return None
+    if not len(tiff):
+        return {}
+    campos = CAMPOS_EXIF if campos is None else CAMPOS_EXIF.intersection(campos)
+    try:
+        return _ler_tiff(tiff, campos)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def _cabecalho_tiff(tiff: Bloco) -> Optional[Tuple[str, int]]:
+    """(formato struct "<"/">", offset do IFD0) ou None se não for um cabeçalho TIFF."""
+    if len(tiff) < 8:
+        return None
+    ordem = bytes(tiff[:2])
+    if ordem == b"II":
+        fmt = "<"
+    elif ordem == b"MM":
+        fmt = ">"
+    else:
+        return None
+    magico, ifd0 = struct.unpack_from(fmt + "HI", tiff, 2)
+    if magico != 42:
+        return None
+    return fmt, ifd0
+
+
+def _ler_tiff(tiff: Bloco, campos) -> Optional[Dict[int, object]]:
+    cabecalho = _cabecalho_tiff(tiff)
+    if cabecalho is None:
+        return None
+    fmt, ifd0 = cabecalho
+
+    exif: Dict[int, object] = {}
+    queridas = {TAG_IFD_EXIF, TAG_IFD_GPS, *_TAGS_DATA}
+    entradas = _ler_ifd(tiff, fmt, ifd0, queridas)
+
+    if CAMPO_DATA in campos:
+        # Há quem escreva as datas no IFD0 (ex.: Pillow); o normal é o IFD Exif
+        _copiar_textos(tiff, entradas, _TAGS_DATA, exif)
+        if TAG_IFD_EXIF in entradas:
+            ifd_exif = _offset(tiff, fmt, entradas[TAG_IFD_EXIF])
+            _copiar_textos(tiff, _ler_ifd(tiff, fmt, ifd_exif, _TAGS_DATA), _TAGS_DATA, exif)
+
+    if CAMPO_GPS in campos and TAG_IFD_GPS in entradas:
+        ifd_gps = _offset(tiff, fmt, entradas[TAG_IFD_GPS])
+        entradas_gps = _ler_ifd(tiff, fmt, ifd_gps, _TAGS_GPS)
+        gps: Dict[int, object] = {}
+        _copiar_textos(tiff, entradas_gps, (1, 3), gps)
+        for tag in (2, 4):
+            if tag in entradas_gps:
+                gps[tag] = _racionais(tiff, fmt, entradas_gps[tag])
+        if gps:
+            exif[TAG_IFD_GPS] = gps
+
+    return exif
+
+
+def _ler_ifd(tiff: Bloco, fmt: str, inicio: int, queridas) -> Dict[int, _Entrada]:
+    """Só guarda (tipo, contagem, posição do valor) das tags pedidas; não descodifica nada."""
+    (n,) = struct.unpack_from(fmt + "H", tiff, inicio)
+    if n > _MAX_ENTRADAS_IFD:
+        raise ValueError("IFD com demasiadas entradas")
+    entradas: Dict[int, _Entrada] = {}
+    for i in range(n):
+        base = inicio + 2 + i * 12
+        tag, tipo, contagem = struct.unpack_from(fmt + "HHI", tiff, base)
+        if tag not in queridas:
+            continue
+        tamanho = _TAMANHO_TIPO.get(tipo, 1) * contagem
+        if tamanho <= 4:
+            entradas[tag] = (tipo, contagem, base + 8)  # valor no próprio campo
+        else:
+            (pos,) = struct.unpack_from(fmt + "I", tiff, base + 8)
+            if pos + tamanho > len(tiff):
+                raise ValueError("valor fora do bloco lido")
+            entradas[tag] = (tipo, contagem, pos)
+    return entradas
+
+
+def _miniatura_de_bloco(tiff: Bloco) -> Optional[bytes]:
+    cabecalho = _cabecalho_tiff(tiff)
+    if cabecalho is None:
+        return None
+    fmt, ifd0 = cabecalho
+    # o IFD1 (miniatura) vem a seguir às entradas do IFD0: offset nos 4 bytes finais do IFD0
+    (n,) = struct.unpack_from(fmt + "H", tiff, ifd0)
+    (ifd1,) = struct.unpack_from(fmt + "I", tiff, ifd0 + 2 + 12 * n)
+    if not ifd1:
+        return None
+    entradas = _ler_ifd(tiff, fmt, ifd1, (TAG_MINIATURA_INICIO, TAG_MINIATURA_TAMANHO))
+    if TAG_MINIATURA_INICIO not in entradas or TAG_MINIATURA_TAMANHO not in entradas:
+        return None
+    inicio = _offset(tiff, fmt, entradas[TAG_MINIATURA_INICIO])
+    tamanho = _offset(tiff, fmt, entradas[TAG_MINIATURA_TAMANHO])
+    if not tamanho or inicio + tamanho > len(tiff):
+        return None
+    miniatura = bytes(tiff[inicio:inicio + tamanho])
+    return miniatura if miniatura[:2] == b"\xff\xd8" else None
+
+
+def _offset(tiff: Bloco, fmt: str, entrada: _Entrada) -> int:
+    tipo, _contagem, pos = entrada
+    if tipo == 3:
+        return struct.unpack_from(fmt + "H", tiff, pos)[0]
+    return struct.unpack_from(fmt + "I", tiff, pos)[0]
+
+
+def _copiar_textos(tiff: Bloco, entradas: Dict[int, _Entrada], tags, destino: Dict[int, object]) -> None:
+    for tag in tags:
+        entrada = entradas.get(tag)
+        if entrada is None or entrada[0] != _ASCII:
+            continue
+        _tipo, contagem, pos = entrada
+        texto = bytes(tiff[pos:pos + contagem]).split(b"\x00", 1)[0]
+        if texto:
+            destino[tag] = texto.decode("ascii", "replace")
+
+
+def _racionais(tiff: Bloco, fmt: str, entrada: _Entrada) -> Tuple[Tuple[int, int], ...]:
+    """(num, den) por valor, como o Foto._gps_coord_to_deg aceita."""
+    tipo, contagem, pos = entrada
+    if tipo == _RATIONAL:
+        valores = struct.unpack_from(f"{fmt}{2 * contagem}I", tiff, pos)
+    elif tipo == _SRATIONAL:
+        valores = struct.unpack_from(f"{fmt}{2 * contagem}i", tiff, pos)
+    else:
+        raise ValueError("coordenada GPS sem formato racional")
+    return tuple(zip(valores[0::2], valores[1::2]))
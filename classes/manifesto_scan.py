@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from classes.campos_foto import CAMPO_HASH, valor_conhecido
+from classes.foto import Foto
+
+
+NOME_MANIFESTO = "Foto_Organizada.manifesto.json"
+VERSAO_MANIFESTO = 2  # 2: guarda só a data do EXIF (antes: a data final, com nome/mtime)
+
+
+@dataclass(frozen=True)
+class EntradaManifesto:
+    """
+    Identidade do ficheiro (tamanho, mtime_ns, inode) + resultados já calculados.
+    data_do_exif: só a data do EXIF (None = sem data no EXIF); nome/mtime são reaplicados ao reutilizar.
+    hash_conteudo: None se não foi calculado (ex.: tamanho único, ver DetetarDuplicados.detetar).
+    """
+    tamanho: int
+    mtime_ns: int
+    inode: int
+    data_do_exif: Optional[datetime]
+    local_gps: Optional[tuple[float, float]]
+    hash_conteudo: Optional[str]
+
+    def corresponde(self, st: os.stat_result) -> bool:
+        return (
+            self.tamanho == st.st_size
+            and self.mtime_ns == st.st_mtime_ns
+            and self.inode == st.st_ino
+        )
+
+
+def caminho_manifesto(raiz_destino: Path) -> Path:
+    """O manifesto fica AO LADO da raiz destino (não dentro, para não ser "organizado")."""
+    return raiz_destino.parent / NOME_MANIFESTO
+
+
+class ManifestoScan:
+    """
+    Manifesto persistido de um scan anterior (JSON).
+
+    - reutilizar(foto, st): se o ficheiro não mudou, preenche a Foto sem abrir o ficheiro
+    - registar(foto, st): guarda os resultados de um ficheiro novo/alterado
+    - guardar(): escreve as entradas vistas nesta execução e mantém as anteriores que não foram
+      vistas (--limite, imagens grandes ignoradas, extração parcial) enquanto o ficheiro existir
+
+    Um manifesto inexistente, corrompido ou de outra versão é tratado como vazio.
+    """
+
+    def __init__(self, caminho: Path) -> None:
+        self._caminho = Path(caminho)
+        self._anteriores: Dict[str, EntradaManifesto] = {}
+        self._atuais: Dict[str, EntradaManifesto] = {}
+        self.reutilizadas = 0
+        self.processadas = 0
+
+    @property
+    def caminho(self) -> Path:
+        return self._caminho
+
+    @classmethod
+    def carregar(cls, caminho: Path) -> "ManifestoScan":
+        manifesto = cls(caminho)
+        try:
+            with manifesto._caminho.open("r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("versao") != VERSAO_MANIFESTO:
+                return manifesto
+            for chave, linha in dados.get("ficheiros", {}).items():
+                manifesto._anteriores[chave] = cls._linha_para_entrada(linha)
+        except (OSError, ValueError, TypeError, KeyError, IndexError):
+            manifesto._anteriores.clear()
+        return manifesto
+
+    def __len__(self) -> int:
+        return len(self._anteriores)
+
+    # ------------------------
+    # API usada pelo construtor
+    # ------------------------
+
+    def reutilizar(self, foto: Foto, st: os.stat_result) -> bool:
+        chave = self._chave(foto.caminho)
+        entrada = self._anteriores.get(chave)
+        if entrada is None or not entrada.corresponde(st):
+            return False
+
+        foto.reaplicar_metadados(entrada.data_do_exif, entrada.local_gps, entrada.hash_conteudo)
+        self._atuais[chave] = entrada
+        self.reutilizadas += 1
+        return True
+
+    def registar(self, foto: Foto, st: os.stat_result) -> None:
+        self._atuais[self._chave(foto.caminho)] = EntradaManifesto(
+            tamanho=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+            data_do_exif=foto.data_do_exif,
+            local_gps=foto.local_gps,
+            hash_conteudo=valor_conhecido(foto, CAMPO_HASH),  # sem forçar o hash (os níveis decidem)
+        )
+        self.processadas += 1
+
+    def guardar(self) -> None:
+        """Escrita atómica (ficheiro temporário + os.replace)."""
+        entradas = {
+            k: e for k, e in self._anteriores.items()
+            if k not in self._atuais and os.path.lexists(k)  # só saem ficheiros que desapareceram
+        }
+        entradas.update(self._atuais)
+        dados = {
+            "versao": VERSAO_MANIFESTO,
+            "ficheiros": {k: self._entrada_para_linha(e) for k, e in entradas.items()},
+        }
+        self._caminho.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._caminho.with_name(self._caminho.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(dados, f, separators=(",", ":"))
+        os.replace(tmp, self._caminho)
+
+    # ------------------------
+    # Helpers
+    # ------------------------
+
+    @staticmethod
+    def _chave(caminho: Path) -> str:
+        return os.path.abspath(caminho)
+
+    @staticmethod
+    def _entrada_para_linha(e: EntradaManifesto) -> list:
+        # lista compacta: [tamanho, mtime_ns, inode, data_exif_iso, lat, lon, hash]
+        lat, lon = e.local_gps if e.local_gps else (None, None)
+        data = e.data_do_exif.isoformat() if e.data_do_exif else None
+        return [e.tamanho, e.mtime_ns, e.inode, data, lat, lon, e.hash_conteudo]
+
+    @staticmethod
+    def _linha_para_entrada(linha: list) -> EntradaManifesto:
+        tamanho, mtime_ns, inode, data, lat, lon, hash_conteudo = linha
+        return EntradaManifesto(
+            tamanho=int(tamanho),
+            mtime_ns=int(mtime_ns),
+            inode=int(inode),
+            data_do_exif=datetime.fromisoformat(data) if data else None,
+            local_gps=(float(lat), float(lon)) if lat is not None and lon is not None else None,
+            hash_conteudo=hash_conteudo,
+        )
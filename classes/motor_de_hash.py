@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence
+
+from classes.campos_foto import CAMPO_HASH, valor_conhecido
+
+
+# 1 MB por leitura: o hashlib liberta o GIL em updates grandes (> 2 KB), por isso
+# várias threads conseguem ler/hashar ficheiros diferentes ao mesmo tempo
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+# A partir deste tamanho (panoramas, TIFF digitalizados, RAW) o ficheiro é mapeado em
+# memória: o hash lê as páginas diretamente, sem cópias para buffers Python
+LIMIAR_MMAP = 64 * 1024 * 1024
+
+# Hash parcial: início + fim do ficheiro (apanha cabeçalhos/EXIF e o fim dos dados)
+TAMANHO_EXTREMOS = 64 * 1024
+
+
+def hash_ficheiro(
+    caminho: Path,
+    algoritmo: str = "md5",
+    tamanho_bloco: int = TAMANHO_BLOCO_HASH,
+    verificar: bool = True,
+    limiar_mmap: Optional[int] = LIMIAR_MMAP,
+) -> Optional[str]:
+    """
+    Hash (hex) do conteúdo do ficheiro, lido em blocos de `tamanho_bloco`.
+
+    Usa um único buffer reaproveitado (readinto) em vez de criar um bytes por bloco.
+    Ficheiros com `limiar_mmap` bytes ou mais são mapeados (mmap) e hashados por memoryview
+    (None = nunca); se o mapeamento falhar, continua a ler em blocos.
+    Devolve None se não for um ficheiro normal ou se a leitura falhar.
+    verificar=False: quem chama já sabe (ex.: pelo stat do scan) que é um ficheiro normal.
+    """
+    if verificar and not os.path.isfile(caminho):
+        return None
+    hash_ = hashlib.new(algoritmo)
+    buffer = bytearray(max(1, tamanho_bloco))
+    vista = memoryview(buffer)
+    try:
+        with open(caminho, "rb") as f:
+            n = f.readinto(buffer)
+            hash_.update(vista[:n])
+            # só quem encheu o 1.º bloco pode ser grande: os restantes nem fazem fstat
+            if (
+                limiar_mmap is not None
+                and n == len(buffer)
+                and os.fstat(f.fileno()).st_size >= limiar_mmap
+                and _hash_mapeado(f, hash_, inicio=n)
+            ):
+                return hash_.hexdigest()
+            while n:
+                n = f.readinto(buffer)
+                hash_.update(vista[:n])
+    except OSError:
+        return None
+    return hash_.hexdigest()
+
+
+def mapear_ficheiro(f: BinaryIO) -> Optional[mmap.mmap]:
+    """mmap só de leitura do ficheiro aberto (None se não for possível, ex.: ficheiro vazio)."""
+    try:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if hasattr(mapa, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapa.madvise(mmap.MADV_SEQUENTIAL)  # leitura de ponta a ponta: read-ahead agressivo
+    return mapa
+
+
+def _hash_mapeado(f: BinaryIO, hash_, inicio: int = 0) -> bool:
+    mapa = mapear_ficheiro(f)
+    if mapa is None:
+        return False
+    # a vista tem de ser libertada antes de fechar o mmap
+    with mapa, memoryview(mapa) as vista:
+        hash_.update(vista[inicio:])
+    return True
+
+
+def hash_parcial(
+    caminho: Path,
+    algoritmo: str = "md5",
+    tamanho_extremos: int = TAMANHO_EXTREMOS,
+) -> Optional[str]:
+    """
+    Hash dos primeiros e últimos `tamanho_extremos` bytes (no máximo 2 leituras).
+    Só serve para comparar ficheiros do MESMO tamanho: hashes parciais diferentes
+    => conteúdos diferentes; iguais => é preciso o hash completo para confirmar.
+    """
+    hash_ = hashlib.new(algoritmo)
+    try:
+        with open(caminho, "rb") as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            hash_.update(f.read(tamanho_extremos))
+            if tamanho > tamanho_extremos:
+                f.seek(max(tamanho_extremos, tamanho - tamanho_extremos))
+                hash_.update(f.read(tamanho_extremos))
+    except OSError:
+        return None
+    return hash_.hexdigest()
+
+
+@dataclass
+class MotorDeHash:
+    """
+    Calcula o hash de muitos ficheiros em paralelo (thread pool).
+
+    - I/O-bound: enquanto uma thread espera pelo disco, outras hasham (sem GIL)
+    - Em RAID/NAS, várias leituras em simultâneo aproximam-se da largura de banda do disco
+    - max_workers <= 1 => serial
+    """
+    algoritmo: str = "md5"
+    tamanho_bloco: int = TAMANHO_BLOCO_HASH
+    max_workers: int = min(16, (os.cpu_count() or 1) * 2)
+
+    def calcular(self, caminhos: Iterable[Path]) -> Dict[Path, Optional[str]]:
+        """Devolve {caminho: hash ou None}."""
+        return self._mapear(self._hash, caminhos)
+
+    def calcular_parcial(
+        self,
+        caminhos: Iterable[Path],
+        tamanho_extremos: int = TAMANHO_EXTREMOS,
+    ) -> Dict[Path, Optional[str]]:
+        """Devolve {caminho: hash do início+fim ou None} (ver hash_parcial)."""
+        return self._mapear(lambda c: hash_parcial(c, self.algoritmo, tamanho_extremos), caminhos)
+
+    def preencher(self, fotos: Sequence) -> int:
+        """
+        Calcula o hash das fotos que ainda não o têm (foto.definir_hash_conteudo).
+        Devolve quantas ficaram com hash.
+        """
+        # valor_conhecido: numa Foto preguiçosa, perguntar não dispara o cálculo (um a um)
+        em_falta: List = [f for f in fotos if valor_conhecido(f, CAMPO_HASH) is None]
+        if not em_falta:
+            return 0
+        hashes = self.calcular(f.caminho for f in em_falta)
+        n = 0
+        for foto in em_falta:
+            h = hashes.get(foto.caminho)
+            if h is not None:
+                foto.definir_hash_conteudo(h)
+                n += 1
+        return n
+
+    def _mapear(
+        self,
+        funcao: Callable[[Path], Optional[str]],
+        caminhos: Iterable[Path],
+    ) -> Dict[Path, Optional[str]]:
+        caminhos = list(caminhos)
+        if self.max_workers <= 1 or len(caminhos) <= 1:
+            return {c: funcao(c) for c in caminhos}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hash") as ex:
+            return dict(zip(caminhos, ex.map(funcao, caminhos)))
+
+    def _hash(self, caminho: Path) -> Optional[str]:
+        return hash_ficheiro(caminho, self.algoritmo, self.tamanho_bloco)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Union
+
+import imagehash
+import numpy as np
+
+
+# Comparações por bloco: limita a memória das matrizes XOR (tamanho_bloco² × 8 bytes)
+TAMANHO_BLOCO = 1024
+
+# popcount por byte (fallback para NumPy < 2.0, sem np.bitwise_count)
+_BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+HashVisual = Union[imagehash.ImageHash, int]
+
+
+def empacotar(hashes: Iterable[HashVisual]) -> np.ndarray:
+    """pHashes (ImageHash de até 64 bits, ou inteiros) num array uint64 contíguo."""
+    valores = [h if isinstance(h, int) else int(str(h), 16) for h in hashes]
+    return np.array(valores, dtype=np.uint64)
+
+
+def contar_bits(valores: np.ndarray) -> np.ndarray:
+    """popcount elemento a elemento de um array uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(valores)
+    bytes_ = np.ascontiguousarray(valores).view(np.uint8).reshape(valores.shape + (8,))
+    return _BITS_POR_BYTE[bytes_].sum(axis=-1, dtype=np.uint8)
+
+
+def distancias(valor: int, bloco: np.ndarray) -> np.ndarray:
+    """Distância de Hamming de `valor` a cada hash do bloco (XOR + popcount, sem ciclo Python)."""
+    return contar_bits(bloco ^ np.uint64(valor))
+
+
+def pares_dentro(valores: np.ndarray, distancia_maxima: int, tamanho_bloco: int = TAMANHO_BLOCO) -> np.ndarray:
+    """
+    Todos os pares (i, j), i < j, com distância <= distancia_maxima, ordenados por (i, j).
+
+    Compara bloco contra bloco (matriz XOR tamanho_bloco × tamanho_bloco de cada vez):
+    O(n²) comparações, mas milhões por segundo em vez de milhares com ImageHash.__sub__.
+    Devolve um array int64 com forma (k, 2).
+    """
+    n = len(valores)
+    pares: List[np.ndarray] = []
+    for inicio_i in range(0, n, tamanho_bloco):
+        bloco_i = valores[inicio_i:inicio_i + tamanho_bloco]
+        for inicio_j in range(inicio_i, n, tamanho_bloco):
+            bloco_j = valores[inicio_j:inicio_j + tamanho_bloco]
+            perto = contar_bits(bloco_i[:, None] ^ bloco_j[None, :]) <= distancia_maxima
+            if inicio_i == inicio_j:
+                perto = np.triu(perto, k=1)  # só i < j (e nunca o próprio)
+            ii, jj = np.nonzero(perto)
+            if len(ii):
+                pares.append(np.column_stack((ii + inicio_i, jj + inicio_j)))
+    if not pares:
+        return np.empty((0, 2), dtype=np.int64)
+    todos = np.concatenate(pares).astype(np.int64, copy=False)
+    return todos[np.lexsort((todos[:, 1], todos[:, 0]))]
+
+
+class IndiceHammingNumPy:
+    """
+    Mesma interface que IndiceHamming (adicionar / primeiro_dentro / dentro), mas por força
+    bruta vetorizada: os hashes vivem num array uint64 e cada consulta é um XOR + popcount
+    sobre blocos inteiros. Sem pré-processamento: útil para limiares grandes, em que as
+    faixas do IndiceHamming deixam de filtrar.
+    """
+
+    def __init__(self, distancia_maxima: int, bits: int = 64, tamanho_bloco: int = 4 * TAMANHO_BLOCO) -> None:
+        if bits > 64:
+            raise ValueError(f"hashes de {bits} bits não cabem em uint64")
+        self._distancia = distancia_maxima
+        self._tamanho_bloco = tamanho_bloco
+        self._valores = np.empty(64, dtype=np.uint64)
+        self._n = 0
+
+    @property
+    def distancia_maxima(self) -> int:
+        return self._distancia
+
+    def __len__(self) -> int:
+        return self._n
+
+    def adicionar(self, valor: int) -> int:
+        if self._n == len(self._valores):
+            # cresce para o dobro (amortizado O(1) por inserção)
+            self._valores = np.concatenate((self._valores, np.empty_like(self._valores)))
+        self._valores[self._n] = valor
+        self._n += 1
+        return self._n - 1
+
+    def primeiro_dentro(self, valor: int) -> Optional[int]:
+        # por blocos: pára no primeiro bloco com correspondência (o mais antigo ganha)
+        for inicio in range(0, self._n, self._tamanho_bloco):
+            bloco = self._valores[inicio:min(inicio + self._tamanho_bloco, self._n)]
+            perto = distancias(valor, bloco) <= self._distancia
+            if perto.any():
+                return inicio + int(perto.argmax())
+        return None
+
+    def dentro(self, valor: int) -> List[int]:
+        perto = distancias(valor, self._valores[:self._n]) <= self._distancia
+        return np.flatnonzero(perto).tolist()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
@@ -27,6 +28,9 @@ class Operacao:
     # Será preenchido pelo Executor se tiver de renomear por colisão
     destino_final: Optional[Path] = None
 
+    # stat da origem guardado desde o scan: o executor não volta a perguntar ao disco
+    stat_origem: Optional[os.stat_result] = None
+
     @property
     def destino_efetivo(self) -> Path:
         return self.destino_final or self.destino
\ No newline at end of file
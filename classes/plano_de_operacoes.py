@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List
 
 from classes.operacao import Operacao, TipoOperacao
 from classes.regra_de_organizacao import RegraDeOrganizacao, FotoProtocol
@@ -24,6 +24,14 @@ class PlanoDeOperacoes:
 
     def gerar(self, fotos: Iterable[FotoProtocol]) -> List[Operacao]:
         operacoes: List[Operacao] = []
+        # resolve() faz lstat a cada componente: resolve cada PASTA uma vez, não cada ficheiro
+        pastas_resolvidas: Dict[Path, Path] = {}
+
+        def resolver(caminho: Path) -> Path:
+            pasta = pastas_resolvidas.get(caminho.parent)
+            if pasta is None:
+                pasta = pastas_resolvidas[caminho.parent] = caminho.parent.resolve()
+            return pasta / caminho.name
 
         for foto in fotos:
             origem = Path(foto.caminho) if hasattr(foto, "caminho") else None
@@ -60,7 +68,7 @@ class PlanoDeOperacoes:
 
             # Evitar operações inúteis (já está onde devia estar)
             # Resolve também casos onde raiz_destino == pasta atual por engano.
-            if destino.resolve() == origem.resolve():
+            if resolver(destino) == resolver(origem):
                 operacoes.append(
                     Operacao(
                         origem=origem,
@@ -77,7 +85,8 @@ class PlanoDeOperacoes:
                     origem=origem,
                     destino=destino,
                     tipo=TipoOperacao.MOVER,
-                    motivo="OK"
+                    motivo="OK",
+                    stat_origem=getattr(foto, "stat_ficheiro", None),
                 )
             )
 
@@ -4,7 +4,9 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Protocol
+from typing import ClassVar, FrozenSet, Optional, Protocol
+
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPOS_EXIF
 
 
 class FotoProtocol(Protocol):
@@ -25,6 +27,10 @@ class FotoProtocol(Protocol):
     def duplicada(self) -> bool: ...
 
 class RegraDeOrganizacao(ABC):
+    # Campos da Foto que a regra lê: o pipeline só extrai estes (ver ConstrutorDeFotos.campos).
+    # Por defeito (regras sem declaração): todo o EXIF.
+    campos_necessarios: ClassVar[FrozenSet[str]] = CAMPOS_EXIF
+
     @abstractmethod
     def calcular_destino(self, foto: FotoProtocol, raiz: Path) -> Path:
         """Calcula a pasta destino. Não cria pastas nem mexe em ficheiros."""
@@ -32,6 +38,8 @@ class RegraDeOrganizacao(ABC):
 
 
 class RegraPorData(RegraDeOrganizacao):
+    campos_necessarios: ClassVar[FrozenSet[str]] = frozenset({CAMPO_DATA})
+
     def calcular_destino(self, foto: FotoProtocol, raiz: Path) -> Path:
         dt = getattr(foto, "data_de_captura", None)
 
@@ -52,6 +60,8 @@ class RegraPorLocal(RegraDeOrganizacao):
     pasta_sem_local: str = "SemLocal"
     prefixo: str = "GPS"
 
+    campos_necessarios: ClassVar[FrozenSet[str]] = frozenset({CAMPO_GPS})
+
     def calcular_destino(self, foto: FotoProtocol, raiz: Path) -> Path:
         gps = foto.local_gps
         if gps is None:
@@ -27,6 +27,7 @@ class ResumoRelatorio:
 
     # opcional (se passares fotos)
     duplicadas: Optional[int] = None
+    nao_decodificaveis: Optional[int] = None  # o Pillow não as abre (HEIC sem plugin, truncadas, ...)
 
 
 class Relatorio:
@@ -42,6 +43,7 @@ class Relatorio:
         resultado: ResultadoExecucao,
         registos: Sequence[Registo],
         duplicadas: Optional[int] = None,
+        nao_decodificaveis: Optional[int] = None,
     ) -> ResumoRelatorio:
         skips_por_motivo = self._contar_skips_por_motivo(operacoes)
         distribuicao = self._contar_por_pasta_destino(operacoes)
@@ -58,6 +60,7 @@ class Relatorio:
             skips_por_motivo=skips_por_motivo,
             distribuicao_por_pasta=distribuicao,
             duplicadas=duplicadas,
+            nao_decodificaveis=nao_decodificaveis,
         )
 
     def _contar_skips_por_motivo(self, operacoes: Iterable[Operacao]) -> dict[str, int]:
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path, PurePath
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from classes.cache_stat import CONTADOR_STAT
+from classes.tipo_de_ficheiro import detetar_formato_ficheiro
+
+
+EXTENSOES_FOTO = frozenset({".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".heic"})
+
+# Pastas que nunca têm fotos "de origem": caches de miniaturas, NAS, VCS, lixo
+EXCLUSOES_POR_DEFEITO = (
+    ".git",
+    "@eaDir",         # Synology (miniaturas)
+    ".thumbnails",
+    ".@__thumb",      # QNAP
+    "#recycle",
+    "$RECYCLE.BIN",
+    ".Trash-*",
+)
+
+# (pasta, caminho relativo à raiz com "/", profundidade)
+_Tarefa = Tuple[str, str, int]
+
+
+def _workers_por_defeito() -> int:
+    # Scan é I/O-bound (sobretudo em NFS/SMB): mais threads do que cores compensa
+    return min(16, (os.cpu_count() or 1) * 2)
+
+
+@dataclass(frozen=True)
+class FicheiroEncontrado:
+    """Resultado do scan: caminho + o que já se sabe sobre o ficheiro."""
+    caminho: Path
+    formato: Optional[str] = None  # só preenchido com detetar_tipo=True
+    dimensoes: Optional[Tuple[int, int]] = None  # preenchido se já foi sondado (ex.: check de grandes)
+    stat: Optional[os.stat_result] = None  # stat do DirEntry (reutilizado pelas fases seguintes)
+    falha: Optional[str] = None  # o Pillow já falhou ao sondá-lo (motivo); segue para a Foto
+
+
+class _Padroes:
+    """
+    Padrões glob compilados (uma regex só).
+    - Sem "/": compara com o NOME (ex.: "@eaDir", "*.tmp")
+    - Com "/": compara com o caminho RELATIVO à raiz (ex.: "2019/*", "*/cache")
+    """
+
+    def __init__(self, padroes: Sequence[str]) -> None:
+        flags = re.IGNORECASE if os.name == "nt" else 0
+        normalizados = [p.replace("\\", "/").strip("/") for p in padroes]
+        por_nome = [fnmatch.translate(p) for p in normalizados if "/" not in p]
+        por_caminho = [fnmatch.translate(p) for p in normalizados if "/" in p]
+        self._nome = re.compile("|".join(por_nome), flags) if por_nome else None
+        self._caminho = re.compile("|".join(por_caminho), flags) if por_caminho else None
+
+    def __bool__(self) -> bool:
+        return self._nome is not None or self._caminho is not None
+
+    def corresponde(self, nome: str, relativo: str) -> bool:
+        if self._nome is not None and self._nome.match(nome):
+            return True
+        return self._caminho is not None and self._caminho.match(relativo) is not None
+
+
+@dataclass
+class ScannerDeFicheiros:
+    """
+    Percorre uma árvore de diretórios à procura de fotos, com os.scandir.
+
+    - Usa o tipo do DirEntry (d_type) para distinguir ficheiros/pastas sem stat extra
+    - Filtra pela extensão ANTES de perguntar se é ficheiro
+    - Várias subárvores são lidas em paralelo (thread pool); max_workers <= 1 => serial
+    - Não segue links simbólicos para pastas (evita ciclos)
+    - detetar_tipo=True: o formato é decidido pelos primeiros bytes (magic bytes), não
+      pela extensão — ficheiros com extensão errada/estranha são apanhados e os que não
+      são imagem ficam de fora. A leitura do cabeçalho também corre nas threads do scan.
+    - Poda durante o scan (subárvores excluídas nunca são lidas):
+        excluir: globs para pastas/ficheiros a saltar
+        incluir: se não vazio, só ficheiros que correspondam a pelo menos um glob
+        profundidade_maxima: 0 = só a raiz; 1 = raiz + subpastas diretas; None = sem limite
+        pastas_excluidas: caminhos concretos a saltar (ex.: a raiz destino)
+    - recolher_stat=True: guarda o stat de cada foto (DirEntry.stat(), sem custo extra no
+      Windows) para a Foto, os duplicados e o executor não voltarem a perguntar ao disco
+
+    Nota: sem limite, em modo paralelo a ordem de iterar()/iterar_ficheiros() não é garantida;
+    listar() e listar_ficheiros() devolvem por ordem de caminho. Com limite o percurso é serial
+    e por ordem de caminho: as N fotos são sempre as mesmas (as N primeiras da listagem completa).
+    """
+    extensoes: frozenset[str] = EXTENSOES_FOTO
+    max_workers: int = _workers_por_defeito()
+    detetar_tipo: bool = False
+    incluir: Sequence[str] = ()
+    excluir: Sequence[str] = ()
+    profundidade_maxima: Optional[int] = None
+    pastas_excluidas: Sequence[Path] = field(default_factory=tuple)
+    recolher_stat: bool = True
+
+    def __post_init__(self) -> None:
+        self._incluir = _Padroes(self.incluir)
+        self._excluir = _Padroes(self.excluir)
+        self._pastas_excluidas = frozenset(
+            os.path.normcase(os.path.abspath(p)) for p in self.pastas_excluidas
+        )
+
+    def iterar_ficheiros(self, raiz: Path, limite: Optional[int] = None) -> Iterator[FicheiroEncontrado]:
+        """Gera as fotos (com o que o scan já sabe) à medida que são encontradas."""
+        if limite is not None and limite <= 0:
+            return
+
+        n = 0
+        encontrados = self._iterar_encontrados(str(raiz)) if limite is None else self._iterar_por_ordem(str(raiz))
+        for encontrado in encontrados:
+            yield encontrado
+            n += 1
+            if limite is not None and n >= limite:
+                # sair do for fecha o gerador interno => cancela o trabalho pendente
+                return
+
+    def iterar(self, raiz: Path, limite: Optional[int] = None) -> Iterator[Path]:
+        """Gera só os caminhos das fotos."""
+        for encontrado in self.iterar_ficheiros(raiz, limite=limite):
+            yield encontrado.caminho
+
+    def listar(self, raiz: Path, limite: Optional[int] = None) -> List[Path]:
+        return [encontrado.caminho for encontrado in self.listar_ficheiros(raiz, limite=limite)]
+
+    def listar_ficheiros(self, raiz: Path, limite: Optional[int] = None) -> List[FicheiroEncontrado]:
+        # ordenado: o agrupamento guloso e os nomes das colisões não mudam de execução para execução
+        return sorted(self.iterar_ficheiros(raiz, limite=limite), key=lambda encontrado: encontrado.caminho)
+
+    def aceita(self, raiz: Path, caminho: Path) -> bool:
+        """
+        Um scan de `raiz` entregaria `caminho`? Mesma poda (excluir/incluir, profundidade,
+        pastas excluídas, extensão ou magic bytes), para ficheiros que chegam por outra via
+        (ex.: eventos do modo vigiar).
+        """
+        relativo = os.path.relpath(caminho, raiz)
+        partes = relativo.replace(os.sep, "/").split("/")
+        if relativo == os.curdir or partes[0] == os.pardir:
+            return False
+        if self.profundidade_maxima is not None and len(partes) - 1 > self.profundidade_maxima:
+            return False
+
+        pasta, rel = str(raiz), ""
+        for nome in partes[:-1]:
+            pasta = os.path.join(pasta, nome)
+            rel = f"{rel}/{nome}" if rel else nome
+            if not self._visitar_pasta(nome, pasta, rel):
+                return False
+
+        nome, rel = partes[-1], "/".join(partes)
+        if self._excluir and self._excluir.corresponde(nome, rel):
+            return False
+        if self._incluir and not self._incluir.corresponde(nome, rel):
+            return False
+        if self.detetar_tipo:
+            return detetar_formato_ficheiro(str(caminho)) is not None
+        return os.path.splitext(nome)[1].lower() in self.extensoes
+
+    # ------------------------
+    # Helpers
+    # ------------------------
+
+    def _iterar_encontrados(self, raiz: str) -> Iterator[FicheiroEncontrado]:
+        inicial: _Tarefa = (raiz, "", 0)
+        if self.max_workers <= 1:
+            yield from self._iterar_serial(inicial)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scan")
+        try:
+            pendentes = {executor.submit(self._ler_diretorio, inicial)}
+            while pendentes:
+                feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for fut in feitos:
+                    ficheiros, subpastas = fut.result()
+                    # submete as subpastas antes de entregar os ficheiros, para as threads
+                    # continuarem a trabalhar enquanto o consumidor processa
+                    for sub in subpastas:
+                        pendentes.add(executor.submit(self._ler_diretorio, sub))
+                    yield from ficheiros
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iterar_serial(self, inicial: _Tarefa) -> Iterator[FicheiroEncontrado]:
+        pilha = [inicial]
+        while pilha:
+            ficheiros, subpastas = self._ler_diretorio(pilha.pop())
+            yield from ficheiros
+            pilha.extend(reversed(subpastas))
+
+    def _iterar_por_ordem(self, raiz: str) -> Iterator[FicheiroEncontrado]:
+        """Percurso em profundidade por ordem de nome (ficheiros e pastas misturados) = ordem de caminho."""
+        pilha: List[Union[FicheiroEncontrado, _Tarefa]] = [(raiz, "", 0)]
+        while pilha:
+            item = pilha.pop()
+            if isinstance(item, FicheiroEncontrado):
+                yield item
+                continue
+            ficheiros, subpastas = self._ler_diretorio(item)
+            entradas: List[Union[FicheiroEncontrado, _Tarefa]] = [*ficheiros, *subpastas]
+            entradas.sort(key=_nome_da_entrada, reverse=True)
+            pilha.extend(entradas)
+
+    def _ler_diretorio(self, tarefa: _Tarefa) -> Tuple[List[FicheiroEncontrado], List[_Tarefa]]:
+        """Lê UMA pasta: devolve (ficheiros de foto, subpastas a visitar)."""
+        pasta, relativo, profundidade = tarefa
+        ficheiros: List[FicheiroEncontrado] = []
+        subpastas: List[_Tarefa] = []
+        descer = self.profundidade_maxima is None or profundidade < self.profundidade_maxima
+        try:
+            with os.scandir(pasta) as it:
+                for entry in it:
+                    try:
+                        rel = f"{relativo}/{entry.name}" if relativo else entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if descer and self._visitar_pasta(entry.name, entry.path, rel):
+                                subpastas.append((entry.path, rel, profundidade + 1))
+                            continue
+                        if self._excluir and self._excluir.corresponde(entry.name, rel):
+                            continue
+                        if self._incluir and not self._incluir.corresponde(entry.name, rel):
+                            continue
+                        if self.detetar_tipo:
+                            if entry.is_file():
+                                formato = detetar_formato_ficheiro(entry.path)
+                                if formato is not None:
+                                    ficheiros.append(
+                                        FicheiroEncontrado(Path(entry.path), formato, stat=self._stat(entry))
+                                    )
+                            continue
+                        if os.path.splitext(entry.name)[1].lower() not in self.extensoes:
+                            continue
+                        if entry.is_file():
+                            ficheiros.append(FicheiroEncontrado(Path(entry.path), stat=self._stat(entry)))
+                    except OSError:
+                        # entrada desapareceu / sem permissões: ignora só esta
+                        continue
+        except OSError:
+            # pasta sem permissões ou removida entretanto: ignora a subárvore
+            pass
+        return ficheiros, subpastas
+
+    def _stat(self, entry: os.DirEntry) -> Optional[os.stat_result]:
+        if not self.recolher_stat:
+            return None
+        CONTADOR_STAT.feita()
+        try:
+            return entry.stat()
+        except OSError:
+            return None
+
+    def _visitar_pasta(self, nome: str, caminho: str, relativo: str) -> bool:
+        if self._excluir and self._excluir.corresponde(nome, relativo):
+            return False
+        if self._pastas_excluidas:
+            return os.path.normcase(os.path.abspath(caminho)) not in self._pastas_excluidas
+        return True
+
+
+def _nome_da_entrada(entrada: Union[FicheiroEncontrado, _Tarefa]) -> PurePath:
+    # PurePath compara como Path (maiúsculas/minúsculas conforme o SO), igual ao sort de listar_ficheiros
+    if isinstance(entrada, FicheiroEncontrado):
+        return PurePath(entrada.caminho.name)
+    return PurePath(os.path.basename(entrada[0]))
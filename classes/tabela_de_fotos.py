@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import math
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import imagehash
+
+from classes.foto import Foto
+from classes.motor_de_hash import hash_ficheiro
+from classes.tipo_de_ficheiro import formato_decodificavel
+
+
+_EPOCA = datetime(1970, 1, 1)
+_EPOCA_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAN = float("nan")
+_SEM_FUSO = -0x8000  # coluna de fusos: data "naive" (sem OffsetTime*)
+
+# bits de _flags
+_DUPLICADA = 0x01
+_TEM_HASH = 0x02
+_TEM_PHASH = 0x04
+_NAO_DECODIFICAVEL = 0x08  # o Pillow já falhou com este ficheiro (o motivo fica só na Foto)
+
+
+class TabelaDeFotos:
+    """
+    Representação em colunas de muitas fotos (escala de milhões).
+
+    Em vez de um objeto Foto por ficheiro (Path + datetime + tuple + str ...):
+      - caminho: pasta internada (uma string por pasta) + nome do ficheiro em bytes,
+        todos os nomes seguidos num único bytearray (sem um objeto str por foto)
+      - data_de_captura: array de float (segundos desde 1970; NaN = sem data) + array de
+        int16 com o fuso em minutos. Com fuso, os segundos são o instante UTC e a data volta
+        com o mesmo tzinfo; sem fuso (_SEM_FUSO), segundos "naive" como na Foto
+      - local_gps: dois arrays de float (NaN = sem GPS)
+      - hash_conteudo: digest binário de tamanho fixo num bytearray (hex só quando pedido)
+      - pHash: inteiro de 64 bits num array
+      - duplicada / presença de hashes: 1 byte de flags
+
+    tabela[i] devolve uma LinhaFoto (vista leve) que cumpre o FotoProtocol, por isso
+    regras, PlanoDeOperacoes e DetetarDuplicados funcionam sem alterações.
+    """
+
+    def __init__(self, tamanho_digest: int = 16) -> None:
+        self._tamanho_digest = tamanho_digest
+
+        self._pastas: List[str] = []
+        self._indice_pasta: Dict[str, int] = {}
+        self._formatos: List[Optional[str]] = [None]
+        self._indice_formato: Dict[Optional[str], int] = {None: 0}
+
+        self._pasta = array("I")
+        self._nomes = bytearray()
+        self._fim_nome = array("Q")
+        self._formato = array("B")
+        self._timestamp = array("d")
+        self._fuso = array("h")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._largura = array("I")
+        self._altura = array("I")
+        self._digest = bytearray()
+        self._phash = array("Q")
+        self._flags = bytearray()
+
+    @classmethod
+    def de_fotos(cls, fotos: Iterable[Foto], tamanho_digest: int = 16) -> "TabelaDeFotos":
+        tabela = cls(tamanho_digest=tamanho_digest)
+        for f in fotos:
+            tabela.adicionar(f)
+        return tabela
+
+    # ------------------------
+    # Construção
+    # ------------------------
+
+    def adicionar(self, foto: Foto) -> int:
+        """Copia os campos da Foto para as colunas; devolve o índice da linha."""
+        pasta, nome = os.path.split(str(foto.caminho))
+        self._pasta.append(self._internar_pasta(pasta))
+        self._nomes += os.fsencode(nome)
+        self._fim_nome.append(len(self._nomes))
+        self._formato.append(self._internar_formato(foto.formato))
+
+        segundos, fuso = _para_segundos(foto.data_de_captura)
+        self._timestamp.append(segundos)
+        self._fuso.append(fuso)
+        lat, lon = foto.local_gps if foto.local_gps else (_NAN, _NAN)
+        self._lat.append(lat)
+        self._lon.append(lon)
+
+        largura, altura = foto.dimensoes if foto.dimensoes else (0, 0)
+        self._largura.append(largura)
+        self._altura.append(altura)
+
+        flags = _DUPLICADA if foto.duplicada else 0
+        if foto.falha_descodificacao is not None:
+            flags |= _NAO_DECODIFICAVEL
+        digest = bytes(self._tamanho_digest)
+        if foto.hash_conteudo is not None:
+            digest = bytes.fromhex(foto.hash_conteudo)
+            if len(digest) != self._tamanho_digest:
+                raise ValueError(
+                    f"digest com {len(digest)} bytes (tabela criada para {self._tamanho_digest})"
+                )
+            flags |= _TEM_HASH
+        self._digest += digest
+
+        phash = 0
+        if foto.hash_visual is not None:
+            phash = int(str(foto.hash_visual), 16)
+            flags |= _TEM_PHASH
+        self._phash.append(phash)
+        self._flags.append(flags)
+        return len(self._fim_nome) - 1
+
+    # ------------------------
+    # Acesso
+    # ------------------------
+
+    def __len__(self) -> int:
+        return len(self._fim_nome)
+
+    def __getitem__(self, i: int) -> "LinhaFoto":
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return LinhaFoto(self, i)
+
+    def __iter__(self) -> Iterator["LinhaFoto"]:
+        for i in range(len(self)):
+            yield LinhaFoto(self, i)
+
+    def memoria_aproximada(self) -> int:
+        """Bytes ocupados pelas colunas (sys.getsizeof), para relatórios/diagnóstico."""
+        return sum(sys.getsizeof(v) for v in vars(self).values())
+
+    def caminho(self, i: int) -> Path:
+        return Path(self._pastas[self._pasta[i]], self.nome_de_ficheiro(i))
+
+    def nome_de_ficheiro(self, i: int) -> str:
+        inicio = self._fim_nome[i - 1] if i else 0
+        return os.fsdecode(bytes(self._nomes[inicio:self._fim_nome[i]]))
+
+    def formato(self, i: int) -> Optional[str]:
+        return self._formatos[self._formato[i]]
+
+    def data_de_captura(self, i: int) -> Optional[datetime]:
+        return _de_segundos(self._timestamp[i], self._fuso[i])
+
+    def local_gps(self, i: int) -> Optional[tuple[float, float]]:
+        lat = self._lat[i]
+        if math.isnan(lat):
+            return None
+        return (lat, self._lon[i])
+
+    def dimensoes(self, i: int) -> Optional[tuple[int, int]]:
+        if not self._largura[i]:
+            return None
+        return (self._largura[i], self._altura[i])
+
+    def digest(self, i: int) -> Optional[bytes]:
+        if not self._flags[i] & _TEM_HASH:
+            return None
+        inicio = i * self._tamanho_digest
+        return bytes(self._digest[inicio:inicio + self._tamanho_digest])
+
+    def hash_conteudo(self, i: int) -> Optional[str]:
+        d = self.digest(i)
+        return d.hex() if d is not None else None
+
+    def phash_int(self, i: int) -> Optional[int]:
+        if not self._flags[i] & _TEM_PHASH:
+            return None
+        return self._phash[i]
+
+    def duplicada(self, i: int) -> bool:
+        return bool(self._flags[i] & _DUPLICADA)
+
+    def falhou_descodificacao(self, i: int) -> bool:
+        return bool(self._flags[i] & _NAO_DECODIFICAVEL)
+
+    # ------------------------
+    # Escrita (usada pelas vistas)
+    # ------------------------
+
+    def marcar_como_duplicado(self, i: int) -> None:
+        self._flags[i] |= _DUPLICADA
+
+    def marcar_nao_decodificavel(self, i: int) -> None:
+        self._flags[i] |= _NAO_DECODIFICAVEL
+
+    def definir_hash_conteudo(self, i: int, hash_conteudo: Optional[str]) -> None:
+        inicio = i * self._tamanho_digest
+        if hash_conteudo is None:
+            self._flags[i] &= ~_TEM_HASH & 0xFF
+            self._digest[inicio:inicio + self._tamanho_digest] = bytes(self._tamanho_digest)
+            return
+        digest = bytes.fromhex(hash_conteudo)
+        if len(digest) != self._tamanho_digest:
+            raise ValueError(f"digest com {len(digest)} bytes (tabela criada para {self._tamanho_digest})")
+        self._digest[inicio:inicio + self._tamanho_digest] = digest
+        self._flags[i] |= _TEM_HASH
+
+    # ------------------------
+    # Helpers
+    # ------------------------
+
+    def _internar_pasta(self, pasta: str) -> int:
+        idx = self._indice_pasta.get(pasta)
+        if idx is None:
+            idx = len(self._pastas)
+            self._pastas.append(pasta)
+            self._indice_pasta[pasta] = idx
+        return idx
+
+    def _internar_formato(self, formato: Optional[str]) -> int:
+        idx = self._indice_formato.get(formato)
+        if idx is None:
+            idx = len(self._formatos)
+            self._formatos.append(formato)
+            self._indice_formato[formato] = idx
+        return idx
+
+
+class LinhaFoto:
+    """
+    Vista de uma linha da TabelaDeFotos com a mesma interface que a Foto usa no pipeline
+    (FotoProtocol + o que o DetetarDuplicados precisa). Não guarda dados: lê/escreve na tabela.
+    """
+    __slots__ = ("_tabela", "_i")
+
+    def __init__(self, tabela: TabelaDeFotos, i: int) -> None:
+        self._tabela = tabela
+        self._i = i
+
+    @property
+    def indice(self) -> int:
+        return self._i
+
+    @property
+    def caminho(self) -> Path:
+        return self._tabela.caminho(self._i)
+
+    @property
+    def nome_de_ficheiro(self) -> str:
+        return self._tabela.nome_de_ficheiro(self._i)
+
+    @property
+    def formato(self) -> Optional[str]:
+        return self._tabela.formato(self._i)
+
+    @property
+    def decodificavel(self) -> bool:
+        return not self._tabela.falhou_descodificacao(self._i) and formato_decodificavel(self.formato)
+
+    @property
+    def falha_descodificacao(self) -> Optional[str]:
+        if not formato_decodificavel(self.formato):
+            return f"formato sem suporte no Pillow: {self.formato}"
+        if self._tabela.falhou_descodificacao(self._i):
+            return "falha de descodificação"
+        return None
+
+    @property
+    def dimensoes(self) -> Optional[tuple[int, int]]:
+        return self._tabela.dimensoes(self._i)
+
+    @property
+    def data_de_captura(self) -> Optional[datetime]:
+        return self._tabela.data_de_captura(self._i)
+
+    @property
+    def local_gps(self) -> Optional[tuple[float, float]]:
+        return self._tabela.local_gps(self._i)
+
+    @property
+    def hash_conteudo(self) -> Optional[str]:
+        return self._tabela.hash_conteudo(self._i)
+
+    @property
+    def hash_visual(self) -> Optional[imagehash.ImageHash]:
+        v = self._tabela.phash_int(self._i)
+        if v is None:
+            return None
+        return imagehash.hex_to_hash(f"{v:016x}")
+
+    @property
+    def duplicada(self) -> bool:
+        return self._tabela.duplicada(self._i)
+
+    def marcar_como_duplicado(self) -> None:
+        self._tabela.marcar_como_duplicado(self._i)
+
+    def registar_falha_descodificacao(self, motivo: str) -> None:
+        self._tabela.marcar_nao_decodificavel(self._i)
+
+    def definir_hash_conteudo(self, hash_conteudo: Optional[str]) -> None:
+        self._tabela.definir_hash_conteudo(self._i, hash_conteudo)
+
+    def calcular_hash(self, algoritmo: str = "md5") -> None:
+        """Mesmo contrato que Foto.calcular_hash, mas guarda o digest na tabela."""
+        hash_conteudo = hash_ficheiro(self.caminho, algoritmo)
+        if hash_conteudo is not None:
+            self._tabela.definir_hash_conteudo(self._i, hash_conteudo)
+
+    def __repr__(self) -> str:
+        return f"LinhaFoto({self._i}, {self.caminho!s})"
+
+
+def _para_segundos(dt: Optional[datetime]) -> Tuple[float, int]:
+    """(segundos desde 1970, fuso em minutos ou _SEM_FUSO)."""
+    if dt is None:
+        return _NAN, _SEM_FUSO
+    offset = dt.utcoffset()
+    if offset is None:
+        # "naive" => sem fuso: diferença exata para 1970-01-01 (não depende do fuso local)
+        return (dt - _EPOCA) / timedelta(seconds=1), _SEM_FUSO
+    # com fuso: o instante UTC (ordena bem entre fusos) + o fuso para reconstruir a hora local
+    return (dt - _EPOCA_UTC) / timedelta(seconds=1), round(offset / timedelta(minutes=1))
+
+
+def _de_segundos(s: float, fuso: int = _SEM_FUSO) -> Optional[datetime]:
+    if math.isnan(s):
+        return None
+    delta = timedelta(microseconds=round(s * 1_000_000))
+    if fuso == _SEM_FUSO:
+        return _EPOCA + delta
+    return (_EPOCA_UTC + delta).astimezone(timezone(timedelta(minutes=fuso)))
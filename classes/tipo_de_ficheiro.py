@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+
+# Quantos bytes do início chegam para todas as assinaturas abaixo
+TAMANHO_CABECALHO = 32
+
+# "brands" ISO-BMFF (caixa ftyp) de HEIF/HEIC e AVIF
+_BRANDS_HEIF = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"hevm", b"hevs", b"mif1", b"msf1"}
+_BRANDS_AVIF = {b"avif", b"avis"}
+
+
+def detetar_formato(cabecalho: bytes) -> Optional[str]:
+    """
+    Identifica o formato pelos "magic bytes".
+
+    Devolve o nome do formato como o Pillow o conhece ("JPEG", "PNG", "WEBP", "TIFF",
+    "HEIF", "AVIF") ou None se não for uma imagem reconhecida.
+    """
+    if cabecalho.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if cabecalho.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if cabecalho[:4] == b"RIFF" and cabecalho[8:12] == b"WEBP":
+        return "WEBP"
+    if cabecalho[:4] in (b"II*\x00", b"MM\x00*"):
+        return "TIFF"
+    if cabecalho[4:8] == b"ftyp":
+        brand = cabecalho[8:12]
+        # major brand; alguns ficheiros só declaram heic/avif nas compatible brands
+        compativeis = {cabecalho[i:i + 4] for i in range(16, len(cabecalho) - 3, 4)}
+        if brand in _BRANDS_AVIF or (compativeis & _BRANDS_AVIF and brand not in _BRANDS_HEIF):
+            return "AVIF"
+        if brand in _BRANDS_HEIF or compativeis & _BRANDS_HEIF:
+            return "HEIF"
+    return None
+
+
+def detetar_formato_ficheiro(caminho: Path) -> Optional[str]:
+    """Lê só o cabeçalho do ficheiro. Erros de leitura => None."""
+    try:
+        with open(caminho, "rb") as f:
+            return detetar_formato(f.read(TAMANHO_CABECALHO))
+    except OSError:
+        return None
+
+
+def formato_decodificavel(formato: Optional[str]) -> bool:
+    """
+    O Pillow instalado consegue abrir este formato?
+
+    - None (formato não verificado) => True: deixa o Pillow tentar, como antes
+    - HEIF/AVIF dependem de plugins (ex.: pillow-heif) => só True se estiverem registados
+    """
+    if formato is None:
+        return True
+    Image.init()
+    return formato in Image.OPEN
+
+
+def descrever_falha(erro: BaseException) -> str:
+    """Motivo curto de uma falha de descodificação (ex.: "UnidentifiedImageError: cannot identify ...")."""
+    texto = str(erro).strip()
+    nome = type(erro).__name__
+    return f"{nome}: {texto}" if texto else nome
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from classes.scanner_de_ficheiros import EXTENSOES_FOTO, ScannerDeFicheiros
+
+
+class FonteDeEventos(Protocol):
+    """Algo que sabe dizer "estes ficheiros acabaram de chegar/mudar"."""
+    def ler(self, timeout: Optional[float]) -> List[Path]: ...
+    def fechar(self) -> None: ...
+
+
+# -------------------------
+# inotify (Linux) via ctypes
+# -------------------------
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_MASCARA = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+_EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class FonteInotify:
+    """
+    Eventos do kernel (inotify): sem polling, CPU ~0 quando nada acontece.
+
+    - Ficheiros: só conta quando são FECHADOS após escrita (IN_CLOSE_WRITE) ou movidos
+      para dentro (IN_MOVED_TO) => nunca apanha um ficheiro a meio da cópia
+    - Pastas novas passam a ser vigiadas (e o que já lá estiver é reportado)
+    - Overflow da fila do kernel => rescan completo da árvore
+
+    Lança OSError se o inotify não estiver disponível (ex.: não-Linux).
+    """
+
+    def __init__(self, raiz: Path) -> None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify só existe em Linux")
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("libc sem inotify")
+
+        self._libc = libc
+        self._raiz = Path(raiz)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            erro = ctypes.get_errno()
+            raise OSError(erro, os.strerror(erro))
+
+        self._pastas: Dict[int, str] = {}
+        self._vigiar_arvore(str(self._raiz))
+
+    def ler(self, timeout: Optional[float]) -> List[Path]:
+        prontos, _, _ = select.select([self._fd], [], [], timeout)
+        if not prontos:
+            return []
+
+        try:
+            dados = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        novos: List[Path] = []
+        pos = 0
+        while pos + _EVENTO.size <= len(dados):
+            wd, mask, _cookie, tamanho = _EVENTO.unpack_from(dados, pos)
+            pos += _EVENTO.size
+            nome = dados[pos:pos + tamanho].rstrip(b"\0")
+            pos += tamanho
+
+            if mask & IN_Q_OVERFLOW:
+                # perdemos eventos: a única resposta segura é voltar a ver tudo
+                novos.extend(ScannerDeFicheiros(max_workers=1).iterar(self._raiz))
+                continue
+            if mask & IN_IGNORED:
+                self._pastas.pop(wd, None)
+                continue
+
+            pasta = self._pastas.get(wd)
+            if pasta is None or not nome:
+                continue
+            caminho = os.path.join(pasta, os.fsdecode(nome))
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # ficheiros podem ter sido fechados antes de a pasta ser vigiada
+                    self._vigiar_arvore(caminho)
+                    novos.extend(ScannerDeFicheiros(max_workers=1).iterar(Path(caminho)))
+                continue
+
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                novos.append(Path(caminho))
+
+        return novos
+
+    def fechar(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _vigiar_arvore(self, raiz: str) -> None:
+        pilha = [raiz]
+        while pilha:
+            pasta = pilha.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(pasta), _MASCARA)
+            if wd < 0:
+                # pasta desapareceu/sem permissões: ignora a subárvore
+                continue
+            self._pastas[wd] = pasta
+            try:
+                with os.scandir(pasta) as it:
+                    pilha.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+
+
+# -------------------------
+# Polling (fallback portátil)
+# -------------------------
+
+class FontePolling:
+    """
+    Fallback sem inotify: rescan periódico (scandir).
+
+    Um ficheiro só é reportado quando (tamanho, mtime) se mantém igual em dois
+    scans seguidos — evita apanhar ficheiros ainda a ser copiados.
+    """
+
+    def __init__(self, raiz: Path, intervalo: float = 5.0, relogio: Callable[[], float] = time.monotonic) -> None:
+        self._raiz = Path(raiz)
+        self._intervalo = intervalo
+        self._relogio = relogio
+        self._scanner = ScannerDeFicheiros(max_workers=1)
+        self._vistos: Dict[str, Tuple[int, int]] = {}
+        self._reportados: Dict[str, Tuple[int, int]] = {}
+        self._proximo = relogio()
+
+    def ler(self, timeout: Optional[float]) -> List[Path]:
+        espera = max(0.0, self._proximo - self._relogio())
+        if timeout is not None and espera > timeout:
+            time.sleep(timeout)
+            return []
+        if espera:
+            time.sleep(espera)
+
+        self._proximo = self._relogio() + self._intervalo
+        return self._poll()
+
+    def fechar(self) -> None:
+        self._vistos.clear()
+        self._reportados.clear()
+
+    def marcar_reportados(self, caminhos: Iterable[Path]) -> None:
+        """Ficheiros já entregues por outra via (ex.: listagem inicial): só voltam se mudarem."""
+        for p in caminhos:
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            assinatura = (st.st_size, st.st_mtime_ns)
+            self._vistos[str(p)] = assinatura
+            self._reportados[str(p)] = assinatura
+
+    def _poll(self) -> List[Path]:
+        atuais: Dict[str, Tuple[int, int]] = {}
+        for p in self._scanner.iterar(self._raiz):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            atuais[str(p)] = (st.st_size, st.st_mtime_ns)
+
+        estaveis: List[Path] = []
+        for caminho, assinatura in atuais.items():
+            if self._vistos.get(caminho) != assinatura:
+                continue  # novo ou ainda a mudar: espera pelo próximo poll
+            if self._reportados.get(caminho) == assinatura:
+                continue
+            self._reportados[caminho] = assinatura
+            estaveis.append(Path(caminho))
+
+        self._vistos = atuais
+        # esquece ficheiros que saíram (ex.: já organizados)
+        self._reportados = {c: a for c, a in self._reportados.items() if c in atuais}
+        return estaveis
+
+
+def criar_fonte(raiz: Path, intervalo_polling: float = 5.0) -> FonteDeEventos:
+    """inotify quando existe; caso contrário, polling."""
+    try:
+        return FonteInotify(raiz)
+    except OSError:
+        return FontePolling(raiz, intervalo=intervalo_polling)
+
+
+# -------------------------
+# Vigia (debounce + lotes)
+# -------------------------
+
+class VigiaDePasta:
+    """
+    Junta os ficheiros que vão chegando e entrega-os em lotes pequenos.
+
+    - debounce: um ficheiro só entra num lote depois de `debounce` segundos sem eventos
+      (várias escritas seguidas ao mesmo ficheiro contam como uma)
+    - tamanho_lote: máximo de ficheiros por chamada a `processar_lote`
+    - só extensões de foto (ou o que `filtro` aceitar, ex.: a poda do scanner); ficheiros
+      que já não existem são descartados
+    """
+
+    def __init__(
+        self,
+        raiz: Path,
+        processar_lote: Callable[[List[Path]], None],
+        debounce: float = 2.0,
+        tamanho_lote: int = 50,
+        fonte: Optional[FonteDeEventos] = None,
+        extensoes: frozenset[str] = EXTENSOES_FOTO,
+        relogio: Callable[[], float] = time.monotonic,
+        filtro: Optional[Callable[[Path], bool]] = None,
+    ) -> None:
+        self._raiz = Path(raiz)
+        self._processar_lote = processar_lote
+        self._debounce = debounce
+        self._tamanho_lote = max(1, tamanho_lote)
+        self._fonte = fonte if fonte is not None else criar_fonte(self._raiz)
+        self._extensoes = extensoes
+        self._filtro = filtro
+        self._relogio = relogio
+        self._pendentes: Dict[Path, float] = {}
+
+    @property
+    def fonte(self) -> FonteDeEventos:
+        return self._fonte
+
+    def adicionar(self, caminhos: Sequence[Path]) -> None:
+        agora = self._relogio()
+        for p in caminhos:
+            aceite = self._filtro(p) if self._filtro is not None else p.suffix.lower() in self._extensoes
+            if aceite:
+                self._pendentes[p] = agora
+
+    def adicionar_existentes(self, caminhos: Sequence[Path]) -> None:
+        """
+        O que já estava na pasta ao arrancar: entra como se tivesse acabado de chegar, e uma
+        fonte por polling não o volta a reportar no 2.º scan (só se mudar entretanto).
+        """
+        marcar = getattr(self._fonte, "marcar_reportados", None)
+        if marcar is not None:
+            marcar(caminhos)
+        self.adicionar(caminhos)
+
+    def passo(self, timeout: Optional[float] = None) -> int:
+        """
+        Espera por eventos (no máximo `timeout`, ou até ao fim do debounce pendente)
+        e processa os lotes prontos. Devolve o nº de ficheiros entregues.
+        """
+        if self._pendentes:
+            mais_antigo = min(self._pendentes.values())
+            restante = max(0.0, mais_antigo + self._debounce - self._relogio())
+            timeout = restante if timeout is None else min(timeout, restante)
+
+        self.adicionar(self._fonte.ler(timeout))
+        return self._despachar()
+
+    def executar(self, parar: Optional[threading.Event] = None, intervalo: float = 1.0) -> None:
+        """Ciclo principal. Termina com Ctrl+C ou quando `parar` for sinalizado."""
+        try:
+            while parar is None or not parar.is_set():
+                self.passo(timeout=intervalo if parar is not None else None)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._despachar(forcar=True)
+            self._fonte.fechar()
+
+    def _despachar(self, forcar: bool = False) -> int:
+        agora = self._relogio()
+        prontos = [
+            p for p, t in self._pendentes.items()
+            if forcar or agora - t >= self._debounce
+        ]
+        if not prontos:
+            return 0
+
+        for p in prontos:
+            del self._pendentes[p]
+        prontos = [p for p in prontos if p.is_file()]
+
+        for i in range(0, len(prontos), self._tamanho_lote):
+            self._processar_lote(prontos[i:i + self._tamanho_lote])
+        return len(prontos)
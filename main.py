@@ -2,40 +2,75 @@ from __future__ import annotations
 
 import warnings
 from PIL import Image as PILImage
-from PIL import Image
 import argparse
+import os
+import re
+import sqlite3
+from dataclasses import replace
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence
 
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.cache_metadados import CacheMetadados, caminho_cache_por_defeito
+from classes.cache_stat import CONTADOR_STAT
+from classes.construtor_de_fotos import ConstrutorDeFotos, ItemFoto, em_buffer
+from classes.data_do_nome import DataPeloNome, PoliticaData
 from classes.detetar_duplicados import DetetarDuplicados
+from classes.dimensoes_imagem import Dimensoes, ler_dimensoes, ler_dimensoes_em_lote
 from classes.executor_de_operacoes import ExecutorSeguro
 from classes.foto import Foto
+from classes.manifesto_scan import ManifestoScan, caminho_manifesto
 from classes.monitor_de_operacoes import MonitorDeOperacoes
 from classes.plano_de_operacoes import PlanoDeOperacoes
-from classes.regra_de_organizacao import RegraPorData, RegraPorLocal
+from classes.regra_de_organizacao import RegraDeOrganizacao, RegraPorData, RegraPorLocal
 from classes.relatorio import Relatorio
+from classes.scanner_de_ficheiros import EXCLUSOES_POR_DEFEITO, FicheiroEncontrado, ScannerDeFicheiros
+from classes.tipo_de_ficheiro import formato_decodificavel
+from classes.vigia_de_pasta import VigiaDePasta
 
 
-EXTENSOES_FOTO = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".heic"}
-
-
-def listar_ficheiros_foto(raiz: Path, limite: Optional[int] = None) -> List[Path]:
-    ficheiros: List[Path] = []
-    for p in raiz.rglob("*"):
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in EXTENSOES_FOTO:
-            continue
-        ficheiros.append(p)
-        if limite is not None and len(ficheiros) >= limite:
-            break
-    return ficheiros
-
-def detetar_imagens_grandes(caminhos: list[Path]) -> tuple[list[Path], int]:
+def criar_scanner(
+    origem: Path,
+    workers: Optional[int] = None,
+    detetar_tipo: bool = False,
+    incluir: Sequence[str] = (),
+    excluir: Sequence[str] = (),
+    profundidade: Optional[int] = None,
+) -> ScannerDeFicheiros:
+    """
+    Scanner com a poda "de fábrica": caches/NAS/VCS (EXCLUSOES_POR_DEFEITO),
+    a raiz destino e qualquer pasta Foto_Organizada antiga dentro da origem.
+    """
+    raiz_destino = escolher_raiz_destino(origem)
+    opcoes = dict(
+        detetar_tipo=detetar_tipo,
+        incluir=tuple(incluir),
+        excluir=(*EXCLUSOES_POR_DEFEITO, raiz_destino.name, *excluir),
+        profundidade_maxima=profundidade,
+        pastas_excluidas=(raiz_destino,),
+    )
+    if workers is not None:
+        opcoes["max_workers"] = workers
+    return ScannerDeFicheiros(**opcoes)
+
+def listar_ficheiros_foto(raiz: Path, limite: Optional[int] = None, workers: Optional[int] = None) -> List[Path]:
+    return criar_scanner(raiz, workers).listar(raiz, limite=limite)
+
+def detetar_imagens_grandes(
+    caminhos: list[Path],
+    formatos: Optional[Mapping[Path, Optional[str]]] = None,
+    dimensoes: Optional[Dict[Path, Optional[Dimensoes]]] = None,
+    falhas: Optional[Dict[Path, str]] = None,
+) -> tuple[list[Path], int]:
     """
     Devolve (lista_grandes, max_pixels).
-    Abre a imagem apenas para ler dimensões, e não deixa o warning "vazar".
+    Lê apenas os cabeçalhos (sem descodificar), várias imagens em paralelo.
     Considera "grande" se exceder o limite atual do Pillow (MAX_IMAGE_PIXELS).
+    Com `formatos` (do scan), ficheiros que o Pillow não abre nem são tentados.
+    `dimensoes` funciona como cache: o que já lá estiver não é relido e o que for
+    sondado fica lá para as fases seguintes (a Foto recebe as dimensões já lidas).
+    `falhas`: ficheiros que o Pillow não conseguiu abrir (motivo); também não são relidos
+    e a Foto nasce já marcada como não descodificável.
     """
     grandes: list[Path] = []
     max_px = 0
@@ -46,24 +81,55 @@ def detetar_imagens_grandes(caminhos: list[Path]) -> tuple[list[Path], int]:
         # Se estiver None, não há limite => não sinalizamos nada como "grande"
         return [], 0
 
+    if dimensoes is None:
+        dimensoes = {}
+    if falhas is None:
+        falhas = {}
+    a_sondar = [
+        p for p in caminhos
+        if p not in dimensoes and p not in falhas
+        and (formatos is None or formato_decodificavel(formatos.get(p)))
+    ]
+    dimensoes.update(ler_dimensoes_em_lote(a_sondar, falhas=falhas))
+
     for p in caminhos:
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore", PILImage.DecompressionBombWarning)
-                with Image.open(p) as img:
-                    px = img.size[0] * img.size[1]
-
-            if px > int(limite):
-                grandes.append(p)
-                max_px = max(max_px, px)
-
-        except Exception:
-            # se não conseguir abrir, ignora para este check
+        dims = dimensoes.get(p)
+        if dims is None:
+            # se não conseguir ler, ignora para este check
             continue
+        px = dims[0] * dims[1]
+        if px > int(limite):
+            grandes.append(p)
+            max_px = max(max_px, px)
 
     return grandes, max_px
 
-def decidir_tratamento_imagens_grandes(caminhos: list[Path]) -> tuple[Optional[list[Path]], bool, int]:
+def _separar_grandes(
+    encontrados: Iterable[FicheiroEncontrado],
+    grandes: list[FicheiroEncontrado],
+) -> Iterator[FicheiroEncontrado]:
+    """
+    Versão streaming do check de imagens grandes:
+    deixa passar as normais e guarda as grandes em `grandes` (para decidir no fim).
+    As dimensões lidas (ou a falha do Pillow) seguem no FicheiroEncontrado (não voltam a ser sondadas).
+    """
+    limite = PILImage.MAX_IMAGE_PIXELS
+    for e in encontrados:
+        if limite is not None and e.falha is None and formato_decodificavel(e.formato):
+            falhas: Dict[Path, str] = {}
+            dims = e.dimensoes or ler_dimensoes(e.caminho, falhas)
+            e = replace(e, dimensoes=dims, falha=falhas.get(e.caminho))
+            if dims is not None and dims[0] * dims[1] > int(limite):
+                grandes.append(e)
+                continue
+        yield e
+
+def decidir_tratamento_imagens_grandes(
+    caminhos: list[Path],
+    formatos: Optional[Mapping[Path, Optional[str]]] = None,
+    dimensoes: Optional[Dict[Path, Optional[Dimensoes]]] = None,
+    falhas: Optional[Dict[Path, str]] = None,
+) -> tuple[Optional[list[Path]], bool, int]:
     """
     Decide o que fazer quando há imagens muito grandes.
     Retorna:
@@ -71,7 +137,7 @@ def decidir_tratamento_imagens_grandes(caminhos: list[Path]) -> tuple[Optional[l
       - incluir_grandes (True => processar tudo; False => ignorar grandes)
       - n_grandes (para mensagens)
     """
-    grandes, max_px = detetar_imagens_grandes(caminhos)
+    grandes, max_px = detetar_imagens_grandes(caminhos, formatos, dimensoes, falhas)
     if not grandes:
         return caminhos, True, 0
 
@@ -108,20 +174,137 @@ def decidir_tratamento_imagens_grandes(caminhos: list[Path]) -> tuple[Optional[l
     print("Ok — cancelado. Não foi feita nenhuma análise nem alterações no disco.")
     return None, False, n_grandes
 
-def construir_fotos(caminhos: Iterable[Path]) -> List[Foto]:
-    fotos: List[Foto] = []
-    for c in caminhos:
-        f = Foto(c)
-        f.extrair_metadados()
-        f.calcular_hash()
-        fotos.append(f)
+def criar_construtor(
+    manifesto: Optional[ManifestoScan] = None,
+    workers: int = 1,
+    cache: Optional[CacheMetadados] = None,
+    campos: Optional[FrozenSet[str]] = None,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> ConstrutorDeFotos:
+    # só cabeçalho/EXIF + dimensões: o hash fica para os níveis dos duplicados exatos (tamanho ->
+    # início/fim -> completo) e o pHash para os quase-duplicados, que só o calculam para as fotos
+    # que não são duplicados exatos => só fotos com o tamanho de outra são lidas por inteiro mais de uma vez
+    # workers: 0 = um processo por core; 1 = serial
+    # campos: só o que a regra/detetores precisam (None = tudo)
+    # data_pelo_nome: data tirada do nome do ficheiro (IMG_20230514_183012.jpg ...) segundo a política
+    workers = workers or os.cpu_count() or 1
+    return ConstrutorDeFotos(
+        manifesto=manifesto,
+        analisador=AnalisadorDeFotos(calcular_phash=False, calcular_hash=False),
+        workers=workers,
+        cache=cache,
+        campos=campos,
+        data_pelo_nome=data_pelo_nome,
+    )
+
+def construir_fotos(
+    caminhos: Iterable[ItemFoto],
+    manifesto: Optional[ManifestoScan] = None,
+    workers: int = 1,
+    cache: Optional[CacheMetadados] = None,
+    campos: Optional[FrozenSet[str]] = None,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> List[Foto]:
+    return criar_construtor(manifesto, workers, cache, campos, data_pelo_nome).construir(caminhos)
+
+def criar_data_pelo_nome(politica: Optional[str], padroes: Sequence[str] = ()) -> Optional[DataPeloNome]:
+    """None (só EXIF/mtime) se não foi pedida política nem padrões; padrões inválidos => re.error."""
+    if politica is None and not padroes:
+        return None
+    return DataPeloNome.com_padroes_extra(PoliticaData(politica or PoliticaData.EXIF_PRIMEIRO), padroes)
+
+def campos_necessarios(regra: Optional[RegraDeOrganizacao], deduplicar: bool) -> FrozenSet[str]:
+    """Pergunta à regra e aos detetores ativos que campos da Foto vão ler."""
+    campos = set(regra.campos_necessarios) if regra is not None else set()
+    if deduplicar:
+        campos |= DetetarDuplicados.campos_necessarios(quase_duplicados=True)
+    return frozenset(campos)
+
+def construir_fotos_em_stream(
+    origem: Path,
+    limite: Optional[int],
+    buffer: int = 256,
+    manifesto: Optional[ManifestoScan] = None,
+    scanner: Optional[ScannerDeFicheiros] = None,
+    workers: int = 1,
+    cache: Optional[CacheMetadados] = None,
+    campos: Optional[FrozenSet[str]] = None,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> Optional[List[Foto]]:
+    """
+    Scan -> (check de grandes) -> EXIF/hash em pipeline, sem lista intermédia de caminhos.
+
+    As imagens muito grandes ficam de lado (não são abertas para EXIF) e só no fim
+    se pergunta se devem ser incluídas. Devolve None se não houver nenhuma foto.
+    """
+    grandes: list[FicheiroEncontrado] = []
+    scanner = scanner or criar_scanner(origem)
+    encontrados = em_buffer(scanner.iterar_ficheiros(origem, limite=limite), tamanho=buffer)
+    construtor = criar_construtor(manifesto, workers, cache, campos, data_pelo_nome)
+    fotos = construtor.construir(_separar_grandes(encontrados, grandes))
+
+    if grandes:
+        print(
+            f"\nAVISO: Detetadas {len(grandes)} imagem(ns) muito grandes. "
+            "O Pillow avisa por segurança (DecompressionBombWarning) e o processamento pode ser mais lento/consumir mais RAM."
+        )
+        if perguntar_aplicar(f"Incluir as {len(grandes)} imagem(ns) muito grandes? [s/N] "):
+            PILImage.MAX_IMAGE_PIXELS = 200_000_000  # 200MP
+            fotos.extend(construtor.construir(grandes))
+        else:
+            print(f"Ok — a continuar SEM {len(grandes)} imagem(ns) muito grandes.")
+
+    if not fotos and not grandes:
+        return None
     return fotos
 
+def criar_regra(regra: str, precision: int) -> Optional[RegraDeOrganizacao]:
+    if regra == "data":
+        return RegraPorData()
+    if regra == "local":
+        return RegraPorLocal(precision=precision)
+    print(f"ERRO: regra inválida: {regra} (usa 'data' ou 'local')")
+    return None
 
 def escolher_raiz_destino(pasta_origem: Path) -> Path:
     # cria a pasta ao mesmo nível da origem
     return pasta_origem.parent / "Foto_Organizada"
 
+def abrir_manifesto(origem: Path, incremental: bool) -> Optional[ManifestoScan]:
+    if not incremental:
+        return None
+    return ManifestoScan.carregar(caminho_manifesto(escolher_raiz_destino(origem)))
+
+def fechar_manifesto(manifesto: Optional[ManifestoScan]) -> None:
+    if manifesto is None:
+        return
+    try:
+        manifesto.guardar()
+    except OSError as e:
+        print(f"AVISO: não foi possível guardar o manifesto ({manifesto.caminho}): {e}")
+        return
+    print(f"Manifesto: reutilizadas={manifesto.reutilizadas} processadas={manifesto.processadas}")
+
+def abrir_cache(usar_cache: bool) -> Optional[CacheMetadados]:
+    if not usar_cache:
+        return None
+    caminho = caminho_cache_por_defeito()
+    try:
+        return CacheMetadados(caminho)
+    except (OSError, sqlite3.Error) as e:
+        print(f"AVISO: cache de metadados indisponível ({caminho}): {e}")
+        return None
+
+def fechar_cache(cache: Optional[CacheMetadados]) -> None:
+    if cache is None:
+        return
+    try:
+        cache.fechar()
+    except sqlite3.Error as e:
+        print(f"AVISO: não foi possível fechar a cache ({cache.caminho}): {e}")
+        return
+    print(f"Cache: acertos={cache.acertos} falhas={cache.falhas}")
+
 def perguntar_aplicar(pergunta: str = "Aplicar agora as operações? [s/N] ") -> bool:
     """
     Pergunta ao utilizador e devolve True/False.
@@ -143,18 +326,74 @@ def preparar_plano(
     regra: str,
     precision: int,
     limite: Optional[int],
+    stream: bool = False,
+    incremental: bool = False,
+    scanner: Optional[ScannerDeFicheiros] = None,
+    workers: int = 1,
+    usar_cache: bool = False,
+    deduplicar: bool = True,
+    data_pelo_nome: Optional[DataPeloNome] = None,
 ) -> tuple[list[Foto], list, int, Path, str] | int:
     if not origem.exists() or not origem.is_dir():
         print(f"ERRO: origem não existe ou não é diretório: {origem}")
         return 2
 
-    caminhos = listar_ficheiros_foto(origem, limite=limite)
+    regra_obj = criar_regra(regra, precision)
+    if regra_obj is None:
+        return 2
+
+    cache = abrir_cache(usar_cache)
+    try:
+        return _preparar_plano(
+            origem, regra_obj, regra, limite, stream, incremental, scanner, workers, cache, deduplicar,
+            data_pelo_nome,
+        )
+    finally:
+        fechar_cache(cache)
+
+def _preparar_plano(
+    origem: Path,
+    regra_obj: RegraDeOrganizacao,
+    regra: str,
+    limite: Optional[int],
+    stream: bool,
+    incremental: bool,
+    scanner: Optional[ScannerDeFicheiros],
+    workers: int,
+    cache: Optional[CacheMetadados],
+    deduplicar: bool,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+) -> tuple[list[Foto], list, int, Path, str] | int:
+    # só se extrai o que a regra e os detetores ativos vão ler
+    campos = campos_necessarios(regra_obj, deduplicar)
+
+    if stream:
+        warnings.filterwarnings("ignore", category=PILImage.DecompressionBombWarning)
+        manifesto = abrir_manifesto(origem, incremental)
+        fotos_stream = construir_fotos_em_stream(
+            origem, limite=limite, manifesto=manifesto, scanner=scanner, workers=workers, cache=cache,
+            campos=campos, data_pelo_nome=data_pelo_nome,
+        )
+        fechar_manifesto(manifesto)
+        if fotos_stream is None:
+            print("Nenhuma foto encontrada (extensões suportadas: jpg/jpeg/png/webp/tif/tiff/heic).")
+            return 0
+        return _planear(fotos_stream, origem, regra_obj, regra, cache, deduplicar, workers)
+
+    scanner = scanner or criar_scanner(origem)
+    encontrados = scanner.listar_ficheiros(origem, limite=limite)
+    caminhos = [e.caminho for e in encontrados]
     if not caminhos:
         print("Nenhuma foto encontrada (extensões suportadas: jpg/jpeg/png/webp/tif/tiff/heic).")
         return 0
 
     # ✅ NOVO: decisão do que fazer com imagens grandes (antes de abrir EXIF/pHash)
-    caminhos_decididos, incluir_grandes, _n_grandes = decidir_tratamento_imagens_grandes(caminhos)
+    formatos = {e.caminho: e.formato for e in encontrados}
+    dimensoes: Dict[Path, Optional[Dimensoes]] = {}
+    falhas: Dict[Path, str] = {}
+    caminhos_decididos, incluir_grandes, _n_grandes = decidir_tratamento_imagens_grandes(
+        caminhos, formatos, dimensoes, falhas
+    )
     if caminhos_decididos is None:
         # cancelado pelo utilizador
         return 0
@@ -168,31 +407,49 @@ def preparar_plano(
     if incluir_grandes:
         PILImage.MAX_IMAGE_PIXELS = 200_000_000  # 200MP
 
-    fotos = construir_fotos(caminhos)
+    manter = set(caminhos)
+    encontrados = [
+        replace(e, dimensoes=dimensoes.get(e.caminho), falha=falhas.get(e.caminho))
+        for e in encontrados if e.caminho in manter
+    ]
+    manifesto = abrir_manifesto(origem, incremental)
+    fotos = construir_fotos(
+        encontrados, manifesto=manifesto, workers=workers, cache=cache, campos=campos,
+        data_pelo_nome=data_pelo_nome,
+    )
+    fechar_manifesto(manifesto)
+    return _planear(fotos, origem, regra_obj, regra, cache, deduplicar, workers)
 
-    det = DetetarDuplicados()
-    det.marcar_duplicados(fotos)
+def _planear(
+    fotos: list[Foto],
+    origem: Path,
+    regra_obj: RegraDeOrganizacao,
+    regra: str,
+    cache: Optional[CacheMetadados] = None,
+    deduplicar: bool = True,
+    workers: int = 1,
+) -> tuple[list[Foto], list, int, Path, str] | int:
+    if deduplicar:
+        # pHash em falta (não veio da análise nem da cache): mesmo nº de processos que a análise
+        det = DetetarDuplicados(cache=cache, workers_phash=workers)
+        det.marcar_duplicados(fotos)
 
-    # quase duplicados (se o método existir)
-    if hasattr(det, "marcar_quase_duplicados"):
-        det.marcar_quase_duplicados(fotos, threshold=3)
+        # quase duplicados (se o método existir)
+        if hasattr(det, "marcar_quase_duplicados"):
+            det.marcar_quase_duplicados(fotos, threshold=3)
 
     n_duplicadas = sum(1 for f in fotos if f.duplicada)
 
-    if regra == "data":
-        regra_obj = RegraPorData()
-    elif regra == "local":
-        regra_obj = RegraPorLocal(precision=precision)
-    else:
-        print(f"ERRO: regra inválida: {regra} (usa 'data' ou 'local')")
-        return 2
-
     raiz_destino = escolher_raiz_destino(origem)
     plano = PlanoDeOperacoes(regra=regra_obj, raiz_destino=raiz_destino)
     operacoes = plano.gerar(fotos)
 
     return fotos, operacoes, n_duplicadas, raiz_destino, regra
 
+def contar_nao_decodificaveis(fotos: Iterable[Foto]) -> int:
+    """Fotos que o Pillow não abre (formato sem suporte ou falha registada numa das fases)."""
+    return sum(1 for f in fotos if f.falha_descodificacao is not None)
+
 def executar_e_relatar(
     origem: Path,
     raiz_destino: Path,
@@ -200,6 +457,7 @@ def executar_e_relatar(
     operacoes,
     n_duplicadas: int,
     modo_preview: bool,
+    n_nao_decodificaveis: Optional[int] = None,
 ) -> int:
     monitor = MonitorDeOperacoes()
     executor = ExecutorSeguro(monitor=monitor)
@@ -210,6 +468,7 @@ def executar_e_relatar(
         resultado=resultado,
         registos=monitor.obter_registos(),
         duplicadas=n_duplicadas,
+        nao_decodificaveis=n_nao_decodificaveis,
     )
 
     modo_txt = "PREVIEW" if modo_preview else "REAL"
@@ -218,7 +477,10 @@ def executar_e_relatar(
     print(f"Destino: {raiz_destino}")
     print(f"Operações: total={resumo.total_operacoes} movidas={resumo.movidas} skipped={resumo.skipped} erros={resumo.erros}")
     print(f"Duplicadas: {resumo.duplicadas}")
+    if resumo.nao_decodificaveis:
+        print(f"Não descodificáveis: {resumo.nao_decodificaveis} (data pelo nome/mtime, sem pHash)")
     print(f"Logs: info={resumo.logs_info} warn={resumo.logs_warn} error={resumo.logs_error}")
+    print(f"Stat: feitas={CONTADOR_STAT.feitas} poupadas={CONTADOR_STAT.poupadas}")
 
     return 0
 
@@ -230,13 +492,15 @@ def run(
     limite: Optional[int],
     caminhos: Optional[List[Path]] = None,
     incluir_grandes: bool = True,
+    incremental: bool = False,
+    scanner: Optional[ScannerDeFicheiros] = None,
 ) -> int:
     if not origem.exists() or not origem.is_dir():
         print(f"ERRO: origem não existe ou não é diretório: {origem}")
         return 2
 
     if caminhos is None:
-        caminhos = listar_ficheiros_foto(origem, limite=limite)
+        caminhos = (scanner or criar_scanner(origem)).listar(origem, limite=limite)
 
     if not caminhos:
         print("Nenhuma foto encontrada (extensões suportadas: jpg/jpeg/png/webp/tif/tiff/heic).")
@@ -247,7 +511,9 @@ def run(
         PILImage.MAX_IMAGE_PIXELS = 200_000_000  # 200MP
         warnings.filterwarnings("ignore", category=PILImage.DecompressionBombWarning)
 
-    fotos = construir_fotos(caminhos)
+    manifesto = abrir_manifesto(origem, incremental)
+    fotos = construir_fotos(caminhos, manifesto=manifesto)
+    fechar_manifesto(manifesto)
 
     # Duplicados: 1) exatos (MD5) + 2) quase duplicados (pHash)
     det = DetetarDuplicados()
@@ -261,12 +527,8 @@ def run(
     n_duplicadas = sum(1 for f in fotos if f.duplicada)
 
     # Regra
-    if regra == "data":
-        regra_obj = RegraPorData()
-    elif regra == "local":
-        regra_obj = RegraPorLocal(precision=precision)
-    else:
-        print(f"ERRO: regra inválida: {regra} (usa 'data' ou 'local')")
+    regra_obj = criar_regra(regra, precision)
+    if regra_obj is None:
         return 2
 
     raiz_destino = escolher_raiz_destino(origem)
@@ -286,6 +548,7 @@ def run(
         resultado=resultado,
         registos=monitor.obter_registos(),
         duplicadas=n_duplicadas,
+        nao_decodificaveis=contar_nao_decodificaveis(fotos),
     )
 
     # Output simples
@@ -293,7 +556,10 @@ def run(
     print(f"\n=== Foto_Organizada | modo={modo_txt} | regra={regra} ===")
     print(f"Origem: {origem}")
     print(f"Destino: {raiz_destino}")
-    print(f"Fotos analisadas: {len(fotos)} | Duplicadas: {resumo.duplicadas}")
+    print(
+        f"Fotos analisadas: {len(fotos)} | Duplicadas: {resumo.duplicadas}"
+        f" | Não descodificáveis: {resumo.nao_decodificaveis}"
+    )
     print(f"Operações: total={resumo.total_operacoes} movidas={resumo.movidas} skipped={resumo.skipped} erros={resumo.erros}")
     print(f"Logs: info={resumo.logs_info} warn={resumo.logs_warn} error={resumo.logs_error}")
 
@@ -310,6 +576,70 @@ def run(
 
     return 0
 
+def vigiar(
+    origem: Path,
+    regra: str,
+    precision: int,
+    modo_preview: bool,
+    debounce: float = 2.0,
+    tamanho_lote: int = 50,
+    usar_cache: bool = False,
+    data_pelo_nome: Optional[DataPeloNome] = None,
+    scanner: Optional[ScannerDeFicheiros] = None,
+) -> int:
+    """
+    Modo contínuo: organiza as fotos à medida que chegam à origem.
+
+    Cada lote (ficheiros já fechados + debounce) passa pelo pipeline normal:
+    Foto -> duplicados (dentro do lote) -> PlanoDeOperacoes -> ExecutorSeguro.
+    A poda do scanner (--incluir/--excluir/--profundidade) vale para a listagem inicial
+    e para os ficheiros que vão chegando.
+    """
+    if not origem.exists() or not origem.is_dir():
+        print(f"ERRO: origem não existe ou não é diretório: {origem}")
+        return 2
+
+    regra_obj = criar_regra(regra, precision)
+    if regra_obj is None:
+        return 2
+    raiz_destino = escolher_raiz_destino(origem)
+
+    cache = abrir_cache(usar_cache)
+
+    def processar_lote(caminhos: List[Path]) -> None:
+        fotos = construir_fotos(caminhos, cache=cache, data_pelo_nome=data_pelo_nome)
+        det = DetetarDuplicados(cache=cache)
+        det.marcar_duplicados(fotos)
+        det.marcar_quase_duplicados(fotos, threshold=3)
+        n_duplicadas = sum(1 for f in fotos if f.duplicada)
+
+        operacoes = PlanoDeOperacoes(regra=regra_obj, raiz_destino=raiz_destino).gerar(fotos)
+        executar_e_relatar(
+            origem=origem,
+            raiz_destino=raiz_destino,
+            regra=regra,
+            operacoes=operacoes,
+            n_duplicadas=n_duplicadas,
+            modo_preview=modo_preview,
+            n_nao_decodificaveis=contar_nao_decodificaveis(fotos),
+        )
+
+    scanner = scanner or criar_scanner(origem)
+    vigia = VigiaDePasta(
+        origem, processar_lote, debounce=debounce, tamanho_lote=tamanho_lote,
+        filtro=lambda caminho: scanner.aceita(origem, caminho),
+    )
+    modo_txt = "PREVIEW" if modo_preview else "REAL"
+    print(f"A vigiar {origem} ({type(vigia.fonte).__name__}, modo={modo_txt}) — Ctrl+C para terminar.")
+
+    # o que já lá está também entra (como se tivesse acabado de chegar)
+    try:
+        vigia.adicionar_existentes(scanner.listar(origem))
+        vigia.executar()
+    finally:
+        fechar_cache(cache)
+    return 0
+
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Organizador de Fotografias (CLI) — AF3→AF6")
     # Pasta onde estão as fotos
@@ -322,6 +652,35 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--precision", type=int, default=3, help="Precisão GPS (só na regra local)")
     # Limitar o número de fotos que podem ser processadas.
     p.add_argument("--limite", type=int, default=None, help="Limitar nº de fotos (debug/teste)")
+    # Scan e extração de metadados em pipeline (sem esperar pela lista completa)
+    p.add_argument("--stream", action="store_true", help="Processa as fotos à medida que o scan as encontra")
+    # EXIF/hash/pHash em vários processos (0 = um por core)
+    p.add_argument("--workers", type=int, default=1, help="Processos para EXIF/hash (0 = todos os cores; 1 = serial)")
+    # Sem deteção de duplicados: com --regra data nem o hash dos ficheiros é calculado
+    p.add_argument("--sem-duplicados", action="store_true", help="Não procura duplicados (nem calcula hashes)")
+    # Cache SQLite de EXIF/hash/pHash partilhada entre execuções (ligada por defeito)
+    p.add_argument("--sem-cache", action="store_true", help="Não lê nem escreve a cache de metadados")
+    # Data pelo nome do ficheiro (IMG_20230514_183012.jpg, WhatsApp Image 2023-05-14 at ...)
+    p.add_argument(
+        "--data-do-nome",
+        choices=[politica.value for politica in PoliticaData],
+        default=None,
+        help="Data pelo nome do ficheiro: exif (EXIF primeiro), nome (nome primeiro), so-nome (nunca abre o ficheiro)",
+    )
+    p.add_argument("--padrao-data", action="append", default=[], metavar="REGEX",
+                   help="Padrão extra para a data no nome (grupos ano/mes/dia[/hora/minuto/segundo]; repetível)")
+    # Reutiliza EXIF/hash de ficheiros que não mudaram desde o último scan
+    p.add_argument("--incremental", action="store_true", help="Usa/atualiza o manifesto ao lado de Foto_Organizada")
+    # Modo contínuo: organiza as fotos à medida que chegam (inotify; polling como fallback)
+    p.add_argument("--vigiar", action="store_true", help="Fica a vigiar a origem e organiza em lotes")
+    p.add_argument("--debounce", type=float, default=2.0, help="Segundos sem alterações antes de processar (--vigiar)")
+    p.add_argument("--lote", type=int, default=50, help="Máximo de fotos por lote (--vigiar)")
+    # Decide o formato pelos primeiros bytes (apanha extensões erradas/estranhas)
+    p.add_argument("--detetar-tipo", action="store_true", help="Identifica imagens pelo conteúdo e não pela extensão")
+    # Poda do scan (subárvores excluídas nem são lidas)
+    p.add_argument("--incluir", action="append", default=[], metavar="GLOB", help="Só ficheiros que correspondam (repetível)")
+    p.add_argument("--excluir", action="append", default=[], metavar="GLOB", help="Pastas/ficheiros a saltar (repetível)")
+    p.add_argument("--profundidade", type=int, default=None, help="Profundidade máxima (0 = só a pasta origem)")
     # Opção de continuar com real após relatório de preview
     p.add_argument("--yes", action="store_true", help="Aplicar após preview sem perguntar")
     return p.parse_args()
@@ -330,16 +689,53 @@ def parse_args() -> argparse.Namespace:
 def main() -> int:
     args = parse_args()
 
+    try:
+        data_pelo_nome = criar_data_pelo_nome(args.data_do_nome, args.padrao_data)
+    except re.error as e:
+        print(f"ERRO: --padrao-data inválido: {e}")
+        return 2
+
+    # a mesma poda em todos os modos
+    scanner = criar_scanner(
+        args.origem,
+        detetar_tipo=args.detetar_tipo,
+        incluir=args.incluir,
+        excluir=args.excluir,
+        profundidade=args.profundidade,
+    )
+
+    if args.vigiar:
+        # sem perguntas interativas: só mexe no disco com --modo real ou --yes
+        return vigiar(
+            origem=args.origem,
+            regra=args.regra,
+            precision=args.precision,
+            modo_preview=not (args.yes or args.modo == "real"),
+            debounce=args.debounce,
+            tamanho_lote=args.lote,
+            usar_cache=not args.sem_cache,
+            data_pelo_nome=data_pelo_nome,
+            scanner=scanner,
+        )
+
     prep = preparar_plano(
         origem=args.origem,
         regra=args.regra,
         precision=args.precision,
         limite=args.limite,
+        stream=args.stream,
+        incremental=args.incremental,
+        workers=args.workers,
+        usar_cache=not args.sem_cache,
+        deduplicar=not args.sem_duplicados,
+        data_pelo_nome=data_pelo_nome,
+        scanner=scanner,
     )
     if isinstance(prep, int):
         return prep
 
     fotos, operacoes, n_duplicadas, raiz_destino, regra = prep
+    n_nao_decodificaveis = contar_nao_decodificaveis(fotos)
 
     # 1) Preview (usando o plano já calculado)
     code = executar_e_relatar(
@@ -349,6 +745,7 @@ def main() -> int:
         operacoes=operacoes,
         n_duplicadas=n_duplicadas,
         modo_preview=True,
+        n_nao_decodificaveis=n_nao_decodificaveis,
     )
     if code != 0:
         return code
@@ -368,6 +765,7 @@ def main() -> int:
         operacoes=operacoes,
         n_duplicadas=n_duplicadas,
         modo_preview=False,
+        n_nao_decodificaveis=n_nao_decodificaveis,
     )
 
 
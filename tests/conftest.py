@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import pytest
+from PIL import Image, ImageDraw
+
+
+def _criar_jpeg(
+    destino: Path,
+    data_exif: Optional[str] = None,
+    cor="white",
+    tamanho: Tuple[int, int] = (120, 80),
+) -> Path:
+    """JPEG com um retângulo (pHash não trivial) e, opcionalmente, DateTime (tag 306) no EXIF."""
+    largura, altura = tamanho
+    img = Image.new("RGB", tamanho, cor)
+    ImageDraw.Draw(img).rectangle(
+        [largura // 8, altura // 8, largura * 5 // 8, altura * 3 // 4],
+        outline="black",
+        width=max(1, min(tamanho) // 30),
+    )
+    exif = Image.Exif()
+    if data_exif:
+        exif[306] = data_exif
+    img.save(destino, format="JPEG", exif=exif)
+    return destino
+
+
+@pytest.fixture
+def criar_jpeg() -> Callable[..., Path]:
+    """Fábrica de JPEGs de teste: criar_jpeg(destino, data_exif=None, cor="white", tamanho=(120, 80))."""
+    return _criar_jpeg
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import imagehash
+import numpy as np
+import pytest
+
+from classes.agrupamento_hamming import (
+    MINIMO_PARA_POOL,
+    ModoAgrupamento,
+    UniaoDisjunta,
+    agrupar_componentes,
+    fragmentar,
+    pares_do_fragmento,
+)
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+
+
+def _hashes_com_vizinhos(n: int, semente: int = 11) -> list[int]:
+    """Poucos "originais" aleatórios + cópias com 0-5 bits trocados, baralhados."""
+    rnd = random.Random(semente)
+    bases = [rnd.getrandbits(64) for _ in range(max(1, n // 4))]
+    valores = list(bases)
+    while len(valores) < n:
+        v = rnd.choice(bases)
+        for _ in range(rnd.randint(0, 5)):
+            v ^= 1 << rnd.randrange(64)
+        valores.append(v)
+    rnd.shuffle(valores)
+    return valores
+
+
+def _componentes_lineares(valores: list[int], t: int) -> list[list[int]]:
+    uniao = UniaoDisjunta(len(valores))
+    for i, vi in enumerate(valores):
+        for j in range(i + 1, len(valores)):
+            if (vi ^ valores[j]).bit_count() <= t:
+                uniao.unir(i, j)
+    return uniao.componentes()
+
+
+def test_u_uniao_disjunta_raiz_e_o_menor():
+    uniao = UniaoDisjunta(6)
+    uniao.unir_pares([(4, 5), (5, 2), (0, 1)])
+
+    assert uniao.encontrar(5) == 2
+    assert uniao.componentes() == [[0, 1], [2, 4, 5], [3]]
+
+
+@pytest.mark.parametrize("t", [-1, 0, 2, 5, 64])
+def test_u_componentes_iguais_as_da_comparacao_de_todos_os_pares(t: int):
+    valores = _hashes_com_vizinhos(300)
+
+    assert agrupar_componentes(valores, t) == _componentes_lineares(valores, t)
+
+
+def test_u_fragmentos_cobrem_todos_os_pares():
+    valores = _hashes_com_vizinhos(300)
+    pares = set()
+    for fragmento in fragmentar(valores, 4):
+        pares.update(pares_do_fragmento(fragmento, 4))
+
+    linear = {
+        (i, j) for i in range(len(valores)) for j in range(i + 1, len(valores))
+        if (valores[i] ^ valores[j]).bit_count() <= 4
+    }
+    assert pares == linear
+
+
+def test_u_fragmentos_em_pool_igual_ao_serial():
+    valores = _hashes_com_vizinhos(MINIMO_PARA_POOL + 100, semente=5)
+
+    assert agrupar_componentes(valores, 3, workers=2) == agrupar_componentes(valores, 3)
+
+
+def _foto_com_phash(caminho: Path, v: int) -> Foto:
+    foto = Foto(caminho)
+    bits = np.array([(v >> (63 - b)) & 1 for b in range(64)], dtype=bool).reshape(8, 8)
+    foto.definir_hash_visual(imagehash.ImageHash(bits))
+    return foto
+
+
+def _nomes(grupos) -> list[list[str]]:
+    return [[f.nome_de_ficheiro for f in g.fotos] for g in grupos]
+
+
+def test_u_cadeia_fica_num_so_grupo(tmp_path: Path):
+    # a~b (2 bits), b~c (2 bits), a e c a 4 bits
+    valores = {"a.jpg": 0b0000, "b.jpg": 0b0011, "c.jpg": 0b1111}
+
+    def fotos(ordem):
+        return [_foto_com_phash(tmp_path / n, valores[n]) for n in ordem]
+
+    guloso = DetetarDuplicados().detetar_quase_duplicados(fotos(["a.jpg", "c.jpg", "b.jpg"]), threshold=2)
+    assert _nomes(guloso) == [["a.jpg", "b.jpg"]]  # c ficou de fora por ter chegado antes de b
+
+    det = DetetarDuplicados(agrupamento="componentes")
+    grupos = det.detetar_quase_duplicados(fotos(["a.jpg", "c.jpg", "b.jpg"]), threshold=2)
+    assert _nomes(grupos) == [["a.jpg", "b.jpg", "c.jpg"]]
+    assert grupos[0].hash_visual == "0000000000000000"
+
+
+def test_u_componentes_nao_dependem_da_ordem(tmp_path: Path):
+    valores = _hashes_com_vizinhos(200, semente=3)
+    nomes = [f"{i:04d}.jpg" for i in range(len(valores))]
+    det = DetetarDuplicados(agrupamento=ModoAgrupamento.COMPONENTES)
+
+    resultados = []
+    for semente in range(3):
+        ordem = list(range(len(valores)))
+        random.Random(semente).shuffle(ordem)
+        fotos = [_foto_com_phash(tmp_path / nomes[i], valores[i]) for i in ordem]
+        grupos = det.detetar_quase_duplicados(fotos, threshold=3)
+        duplicadas = sorted(f.nome_de_ficheiro for f in fotos if f.duplicada)
+        resultados.append((_nomes(grupos), [g.hash_visual for g in grupos], duplicadas))
+
+    assert resultados[0] == resultados[1] == resultados[2]
+    esperado = [c for c in _componentes_lineares(valores, 3) if len(c) > 1]
+    assert sorted(_nomes_por_indice(resultados[0][0])) == sorted(esperado)
+
+
+def _nomes_por_indice(nomes_dos_grupos: list[list[str]]) -> list[list[int]]:
+    return [sorted(int(n.split(".")[0]) for n in g) for g in nomes_dos_grupos]
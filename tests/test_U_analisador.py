@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import imagehash
+from PIL import Image
+
+import classes.analisador_de_fotos as analisador_module
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+
+
+def test_u_analisador_da_o_mesmo_resultado_que_os_passos_separados(tmp_path: Path, criar_jpeg):
+    p = criar_jpeg(tmp_path / "a.jpg", data_exif="2021:03:04 05:06:07", tamanho=(160, 120))
+
+    classica = Foto(p)
+    classica.extrair_metadados()
+    classica.calcular_hash()
+
+    unica = Foto(p)
+    AnalisadorDeFotos().analisar(unica)
+
+    assert unica.hash_conteudo == classica.hash_conteudo
+    assert unica.data_de_captura == classica.data_de_captura == datetime(2021, 3, 4, 5, 6, 7)
+    assert unica.local_gps == classica.local_gps
+    assert unica.dimensoes == (160, 120)
+    with Image.open(p) as img:
+        assert unica.hash_visual == imagehash.phash(img)
+
+
+def test_u_analisador_le_o_ficheiro_uma_so_vez(tmp_path: Path, monkeypatch, criar_jpeg):
+    p = criar_jpeg(tmp_path / "a.jpg")
+
+    aberturas = []
+    original_open = Path.open
+
+    def open_contado(self, *args, **kwargs):
+        aberturas.append(self)
+        return original_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", open_contado)
+    # o Pillow só pode receber o buffer em memória, nunca o caminho
+    original_image_open = analisador_module.Image.open
+
+    def image_open_so_buffer(fp, *args, **kwargs):
+        assert not isinstance(fp, (str, Path))
+        return original_image_open(fp, *args, **kwargs)
+
+    monkeypatch.setattr(analisador_module.Image, "open", image_open_so_buffer)
+
+    AnalisadorDeFotos().analisar(Foto(p))
+
+    assert aberturas == [p]
+
+
+def test_u_analisador_sem_hash_so_le_o_cabecalho(tmp_path: Path, monkeypatch):
+    p = tmp_path / "a.jpg"
+    exif = Image.Exif()
+    exif[306] = "2021:03:04 05:06:07"
+    # ruído: um JPEG bem maior que o cabeçalho
+    Image.frombytes("RGB", (1600, 1200), os.urandom(1600 * 1200 * 3)).save(p, format="JPEG", exif=exif)
+
+    lidos = []
+    original_open = Path.open
+
+    def open_contado(self, *args, **kwargs):
+        f = original_open(self, *args, **kwargs)
+        original_read = f.read
+        f.read = lambda n=-1: lidos.append(len(dados := original_read(n))) or dados
+        return f
+
+    monkeypatch.setattr(Path, "open", open_contado)
+    foto = Foto(p)
+    AnalisadorDeFotos(calcular_hash=False, calcular_phash=False).analisar(foto)
+
+    assert foto.hash_conteudo is None  # fica para os níveis de DetetarDuplicados
+    assert foto.dimensoes == (1600, 1200)
+    assert foto.data_de_captura == datetime(2021, 3, 4, 5, 6, 7)
+    assert sum(lidos) < p.stat().st_size // 10
+
+
+def test_u_analisador_ficheiro_nao_imagem_tem_hash_e_data_do_mtime(tmp_path: Path):
+    p = tmp_path / "falso.jpg"
+    p.write_bytes(b"nao sou imagem")
+    os.utime(p, (1_700_000_000, 1_700_000_000))
+
+    foto = Foto(p)
+    AnalisadorDeFotos().analisar(foto)
+
+    assert foto.hash_conteudo is not None
+    assert foto.data_de_captura == datetime.fromtimestamp(1_700_000_000)
+    assert foto.hash_visual is None
+    assert foto.dimensoes is None
+
+
+def test_u_analisador_ficheiro_inexistente_nao_preenche_nada(tmp_path: Path):
+    foto = Foto(tmp_path / "nao_existe.jpg")
+    AnalisadorDeFotos().analisar(foto)
+
+    assert foto.hash_conteudo is None
+    assert foto.data_de_captura is None
+
+
+def test_u_duplicados_reutiliza_phash_da_analise(tmp_path: Path, monkeypatch, criar_jpeg):
+    a = criar_jpeg(tmp_path / "a.jpg")
+    b = tmp_path / "b.jpg"
+    with Image.open(a) as img:
+        img.save(b, format="JPEG", quality=40)
+
+    fotos = [Foto(a), Foto(b)]
+    for f in fotos:
+        AnalisadorDeFotos().analisar(f)
+
+    det = DetetarDuplicados()
+    monkeypatch.setattr(det, "_calcular_phash", lambda c: (_ for _ in ()).throw(AssertionError("recalculou")))
+
+    assert det.marcar_quase_duplicados(fotos, threshold=4) == 1
+
+
+def test_u_analisador_ficheiro_grande_por_mmap_igual_ao_buffer(tmp_path: Path, monkeypatch, criar_jpeg):
+    p = criar_jpeg(tmp_path / "a.jpg", data_exif="2021:03:04 05:06:07")
+
+    normal = Foto(p)
+    AnalisadorDeFotos().analisar(normal)
+
+    # com limiar 1 qualquer ficheiro é mapeado; o Pillow recebe o mmap, nunca o caminho
+    original_image_open = analisador_module.Image.open
+    recebidos = []
+
+    def image_open_espiao(fp, *args, **kwargs):
+        recebidos.append(type(fp).__name__)
+        return original_image_open(fp, *args, **kwargs)
+
+    monkeypatch.setattr(analisador_module.Image, "open", image_open_espiao)
+    mapeada = Foto(p)
+    AnalisadorDeFotos(limiar_mmap=1).analisar(mapeada)
+
+    assert recebidos == ["mmap"]
+    assert mapeada.hash_conteudo == normal.hash_conteudo
+    assert mapeada.data_de_captura == normal.data_de_captura == datetime(2021, 3, 4, 5, 6, 7)
+    assert mapeada.dimensoes == normal.dimensoes
+    assert mapeada.hash_visual == normal.hash_visual
+
+
+def test_u_analisador_guarda_uma_so_copia_do_ficheiro(tmp_path: Path):
+    p = tmp_path / "grande.png"
+    ruido = os.urandom(1200 * 1000 * 3)
+    Image.frombytes("RGB", (1200, 1000), ruido).save(p, format="PNG", compress_level=0)
+    tamanho = p.stat().st_size
+
+    foto = Foto(p)
+    tracemalloc.start()
+    try:
+        AnalisadorDeFotos(calcular_phash=False, limiar_mmap=None).analisar(foto)
+        _atual, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert foto.hash_conteudo == hashlib.md5(p.read_bytes()).hexdigest()
+    assert foto.dimensoes == (1200, 1000)
+    assert pico < 1.5 * tamanho  # antes: blocos + join => ~2× o tamanho
+
+
+def test_u_phash_adiado_so_para_quem_nao_e_duplicado_exato(tmp_path: Path, monkeypatch, criar_jpeg):
+    a = criar_jpeg(tmp_path / "a.jpg")
+    b = tmp_path / "b.jpg"
+    b.write_bytes(a.read_bytes())  # duplicado exato de a
+    c = tmp_path / "c.jpg"
+    with Image.open(a) as img:
+        img.save(c, format="JPEG", quality=40)
+
+    fotos = [Foto(p) for p in (a, b, c)]
+    for f in fotos:
+        AnalisadorDeFotos(calcular_phash=False).analisar(f)
+    assert all(f.hash_visual is None for f in fotos)
+
+    det = DetetarDuplicados()
+    calculados = []
+    original = det._calcular_phash
+    monkeypatch.setattr(det, "_calcular_phash", lambda caminho: calculados.append(caminho) or original(caminho))
+    det.marcar_duplicados(fotos)
+    det.marcar_quase_duplicados(fotos, threshold=4)
+
+    assert sorted(calculados) == [a, c]  # b já era duplicado exato: nunca descodificada
+    assert [f.duplicada for f in fotos] == [False, True, True]
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+
+import imagehash
+from PIL import Image
+
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.cache_metadados import CacheMetadados
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPO_HASH
+from classes.construtor_de_fotos import ConstrutorDeFotos
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+
+DATA_EXIF = "2022:07:08 09:10:11"
+
+
+class _AnalisadorContado(AnalisadorDeFotos):
+    def __init__(self) -> None:
+        super().__init__()
+        self.chamadas = 0
+
+    def analisar(self, foto: Foto) -> None:
+        self.chamadas += 1
+        super().analisar(foto)
+
+
+def _campos(f: Foto):
+    return (f.caminho, f.data_de_captura, f.local_gps, f.hash_conteudo, f.dimensoes, str(f.hash_visual))
+
+
+def test_u_cache_reutiliza_entre_execucoes(tmp_path: Path, criar_jpeg):
+    caminhos = [criar_jpeg(tmp_path / f"{i}.jpg", data_exif=DATA_EXIF) for i in range(3)]
+    db = tmp_path / "cache" / "metadados.sqlite3"
+
+    cache = CacheMetadados(db)
+    analisador = _AnalisadorContado()
+    primeira = ConstrutorDeFotos(analisador=analisador, cache=cache).construir(caminhos)
+    cache.fechar()
+    assert analisador.chamadas == 3
+
+    cache = CacheMetadados(db)
+    analisador = _AnalisadorContado()
+    segunda = ConstrutorDeFotos(analisador=analisador, cache=cache).construir(caminhos)
+    assert analisador.chamadas == 0
+    assert cache.acertos == 3
+    assert [_campos(f) for f in segunda] == [_campos(f) for f in primeira]
+    assert segunda[0].data_de_captura == datetime(2022, 7, 8, 9, 10, 11)
+    cache.fechar()
+
+
+def test_u_cache_chave_muda_quando_o_ficheiro_muda(tmp_path: Path, criar_jpeg):
+    p = criar_jpeg(tmp_path / "a.jpg", data_exif=DATA_EXIF)
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+    ConstrutorDeFotos(analisador=AnalisadorDeFotos(), cache=cache).construir([p])
+
+    criar_jpeg(p, data_exif="2001:01:01 00:00:00")
+    st = os.stat(p)
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    analisador = _AnalisadorContado()
+    [foto] = ConstrutorDeFotos(analisador=analisador, cache=cache).construir([p])
+    assert analisador.chamadas == 1
+    assert foto.data_de_captura == datetime(2001, 1, 1)
+    cache.fechar()
+
+
+def test_u_cache_nao_reutiliza_hash_de_outro_algoritmo(tmp_path: Path, criar_jpeg):
+    p = criar_jpeg(tmp_path / "a.jpg", data_exif=DATA_EXIF)
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+    ConstrutorDeFotos(analisador=AnalisadorDeFotos(algoritmo="md5"), cache=cache).construir([p])
+
+    [foto] = ConstrutorDeFotos(analisador=AnalisadorDeFotos(algoritmo="sha256"), cache=cache).construir([p])
+
+    assert len(foto.hash_conteudo) == 64
+    cache.fechar()
+
+
+def test_u_cache_guarda_phash_do_detetar_duplicados(tmp_path: Path, monkeypatch, criar_jpeg):
+    a = criar_jpeg(tmp_path / "a.jpg", data_exif=DATA_EXIF)
+    b = criar_jpeg(tmp_path / "b.jpg", data_exif="2022:07:08 09:10:12")
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+
+    DetetarDuplicados(cache=cache).marcar_quase_duplicados([Foto(a), Foto(b)])
+
+    def proibido(self, caminho):
+        raise AssertionError("pHash devia vir da cache")
+
+    monkeypatch.setattr(DetetarDuplicados, "_calcular_phash", proibido)
+    fotos = [Foto(a), Foto(b)]
+    assert DetetarDuplicados(cache=cache).marcar_quase_duplicados(fotos) == 1
+    assert cache.obter_phash(os.stat(a)) == imagehash.phash(Image.open(a))
+    cache.fechar()
+
+
+def test_u_cache_regista_sem_hash_e_mantem_phash_anterior(tmp_path: Path, criar_jpeg):
+    a = criar_jpeg(tmp_path / "a.jpg", data_exif=DATA_EXIF)
+    st = os.stat(a)
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+    phash = imagehash.phash(Image.open(a))
+    cache.guardar_phash(st, phash)
+
+    assert not cache.reutilizar(Foto(a, preguicosa=True), st)  # só o pHash: não é uma análise
+
+    ConstrutorDeFotos(cache=cache, campos=frozenset({CAMPO_DATA, CAMPO_GPS})).construir([a])
+
+    foto = Foto(a, preguicosa=True)
+    assert cache.reutilizar(foto, st)
+    assert foto.data_de_captura == datetime(2022, 7, 8, 9, 10, 11)
+    assert not foto.conhecido(CAMPO_HASH)
+    assert foto.hash_visual == phash  # o registo não apagou o pHash já guardado
+    cache.fechar()
+
+
+def test_u_cache_despeja_as_entradas_menos_usadas(tmp_path: Path):
+    cache = CacheMetadados(tmp_path / "c.sqlite3", tamanho_maximo=64 * 1024)
+    ficheiros = []
+    for i in range(1500):
+        p = tmp_path / f"{i}.bin"
+        p.write_bytes(str(i).encode())
+        foto = Foto(p)
+        foto.calcular_hash()
+        cache.registar(foto, os.stat(p))
+        ficheiros.append(p)
+
+    # a primeira passa a ser a mais recente
+    assert cache.reutilizar(Foto(ficheiros[0]), os.stat(ficheiros[0]))
+
+    removidas = cache.despejar()
+
+    assert removidas > 0
+    assert cache.tamanho_em_bytes() <= 64 * 1024
+    assert cache.reutilizar(Foto(ficheiros[0]), os.stat(ficheiros[0]))
+    assert not cache.reutilizar(Foto(ficheiros[1]), os.stat(ficheiros[1]))
+    cache.fechar()
+
+
+def test_u_cache_corrompida_e_recriada(tmp_path: Path):
+    db = tmp_path / "c.sqlite3"
+    db.write_bytes(b"isto nao e sqlite" * 100)
+
+    cache = CacheMetadados(db)
+
+    assert len(cache) == 0
+    cache.fechar()
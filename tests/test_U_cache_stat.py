@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+from classes.cache_stat import CONTADOR_STAT
+from classes.construtor_de_fotos import ConstrutorDeFotos
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.executor_de_operacoes import ExecutorSeguro
+from classes.foto import Foto
+from classes.monitor_de_operacoes import MonitorDeOperacoes
+from classes.operacao import Operacao, TipoOperacao
+from classes.plano_de_operacoes import PlanoDeOperacoes
+from classes.regra_de_organizacao import RegraPorData
+from classes.scanner_de_ficheiros import ScannerDeFicheiros
+
+
+@pytest.fixture(autouse=True)
+def _contador_limpo():
+    CONTADOR_STAT.repor()
+    yield
+    CONTADOR_STAT.repor()
+
+
+def _espiar_os_stat(monkeypatch, pasta: Path) -> list:
+    """Regista os os.stat (diretos ou via exists/is_file/isfile) a ficheiros dentro de `pasta`.
+    A própria pasta não conta (o plano resolve cada pasta uma vez)."""
+    chamadas = []
+    original = os.stat
+
+    def espiao(caminho, *args, **kwargs):
+        if str(caminho).startswith(str(pasta) + os.sep):
+            chamadas.append(str(caminho))
+        return original(caminho, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", espiao)
+    return chamadas
+
+
+def test_u_scanner_guarda_o_stat_de_cada_foto(tmp_path: Path):
+    (tmp_path / "a.jpg").write_bytes(b"AAAA")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.png").write_bytes(b"BB")
+
+    encontrados = ScannerDeFicheiros(max_workers=1).listar_ficheiros(tmp_path)
+
+    assert {e.caminho.name: e.stat.st_size for e in encontrados} == {"a.jpg": 4, "b.png": 2}
+    assert CONTADOR_STAT.feitas == 2
+
+    sem_stat = ScannerDeFicheiros(max_workers=1, recolher_stat=False).listar_ficheiros(tmp_path)
+    assert all(e.stat is None for e in sem_stat)
+
+
+def test_u_foto_reutiliza_o_stat_do_scan(tmp_path: Path, monkeypatch):
+    p = tmp_path / "a.jpg"
+    p.write_bytes(b"nao e imagem")
+    foto = Foto(p, stat_ficheiro=os.stat(p))
+    chamadas = _espiar_os_stat(monkeypatch, tmp_path)
+
+    foto.extrair_metadados()  # Pillow falha => data do mtime (do stat guardado)
+    foto.calcular_hash()
+
+    assert foto.data_de_captura is not None
+    assert foto.hash_conteudo == hashlib.md5(b"nao e imagem").hexdigest()
+    assert chamadas == []
+    assert CONTADOR_STAT.feitas == 0
+    assert CONTADOR_STAT.poupadas >= 3
+
+
+def test_u_foto_sem_stat_do_scan_pede_uma_vez_so(tmp_path: Path):
+    p = tmp_path / "a.jpg"
+    p.write_bytes(b"x")
+    foto = Foto(p)
+
+    foto.extrair_metadados()
+    foto.calcular_hash()
+
+    assert CONTADOR_STAT.feitas == 1
+    assert foto.stat_ficheiro is not None
+
+
+def test_u_pipeline_scan_construtor_duplicados_plano_sem_stats_repetidos(tmp_path: Path, monkeypatch):
+    origem = tmp_path / "origem"
+    origem.mkdir()
+    for nome, dados in (("a.jpg", b"igual"), ("b.jpg", b"igual"), ("c.jpg", b"outro")):
+        (origem / nome).write_bytes(dados)
+
+    encontrados = ScannerDeFicheiros(max_workers=1).listar_ficheiros(origem)
+    chamadas = _espiar_os_stat(monkeypatch, origem)
+
+    fotos = ConstrutorDeFotos().construir(encontrados)
+    DetetarDuplicados().marcar_duplicados(fotos)
+    ops = PlanoDeOperacoes(regra=RegraPorData(), raiz_destino=tmp_path / "Foto_Organizada").gerar(fotos)
+
+    assert sum(f.duplicada for f in fotos) == 1
+    movers = [op for op in ops if op.tipo == TipoOperacao.MOVER]
+    assert len(movers) == 2
+    assert all(op.stat_origem is not None for op in movers)
+    assert chamadas == []
+    assert CONTADOR_STAT.feitas == 3  # só as do scan
+
+
+def test_u_executor_confia_no_stat_e_trata_origem_desaparecida_como_skip(tmp_path: Path):
+    origem = tmp_path / "a.jpg"
+    origem.write_bytes(b"x")
+    st = os.stat(origem)
+    origem.unlink()
+    destino = tmp_path / "destino" / "a.jpg"
+    op = Operacao(origem=origem, destino=destino, tipo=TipoOperacao.MOVER, stat_origem=st)
+
+    ex = ExecutorSeguro(monitor=MonitorDeOperacoes())
+    res = ex.executar_operacao(op, modo_preview=False)
+
+    assert res.status == "SKIPPED"
+    assert res.motivo == "origem não existe ou não é ficheiro"
+    assert CONTADOR_STAT.poupadas == 1
+
+
+def test_u_executor_preview_com_stat_ve_origem_desaparecida(tmp_path: Path):
+    origem = tmp_path / "a.jpg"
+    origem.write_bytes(b"x")
+    destino = tmp_path / "destino" / "a.jpg"
+    op = Operacao(origem=origem, destino=destino, tipo=TipoOperacao.MOVER, stat_origem=os.stat(origem))
+    ex = ExecutorSeguro(monitor=MonitorDeOperacoes())
+
+    assert ex.executar_operacao(op, modo_preview=True).status == "MOVED"
+    origem.unlink()
+    res = ex.executar_operacao(op, modo_preview=True)
+
+    assert res.status == "SKIPPED"
+    assert res.motivo == "origem não existe ou não é ficheiro"
+
+
+def test_u_executor_com_stat_move_normalmente(tmp_path: Path):
+    origem = tmp_path / "a.jpg"
+    origem.write_bytes(b"x")
+    destino = tmp_path / "destino" / "a.jpg"
+    op = Operacao(origem=origem, destino=destino, tipo=TipoOperacao.MOVER, stat_origem=os.stat(origem))
+
+    res = ExecutorSeguro(monitor=MonitorDeOperacoes()).executar([op])
+
+    assert res.movidas == 1
+    assert destino.read_bytes() == b"x"
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+
+import classes.foto as foto_module
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPO_HASH, CAMPOS_EXIF, valor_conhecido
+from classes.construtor_de_fotos import ConstrutorDeFotos, construir_foto
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.manifesto_scan import ManifestoScan
+from classes.motor_de_hash import MotorDeHash
+from classes.regra_de_organizacao import RegraDeOrganizacao, RegraPorData, RegraPorLocal
+
+
+class EspiaoExtracao:
+    """Conta quantas vezes o GPS é interpretado e quantos ficheiros são hashados."""
+
+    def __init__(self, monkeypatch) -> None:
+        self.gps = 0
+        self.hashes = 0
+        extrair_gps = Foto._extrair_gps
+        hash_ficheiro = foto_module.hash_ficheiro
+
+        def espiao_gps(foto, gps_info):
+            self.gps += 1
+            return extrair_gps(foto, gps_info)
+
+        def espiao_hash(*args, **kwargs):
+            self.hashes += 1
+            return hash_ficheiro(*args, **kwargs)
+
+        monkeypatch.setattr(Foto, "_extrair_gps", espiao_gps)
+        monkeypatch.setattr(foto_module, "hash_ficheiro", espiao_hash)
+
+
+def test_u_regras_declaram_campos_necessarios():
+    assert RegraPorData.campos_necessarios == frozenset({CAMPO_DATA})
+    assert RegraPorLocal(precision=2).campos_necessarios == frozenset({CAMPO_GPS})
+    # o hash não é pedido à cabeça: detetar() calcula-o por níveis
+    assert DetetarDuplicados.campos_necessarios(quase_duplicados=False) == frozenset({CAMPO_DATA})
+
+
+def test_u_regra_personalizada_sem_declaracao_pede_exif_completo():
+    class RegraPorAno(RegraDeOrganizacao):
+        def calcular_destino(self, foto, raiz):
+            return raiz / str(foto.data_de_captura.year)
+
+    assert RegraPorAno.campos_necessarios == CAMPOS_EXIF
+
+
+def test_u_foto_preguicosa_calcula_no_primeiro_acesso_e_memoriza(tmp_path, monkeypatch, criar_jpeg):
+    caminho = criar_jpeg(tmp_path / "a.jpg")
+    espiao = EspiaoExtracao(monkeypatch)
+    foto = Foto(caminho, preguicosa=True)
+
+    assert not foto.conhecido(CAMPO_HASH)
+    assert valor_conhecido(foto, CAMPO_HASH) is None
+    assert espiao.hashes == 0
+
+    h = foto.hash_conteudo
+    assert h is not None
+    assert foto.hash_conteudo == h
+    assert espiao.hashes == 1
+    assert valor_conhecido(foto, CAMPO_HASH) == h
+
+
+def test_u_foto_preguicosa_data_sem_exif_usa_mtime(tmp_path, criar_jpeg):
+    caminho = criar_jpeg(tmp_path / "a.jpg")
+    os.utime(caminho, (1_600_000_000, 1_600_000_000))
+    foto = Foto(caminho, preguicosa=True)
+
+    assert foto.data_de_captura == datetime.fromtimestamp(1_600_000_000)
+    assert foto.conhecido(CAMPO_DATA)
+    assert not foto.conhecido(CAMPO_GPS)
+
+
+def test_u_construtor_so_com_data_nao_le_gps_nem_hash(tmp_path, monkeypatch, criar_jpeg):
+    for i in range(3):
+        criar_jpeg(tmp_path / f"{i}.jpg", cor=(i * 40, 0, 0))
+    espiao = EspiaoExtracao(monkeypatch)
+
+    construtor = ConstrutorDeFotos(campos=RegraPorData.campos_necessarios)
+    fotos = construtor.construir(sorted(tmp_path.glob("*.jpg")))
+
+    assert all(f.data_de_captura is not None for f in fotos)
+    for f in fotos:
+        RegraPorData().calcular_destino(f, tmp_path / "destino")
+    assert espiao.gps == 0
+    assert espiao.hashes == 0
+
+
+def test_u_deteccao_por_niveis_nao_hasha_fotos_preguicosas_de_tamanho_unico(tmp_path, monkeypatch):
+    (tmp_path / "a.jpg").write_bytes(b"x" * 10)
+    (tmp_path / "b.jpg").write_bytes(b"x" * 10)
+    (tmp_path / "c.jpg").write_bytes(b"y" * 20)
+    espiao = EspiaoExtracao(monkeypatch)
+
+    fotos = [Foto(tmp_path / n, preguicosa=True) for n in ("a.jpg", "b.jpg", "c.jpg")]
+    for f in fotos:
+        f.definir_data_de_captura(datetime(2020, 1, 1))
+    DetetarDuplicados().marcar_duplicados(fotos)
+
+    assert sum(f.duplicada for f in fotos) == 1
+    assert valor_conhecido(fotos[2], CAMPO_HASH) is None
+    assert espiao.hashes == 0  # hashes completos vêm do MotorDeHash, não da Foto
+
+
+def test_u_pipeline_so_le_por_inteiro_quem_pode_ser_duplicado(tmp_path, monkeypatch, criar_jpeg):
+    a = criar_jpeg(tmp_path / "a.jpg")
+    b = tmp_path / "b.jpg"
+    b.write_bytes(a.read_bytes())  # duplicado exato de a (mesmo tamanho)
+    c = criar_jpeg(tmp_path / "c.jpg", cor="gray", tamanho=(200, 150))  # tamanho único
+    lidos = []
+    calcular, calcular_parcial = MotorDeHash.calcular, MotorDeHash.calcular_parcial
+    monkeypatch.setattr(MotorDeHash, "calcular", lambda m, cs: lidos.extend(cs) or calcular(m, cs))
+    monkeypatch.setattr(
+        MotorDeHash, "calcular_parcial", lambda m, cs, *a: lidos.extend(cs) or calcular_parcial(m, cs, *a)
+    )
+    espiao = EspiaoExtracao(monkeypatch)
+
+    # como o main: só cabeçalho/EXIF na construção, hash por níveis, pHash adiado
+    campos = RegraPorData.campos_necessarios | DetetarDuplicados.campos_necessarios(quase_duplicados=True)
+    analisador = AnalisadorDeFotos(calcular_phash=False, calcular_hash=False)
+    fotos = ConstrutorDeFotos(analisador=analisador, campos=campos).construir([a, b, c])
+    assert all(not f.conhecido(CAMPO_HASH) for f in fotos)
+    assert all(f.dimensoes is not None for f in fotos)
+
+    det = DetetarDuplicados()
+    det.marcar_duplicados(fotos)
+    det.marcar_quase_duplicados(fotos, threshold=3)
+
+    assert sorted(set(lidos)) == [a, b]  # c tem um tamanho único: nunca é hashada
+    assert espiao.hashes == 0
+    assert [f.duplicada for f in fotos] == [False, True, False]
+    assert valor_conhecido(fotos[2], CAMPO_HASH) is None
+
+
+def test_u_construtor_paralelo_com_campos_igual_ao_serial(tmp_path, criar_jpeg):
+    caminhos = [criar_jpeg(tmp_path / f"{i}.jpg", cor=(i * 30, 5, 5)) for i in range(6)]
+    campos = frozenset({CAMPO_DATA, CAMPO_HASH})
+
+    serial = ConstrutorDeFotos(campos=campos).construir(caminhos)
+    paralelo = ConstrutorDeFotos(campos=campos, workers=2, tamanho_lote=2).construir(caminhos)
+
+    def resumo(fotos):
+        return [
+            (f.caminho, valor_conhecido(f, CAMPO_DATA), valor_conhecido(f, CAMPO_HASH), f.conhecido(CAMPO_GPS))
+            for f in fotos
+        ]
+
+    assert resumo(paralelo) == resumo(serial)
+    assert all(not f.conhecido(CAMPO_GPS) for f in paralelo)
+
+
+def test_u_manifesto_nao_regista_fotos_incompletas(tmp_path, criar_jpeg):
+    pasta = tmp_path / "fotos"
+    pasta.mkdir()
+    caminho = criar_jpeg(pasta / "a.jpg")
+    manifesto = ManifestoScan(tmp_path / "manifesto.json")
+
+    ConstrutorDeFotos(manifesto=manifesto, campos=RegraPorData.campos_necessarios).construir([caminho])
+
+    assert len(manifesto) == 0
+
+
+def test_u_construir_foto_sem_campos_extrai_tudo(tmp_path, monkeypatch, criar_jpeg):
+    caminho = criar_jpeg(tmp_path / "a.jpg")
+    espiao = EspiaoExtracao(monkeypatch)
+
+    foto = construir_foto(caminho)
+
+    assert foto.conhecido(CAMPO_GPS) and foto.conhecido(CAMPO_HASH)
+    assert foto.hash_conteudo is not None
+    assert espiao.hashes == 1
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.construtor_de_fotos import ConstrutorDeFotos, em_buffer
+from classes.manifesto_scan import ManifestoScan
+
+
+def test_u_em_buffer_mantem_ordem_e_todos_os_itens():
+    assert list(em_buffer(range(1000), tamanho=8)) == list(range(1000))
+
+
+def test_u_em_buffer_limita_itens_em_espera():
+    produzidos = []
+
+    def gerador():
+        for i in range(100):
+            produzidos.append(i)
+            yield i
+
+    it = em_buffer(gerador(), tamanho=4)
+    assert next(it) == 0
+    time.sleep(0.2)  # dá tempo ao produtor para encher a fila
+
+    # 1 consumido + 4 na fila + 1 bloqueado no put (no máximo)
+    assert len(produzidos) <= 6
+    it.close()
+
+
+def test_u_em_buffer_relanca_excecao_do_produtor():
+    def gerador():
+        yield 1
+        raise ValueError("falhou no scan")
+
+    it = em_buffer(gerador())
+    assert next(it) == 1
+    with pytest.raises(ValueError, match="falhou no scan"):
+        next(it)
+
+
+def test_u_em_buffer_fechar_consumidor_para_o_produtor():
+    terminou = threading.Event()
+
+    def gerador():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            terminou.set()
+
+    it = em_buffer(gerador(), tamanho=2)
+    assert next(it) == 0
+    it.close()
+
+    assert terminou.wait(timeout=2)
+
+
+def test_u_construtor_iterar_e_lazy_e_preenche_hash(tmp_path: Path):
+    a = tmp_path / "a.jpg"
+    a.write_bytes(b"AAA")
+
+    vistos = []
+
+    def caminhos():
+        vistos.append("a")
+        yield a
+        vistos.append("b")
+        yield tmp_path / "nao_existe.jpg"
+
+    it = ConstrutorDeFotos().iterar(caminhos())
+    foto = next(it)
+
+    assert vistos == ["a"]  # ainda não pediu o 2º caminho
+    assert foto.hash_conteudo == hashlib.md5(b"AAA").hexdigest()
+    assert foto.data_de_captura is not None  # fallback para mtime
+
+    resto = list(it)
+    assert len(resto) == 1
+    assert resto[0].hash_conteudo is None
+
+
+def _campos(foto):
+    return (
+        foto.caminho,
+        foto.data_de_captura,
+        foto.local_gps,
+        foto.hash_conteudo,
+        foto.dimensoes,
+        str(foto.hash_visual) if foto.hash_visual is not None else None,
+    )
+
+
+def test_u_construtor_paralelo_igual_ao_serial(tmp_path: Path, criar_jpeg):
+    caminhos = [
+        criar_jpeg(tmp_path / f"f{i}.jpg", data_exif=f"2020:01:{i + 1:02d} 10:00:00" if i % 2 else None,
+                   cor="white" if i % 3 else "gray")
+        for i in range(9)
+    ]
+    (tmp_path / "texto.jpg").write_bytes(b"isto nao e uma imagem")
+    caminhos += [tmp_path / "texto.jpg", tmp_path / "nao_existe.jpg"]
+
+    serial = ConstrutorDeFotos(analisador=AnalisadorDeFotos()).construir(caminhos)
+    paralelo = ConstrutorDeFotos(analisador=AnalisadorDeFotos(), workers=2, tamanho_lote=2).construir(caminhos)
+
+    assert [_campos(f) for f in paralelo] == [_campos(f) for f in serial]
+    assert paralelo[0].hash_visual is not None
+
+
+def test_u_construtor_paralelo_sem_analisador_e_com_manifesto(tmp_path: Path, criar_jpeg):
+    caminhos = [criar_jpeg(tmp_path / f"f{i}.jpg", data_exif="2019:05:06 07:08:09") for i in range(5)]
+
+    serial = ConstrutorDeFotos().construir(caminhos)
+
+    manifesto = ManifestoScan.carregar(tmp_path / "m.json")
+    primeiro = ConstrutorDeFotos(manifesto=manifesto, workers=2, tamanho_lote=2).construir(caminhos)
+    assert [_campos(f) for f in primeiro] == [_campos(f) for f in serial]
+    assert manifesto.processadas == 5
+    manifesto.guardar()
+
+    manifesto = ManifestoScan.carregar(tmp_path / "m.json")
+    segundo = ConstrutorDeFotos(manifesto=manifesto, workers=2, tamanho_lote=2).construir(caminhos)
+    assert [(f.caminho, f.data_de_captura, f.hash_conteudo) for f in segundo] == \
+        [(f.caminho, f.data_de_captura, f.hash_conteudo) for f in serial]
+    assert manifesto.reutilizadas == 5
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import classes.foto as foto_module
+from classes.cache_metadados import CacheMetadados
+from classes.campos_foto import CAMPO_DATA
+from classes.construtor_de_fotos import ConstrutorDeFotos
+from classes.data_do_nome import DataPeloNome, PoliticaData, data_do_nome
+from classes.foto import Foto
+from classes.manifesto_scan import ManifestoScan
+
+
+def _jpeg_com_data(caminho: Path, data_exif: str | None = None) -> Path:
+    exif = Image.Exif()
+    if data_exif:
+        exif[306] = data_exif
+    Image.new("RGB", (8, 8), "white").save(caminho, format="JPEG", exif=exif)
+    os.utime(caminho, (1_600_000_000, 1_600_000_000))
+    return caminho
+
+
+def _proibir_abrir(monkeypatch) -> None:
+    def falhar(*_args, **_kwargs):
+        raise AssertionError("o ficheiro não devia ser aberto")
+
+    monkeypatch.setattr(foto_module, "ler_exif", falhar)
+    monkeypatch.setattr(foto_module.Image, "open", falhar)
+
+
+@pytest.mark.parametrize(
+    "nome, esperado",
+    [
+        ("IMG_20230514_183012.jpg", datetime(2023, 5, 14, 18, 30, 12)),
+        ("PXL_20230514_183012345.jpg", datetime(2023, 5, 14, 18, 30, 12, 345_000)),
+        ("VID_20230514_183012_1.mp4", datetime(2023, 5, 14, 18, 30, 12)),
+        ("Screenshot_20230514-183012.png", datetime(2023, 5, 14, 18, 30, 12)),
+        ("WhatsApp Image 2023-05-14 at 18.30.12.jpeg", datetime(2023, 5, 14, 18, 30, 12)),
+        ("Screenshot_2023-05-14-18-30-12.png", datetime(2023, 5, 14, 18, 30, 12)),
+        ("IMG-20230514-WA0001.jpg", datetime(2023, 5, 14)),
+        ("Férias 2023-05-14.jpg", datetime(2023, 5, 14)),
+    ],
+)
+def test_u_data_do_nome_padroes_conhecidos(nome, esperado):
+    assert data_do_nome(nome) == esperado
+
+
+@pytest.mark.parametrize("nome", ["DSC01234.jpg", "foto.jpg", "IMG_20231399_183012.jpg", "123456789012345.jpg"])
+def test_u_data_do_nome_sem_data(nome):
+    assert data_do_nome(nome) is None
+
+
+def test_u_padroes_extra_tem_prioridade():
+    config = DataPeloNome.com_padroes_extra(
+        PoliticaData.NOME_PRIMEIRO, [r"(?P<dia>\d{2})\.(?P<mes>\d{2})\.(?P<ano>\d{4})"]
+    )
+    assert config.data("scan 14.05.1999.tif") == datetime(1999, 5, 14)
+    assert config.data("IMG_20230514_183012.jpg") == datetime(2023, 5, 14, 18, 30, 12)
+
+
+def test_u_exif_primeiro_usa_nome_so_sem_exif(tmp_path):
+    config = DataPeloNome(PoliticaData.EXIF_PRIMEIRO)
+    com_exif = Foto(_jpeg_com_data(tmp_path / "IMG_20230514_183012.jpg", "2020:01:02 03:04:05"), data_pelo_nome=config)
+    sem_exif = Foto(_jpeg_com_data(tmp_path / "IMG_20230515_183012.jpg"), data_pelo_nome=config)
+
+    com_exif.extrair_metadados()
+    sem_exif.extrair_metadados()
+
+    assert com_exif.data_de_captura == datetime(2020, 1, 2, 3, 4, 5)
+    assert sem_exif.data_de_captura == datetime(2023, 5, 15, 18, 30, 12)
+
+
+def test_u_nome_primeiro_nao_abre_o_ficheiro_para_a_data(tmp_path, monkeypatch):
+    p = _jpeg_com_data(tmp_path / "IMG_20230514_183012.jpg", "2020:01:02 03:04:05")
+    _proibir_abrir(monkeypatch)
+    foto = Foto(p, data_pelo_nome=DataPeloNome(PoliticaData.NOME_PRIMEIRO))
+
+    foto.extrair_metadados(campos=(CAMPO_DATA,))
+
+    assert foto.data_de_captura == datetime(2023, 5, 14, 18, 30, 12)
+
+
+def test_u_nome_primeiro_sem_data_no_nome_cai_para_exif(tmp_path):
+    p = _jpeg_com_data(tmp_path / "DSC0001.jpg", "2020:01:02 03:04:05")
+    foto = Foto(p, data_pelo_nome=DataPeloNome(PoliticaData.NOME_PRIMEIRO))
+
+    foto.extrair_metadados()
+
+    assert foto.data_de_captura == datetime(2020, 1, 2, 3, 4, 5)
+
+
+def test_u_so_nome_sem_data_usa_mtime_sem_abrir(tmp_path, monkeypatch):
+    p = _jpeg_com_data(tmp_path / "DSC0001.jpg", "2020:01:02 03:04:05")
+    _proibir_abrir(monkeypatch)
+    foto = Foto(p, data_pelo_nome=DataPeloNome(PoliticaData.SO_NOME))
+
+    foto.extrair_metadados(campos=(CAMPO_DATA,))
+
+    assert foto.data_de_captura == datetime.fromtimestamp(1_600_000_000)
+
+
+def test_u_construtor_paralelo_respeita_politica(tmp_path):
+    caminhos = [
+        _jpeg_com_data(tmp_path / "IMG_20230514_183012.jpg", "2020:01:02 03:04:05"),
+        _jpeg_com_data(tmp_path / "DSC0001.jpg", "2019:01:02 03:04:05"),
+    ]
+    config = DataPeloNome(PoliticaData.NOME_PRIMEIRO)
+
+    serial = ConstrutorDeFotos(data_pelo_nome=config).construir(caminhos)
+    paralelo = ConstrutorDeFotos(data_pelo_nome=config, workers=2, tamanho_lote=1).construir(caminhos)
+
+    esperado = [datetime(2023, 5, 14, 18, 30, 12), datetime(2019, 1, 2, 3, 4, 5)]
+    assert [f.data_de_captura for f in serial] == esperado
+    assert [f.data_de_captura for f in paralelo] == esperado
+
+
+def test_u_manifesto_guarda_data_exif_e_nome_e_reaplicado(tmp_path):
+    pasta = tmp_path / "fotos"
+    pasta.mkdir()
+    p = _jpeg_com_data(pasta / "IMG_20230514_183012.jpg", "2020:01:02 03:04:05")
+    caminho_manifesto = tmp_path / "manifesto.json"
+
+    # 1.ª execução só com EXIF: o manifesto fica com a data do EXIF
+    manifesto = ManifestoScan(caminho_manifesto)
+    ConstrutorDeFotos(manifesto=manifesto).construir([p])
+    manifesto.guardar()
+
+    # 2.ª execução com nome primeiro: reaproveita o hash, mas a data vem do nome
+    manifesto = ManifestoScan.carregar(caminho_manifesto)
+    config = DataPeloNome(PoliticaData.NOME_PRIMEIRO)
+    [foto] = ConstrutorDeFotos(manifesto=manifesto, data_pelo_nome=config).construir([p])
+    assert foto.data_de_captura == datetime(2023, 5, 14, 18, 30, 12)
+
+    # e a política por nome não regista datas no manifesto
+    novo = ManifestoScan(tmp_path / "outro.json")
+    ConstrutorDeFotos(manifesto=novo, data_pelo_nome=config).construir([p])
+    assert len(novo) == 0
+
+
+def test_u_cache_guarda_so_a_data_do_exif_e_reaplica_a_politica(tmp_path):
+    # sem data no EXIF: a data depende só da política (nome ou mtime)
+    p = _jpeg_com_data(tmp_path / "IMG_20230514_183012.jpg")
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+    exif_primeiro = DataPeloNome(PoliticaData.EXIF_PRIMEIRO)
+    mtime = datetime.fromtimestamp(1_600_000_000)
+
+    # cache preenchida sem política (mtime) -> com "exif" a data vem do nome
+    [sem] = ConstrutorDeFotos(cache=cache).construir([p])
+    [com] = ConstrutorDeFotos(cache=cache, data_pelo_nome=exif_primeiro).construir([p])
+    assert sem.data_de_captura == mtime
+    assert com.data_de_captura == datetime(2023, 5, 14, 18, 30, 12)
+    assert cache.acertos == 1
+
+    # e o contrário: a data do nome guardada por "exif" não passa para uma execução sem política
+    outra = CacheMetadados(tmp_path / "outra.sqlite3")
+    ConstrutorDeFotos(cache=outra, data_pelo_nome=exif_primeiro).construir([p])
+    [sem] = ConstrutorDeFotos(cache=outra).construir([p])
+    assert sem.data_de_captura == mtime
+    assert outra.acertos == 1
+    cache.fechar()
+    outra.fechar()
+
+
+def test_u_manifesto_nao_guarda_a_data_do_nome_como_exif(tmp_path):
+    p = _jpeg_com_data(tmp_path / "IMG_20230514_183012.jpg")
+    caminho_manifesto = tmp_path / "manifesto.json"
+
+    manifesto = ManifestoScan(caminho_manifesto)
+    ConstrutorDeFotos(manifesto=manifesto, data_pelo_nome=DataPeloNome()).construir([p])
+    manifesto.guardar()
+
+    manifesto = ManifestoScan.carregar(caminho_manifesto)
+    [foto] = ConstrutorDeFotos(manifesto=manifesto).construir([p])
+    assert manifesto.reutilizadas == 1
+    assert foto.data_de_captura == datetime.fromtimestamp(1_600_000_000)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from classes.data_exif import data_de_exif, instante_em_microssegundos, interpretar_data_exif
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.leitor_exif import ler_exif
+
+
+@pytest.mark.parametrize(
+    "texto, esperado",
+    [
+        ("2020:01:02 03:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020:01:02 03:04:05\x00\x00", datetime(2020, 1, 2, 3, 4, 5)),
+        (b"2020:01:02 03:04:05\x00", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020-01-02T03:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020/01/02 03:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020:01:02  3:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020:01:02", datetime(2020, 1, 2)),
+        ("2020:01:02 03:04", datetime(2020, 1, 2, 3, 4)),
+        ("2020:01:02 24:00:00", datetime(2020, 1, 3)),
+        ("2016:12:31 23:59:60", datetime(2016, 12, 31, 23, 59, 59)),
+    ],
+)
+def test_u_interpretar_data_exif_variantes_recuperaveis(texto, esperado):
+    assert interpretar_data_exif(texto) == esperado
+
+
+@pytest.mark.parametrize(
+    "texto",
+    ["", None, "0000:00:00 00:00:00", "    :  :     :  :  ", "2020:02:30 00:00:00", "lixo lixo lixo", "20200102 030405"],
+)
+def test_u_interpretar_data_exif_invalida_devolve_none(texto):
+    assert interpretar_data_exif(texto) is None
+
+
+def test_u_interpretar_data_exif_subsegundos_e_fuso():
+    dt = interpretar_data_exif("2020:01:02 03:04:05", subsegundos="05", fuso="+05:30")
+    assert dt == datetime(2020, 1, 2, 3, 4, 5, 50_000, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+
+    # fração/fuso no próprio texto têm prioridade
+    dt = interpretar_data_exif("2020:01:02 03:04:05.123-01:00", subsegundos="999", fuso="+02:00")
+    assert dt.microsecond == 123_000
+    assert dt.utcoffset() == timedelta(hours=-1)
+
+    # tags de subsegundos/fuso inválidas são ignoradas
+    assert interpretar_data_exif("2020:01:02 03:04:05", "abc", "   :  ") == datetime(2020, 1, 2, 3, 4, 5)
+
+
+def test_u_data_de_exif_data_invalida_passa_a_tag_seguinte():
+    exif = {36867: "0000:00:00 00:00:00", 36868: "2019:05:06 07:08:09", 37522: "250"}
+    assert data_de_exif(exif) == datetime(2019, 5, 6, 7, 8, 9, 250_000)
+    assert data_de_exif({36867: "lixo"}) is None
+
+
+def test_u_instante_em_microssegundos_compara_fusos():
+    lisboa = datetime(2020, 6, 1, 12, 0, tzinfo=timezone(timedelta(hours=1)))
+    nova_iorque = datetime(2020, 6, 1, 7, 0, 0, 1, tzinfo=timezone(timedelta(hours=-4)))
+    assert instante_em_microssegundos(nova_iorque) - instante_em_microssegundos(lisboa) == 1
+
+
+def test_u_foto_data_exif_malformada_recuperada_sem_mtime(tmp_path: Path):
+    p = tmp_path / "a.jpg"
+    p.write_bytes(b"x")
+    foto = Foto(p)
+
+    foto.preencher_a_partir_do_exif({36867: "2020:01:02 03:04:05\x00\x00  "})
+
+    assert foto.data_de_captura == datetime(2020, 1, 2, 3, 4, 5)
+
+
+def test_u_ler_exif_le_subsegundos_e_fuso(tmp_path: Path):
+    exif = Image.Exif()
+    ifd = exif.get_ifd(0x8769)
+    ifd[36867] = "2020:01:02 03:04:05"
+    ifd[37521] = "123"
+    ifd[36881] = "+01:00"
+    p = tmp_path / "a.jpg"
+    Image.new("RGB", (8, 8)).save(p, exif=exif)
+
+    foto = Foto(p)
+    foto.extrair_metadados()
+
+    assert ler_exif(p)[37521] == "123"
+    assert foto.data_de_captura == datetime(2020, 1, 2, 3, 4, 5, 123_000, tzinfo=timezone(timedelta(hours=1)))
+
+
+def test_u_original_de_rajada_pelos_subsegundos(tmp_path: Path):
+    fotos = []
+    for nome, sub in (("a.jpg", "900"), ("b.jpg", "100"), ("c.jpg", "500")):
+        p = tmp_path / nome
+        p.write_bytes(b"mesmo conteudo")
+        foto = Foto(p)
+        foto.preencher_a_partir_do_exif({36867: "2020:01:02 03:04:05", 37521: sub})
+        fotos.append(foto)
+
+    DetetarDuplicados().marcar_duplicados(fotos)
+
+    assert [f.duplicada for f in fotos] == [True, False, True]
+
+
+def test_u_original_empate_exato_decidido_pelo_caminho(tmp_path: Path):
+    fotos = []
+    for nome in ("z.jpg", "m.jpg", "a.jpg"):
+        p = tmp_path / nome
+        p.write_bytes(b"mesmo conteudo")
+        foto = Foto(p)
+        foto.definir_data_de_captura(datetime(2020, 1, 2))
+        fotos.append(foto)
+
+    DetetarDuplicados().marcar_duplicados(fotos)
+
+    assert [f.caminho.name for f in fotos if not f.duplicada] == ["a.jpg"]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import classes.dimensoes_imagem as dim_module
+from classes.dimensoes_imagem import ler_dimensoes, ler_dimensoes_em_lote
+
+
+def _guardar(destino: Path, formato: str, tamanho=(123, 45), modo="RGB", **kwargs) -> Path:
+    Image.new(modo, tamanho, "red").save(destino, format=formato, **kwargs)
+    return destino
+
+
+@pytest.mark.parametrize(
+    "formato, modo, kwargs",
+    [
+        ("JPEG", "RGB", {}),
+        ("JPEG", "RGB", {"progressive": True}),
+        ("PNG", "RGB", {}),
+        ("WEBP", "RGB", {"lossless": False}),    # VP8
+        ("WEBP", "RGB", {"lossless": True}),     # VP8L
+        ("WEBP", "RGBA", {"lossless": False}),   # VP8X (alpha)
+        ("TIFF", "RGB", {}),
+        ("TIFF", "RGB", {"compression": "tiff_lzw"}),
+    ],
+)
+def test_u_dimensoes_iguais_ao_pillow_sem_usar_pillow(tmp_path: Path, monkeypatch, formato, modo, kwargs):
+    p = _guardar(tmp_path / "img", formato, (1234, 567), modo, **kwargs)
+
+    # se o parser falhar e cair no Pillow, o teste falha
+    monkeypatch.setattr(dim_module, "_dimensoes_pillow", lambda c: pytest.fail("usou Pillow"))
+
+    assert ler_dimensoes(p) == (1234, 567)
+
+
+def test_u_dimensoes_jpeg_com_sof_depois_da_leitura_inicial(tmp_path: Path, monkeypatch):
+    buf = io.BytesIO()
+    Image.new("RGB", (321, 77)).save(buf, format="JPEG")
+    jpeg = buf.getvalue()
+
+    # empurra o SOF para lá dos 64 KB iniciais com segmentos COM grandes
+    com = b"\xff\xfe" + (60_002).to_bytes(2, "big") + b"c" * 60_000
+    p = tmp_path / "grande_cabecalho.jpg"
+    p.write_bytes(jpeg[:2] + com + com + jpeg[2:])
+
+    monkeypatch.setattr(dim_module, "_dimensoes_pillow", lambda c: pytest.fail("usou Pillow"))
+    assert ler_dimensoes(p) == (321, 77)
+
+
+def test_u_dimensoes_formato_desconhecido_usa_pillow(tmp_path: Path):
+    p = _guardar(tmp_path / "img.bmp", "BMP", (10, 20))
+    assert ler_dimensoes(p) == (10, 20)
+
+
+def test_u_dimensoes_invalido_ou_inexistente_devolve_none(tmp_path: Path):
+    p = tmp_path / "x.jpg"
+    p.write_bytes(b"\xff\xd8\xff\xe0lixo")
+
+    assert ler_dimensoes(p) is None
+    assert ler_dimensoes(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_dimensoes_em_lote(tmp_path: Path):
+    caminhos = [_guardar(tmp_path / f"{i}.png", "PNG", (i + 1, 2 * i + 1)) for i in range(10)]
+
+    res = ler_dimensoes_em_lote(caminhos, max_workers=4)
+
+    assert res == {p: (i + 1, 2 * i + 1) for i, p in enumerate(caminhos)}
@@ -1,7 +1,11 @@
+import os
 from pathlib import Path
 
+import pytest
+
 from classes.detetar_duplicados import DetetarDuplicados
 from classes.foto import Foto
+from classes.motor_de_hash import MotorDeHash, TAMANHO_EXTREMOS
 
 
 def test_u_duplicados_marca_segunda_como_duplicada(tmp_path: Path):
@@ -80,3 +84,79 @@ def test_u_duplicados_ignora_ficheiro_inexistente(tmp_path: Path):
     assert grupos == []
     assert f.duplicada is False
     assert f.hash_conteudo is None
+
+
+class _MotorEspiao(MotorDeHash):
+    """Regista que ficheiros foram lidos por inteiro e quais só no início/fim."""
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=2)
+        self.completos: list[str] = []
+        self.parciais: list[str] = []
+
+    def calcular(self, caminhos):
+        caminhos = list(caminhos)
+        self.completos += sorted(c.name for c in caminhos)
+        return super().calcular(caminhos)
+
+    def calcular_parcial(self, caminhos, tamanho_extremos=TAMANHO_EXTREMOS):
+        caminhos = list(caminhos)
+        self.parciais += sorted(c.name for c in caminhos)
+        return super().calcular_parcial(caminhos, tamanho_extremos)
+
+
+def test_u_duplicados_por_niveis_so_le_tudo_quando_os_parciais_coincidem(tmp_path: Path):
+    grande = 4 * TAMANHO_EXTREMOS
+    base = bytes(range(256)) * (grande // 256)
+    meio_diferente = bytearray(base)
+    meio_diferente[grande // 2] ^= 0xFF
+    inicio_diferente = bytearray(base)
+    inicio_diferente[0] ^= 0xFF
+
+    ficheiros = {
+        "a.jpg": base,
+        "b.jpg": base,                      # duplicado de a
+        "c.jpg": bytes(meio_diferente),     # parcial igual, completo diferente
+        "d.jpg": bytes(inicio_diferente),   # parcial diferente: nunca lido por inteiro
+        "e.jpg": b"tamanho unico",          # nem é aberto
+    }
+    fotos = []
+    for nome, dados in ficheiros.items():
+        (tmp_path / nome).write_bytes(dados)
+        fotos.append(Foto(tmp_path / nome))
+
+    motor = _MotorEspiao()
+    grupos = DetetarDuplicados(motor_de_hash=motor).detetar(fotos)
+
+    assert motor.parciais == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert motor.completos == ["a.jpg", "b.jpg", "c.jpg"]
+    assert [len(g.fotos) for g in grupos] == [2]
+    assert [f.duplicada for f in fotos] == [False, True, False, False, False]
+
+    # mesmo resultado que hashar tudo
+    referencia = [Foto(tmp_path / nome) for nome in ficheiros]
+    for f in referencia:
+        f.calcular_hash()
+    grupos_ref = DetetarDuplicados().detetar(referencia)
+    assert [(g.hash_conteudo, [f.caminho for f in g.fotos]) for g in grupos] == \
+        [(g.hash_conteudo, [f.caminho for f in g.fotos]) for g in grupos_ref]
+
+
+@pytest.mark.skipif(not hasattr(os, "link"), reason="sem hard links")
+def test_u_duplicados_hard_links_sao_lidos_uma_vez(tmp_path: Path):
+    a = tmp_path / "a.jpg"
+    a.write_bytes(b"X" * (3 * TAMANHO_EXTREMOS))
+    try:
+        os.link(a, tmp_path / "b.jpg")
+    except OSError:
+        pytest.skip("sistema de ficheiros sem hard links")
+
+    fotos = [Foto(a), Foto(tmp_path / "b.jpg")]
+    motor = _MotorEspiao()
+    grupos = DetetarDuplicados(motor_de_hash=motor).detetar(fotos)
+
+    assert motor.parciais == []
+    assert len(motor.completos) == 1
+    assert len(grupos) == 1
+    assert fotos[0].hash_conteudo == fotos[1].hash_conteudo is not None
+    assert fotos[1].duplicada is True
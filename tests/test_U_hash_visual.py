@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import io
+import struct
+from pathlib import Path
+
+import imagehash
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from classes.cache_metadados import CacheMetadados
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.hash_visual import (
+    LADO_PHASH,
+    calcular_hash_visual,
+    calcular_hashes_visuais,
+    hash_visual_da_miniatura,
+    reduzir_para_phash,
+)
+from classes.leitor_exif import ler_miniatura_exif
+
+
+def _desenho(destino: Path, tamanho: tuple[int, int], formato: str = "JPEG") -> None:
+    img = Image.new("RGB", tamanho, "white")
+    draw = ImageDraw.Draw(img)
+    w, h = tamanho
+    draw.rectangle([w // 6, h // 6, w * 5 // 6, h * 5 // 6], outline="black", width=max(3, w // 40))
+    draw.line([0, 0, w - 1, h - 1], fill="black", width=max(3, w // 60))
+    draw.ellipse([w // 3, h // 3, w // 2, h // 2], fill="gray")
+    img.save(destino, format=formato)
+
+
+def test_u_imagem_pequena_hash_igual_ao_de_sempre(tmp_path: Path):
+    p = tmp_path / "pequena.jpg"
+    _desenho(p, (300, 200))
+
+    with Image.open(p) as img:
+        assert calcular_hash_visual(p) == imagehash.phash(img)
+
+
+def test_u_jpeg_grande_descodificado_em_escala_reduzida(tmp_path: Path):
+    p = tmp_path / "grande.jpg"
+    _desenho(p, (4096, 3072))
+
+    with Image.open(p) as img:
+        reduzida = reduzir_para_phash(img)
+        assert reduzida.mode == "L"  # só a luminância
+        assert min(reduzida.size) >= LADO_PHASH
+        assert reduzida.size[0] * reduzida.size[1] <= 4096 * 3072 // 16
+
+    with Image.open(p) as img:
+        completo = imagehash.phash(img)
+    assert calcular_hash_visual(p) - completo <= 2
+
+
+def test_u_png_grande_reduzido_depois_de_descodificar(tmp_path: Path):
+    p = tmp_path / "grande.png"
+    _desenho(p, (1600, 1200), "PNG")
+
+    with Image.open(p) as img:
+        assert reduzir_para_phash(img).size == (800, 600)
+    with Image.open(p) as img:
+        assert calcular_hash_visual(p) - imagehash.phash(img) <= 2
+
+
+def _desenho_no_modo(destino: Path, modo: str) -> None:
+    """1200×1100 (lado menor >= 2 × LADO_PHASH) num modo que o reduce() do Pillow não aceita."""
+    img = Image.new("L", (1200, 1100), 255)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([200, 200, 1000, 900], outline=0, width=30)
+    draw.ellipse([400, 400, 600, 600], fill=128)
+    if modo == "I;16":
+        # 16 bits (como um scan TIFF): a mesma imagem com a gama 0..255
+        img = Image.fromarray(np.asarray(img, dtype=np.uint16))
+        img.save(destino, format="TIFF")
+        return
+    img.convert(modo).save(destino, format="PNG")
+
+
+@pytest.mark.parametrize("modo, nome", [("P", "paleta.png"), ("1", "bits.png"), ("I;16", "scan.tif")])
+def test_u_modos_sem_reduce_convertidos_antes(tmp_path: Path, modo: str, nome: str):
+    p = tmp_path / nome
+    _desenho_no_modo(p, modo)
+
+    with Image.open(p) as img:
+        assert img.mode == modo
+        reduzida = reduzir_para_phash(img)
+        assert reduzida.mode == "L"
+        assert reduzida.size == (600, 550)
+    with Image.open(p) as img:
+        assert calcular_hash_visual(p) - imagehash.phash(img) <= 2
+
+
+def test_u_hashes_em_pool_iguais_ao_serial_e_falhas_com_motivo(tmp_path: Path):
+    caminhos = []
+    for i, tamanho in enumerate([(200, 150), (1200, 900), (640, 480)]):
+        p = tmp_path / f"{i}.jpg"
+        _desenho(p, tamanho)
+        caminhos.append(p)
+    lixo = tmp_path / "lixo.jpg"
+    lixo.write_bytes(b"nao e imagem")
+
+    resultados = calcular_hashes_visuais(caminhos + [lixo], workers=2, tamanho_lote=1)
+
+    for p in caminhos:
+        assert resultados[p] == (calcular_hash_visual(p), None)
+    h, motivo = resultados[lixo]
+    assert h is None
+    assert motivo.startswith("UnidentifiedImageError")
+
+
+def test_u_quase_duplicados_com_pool_igual_ao_serial(tmp_path: Path):
+    for nome, q in (("a.jpg", 95), ("b.jpg", 40), ("c.jpg", 80)):
+        img = Image.new("RGB", (256, 256), "white")
+        ImageDraw.Draw(img).rectangle([40, 40, 200, 200], outline="black", width=6)
+        img.save(tmp_path / nome, quality=q)
+    (tmp_path / "lixo.jpg").write_bytes(b"nao e imagem")
+    caminhos = sorted(tmp_path.glob("*.jpg"))
+    cache = CacheMetadados(tmp_path / "c.sqlite3")
+
+    serial = [Foto(p) for p in caminhos]
+    paralelo = [Foto(p) for p in caminhos]
+    DetetarDuplicados().marcar_quase_duplicados(serial, threshold=3)
+    DetetarDuplicados(cache=cache, workers_phash=2).marcar_quase_duplicados(paralelo, threshold=3)
+
+    assert [f.duplicada for f in paralelo] == [f.duplicada for f in serial]
+    assert [f.decodificavel for f in paralelo] == [f.decodificavel for f in serial] == [True, True, True, False]
+    assert cache.obter_phash(paralelo[0].obter_stat()) is not None
+    cache.fechar()
+
+
+def _jpeg(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _com_miniatura(destino: Path, principal: Image.Image, miniatura: Image.Image) -> bytes:
+    """JPEG com um APP1 Exif mínimo: IFD0 vazio -> IFD1 com JPEGInterchangeFormat(+Length)."""
+    mini = _jpeg(miniatura)
+    ifd0 = struct.pack("<HI", 0, 14)
+    ifd1 = (
+        struct.pack("<H", 2)
+        + struct.pack("<HHII", 0x0201, 4, 1, 44)  # LONG: offset da miniatura no bloco TIFF
+        + struct.pack("<HHII", 0x0202, 4, 1, len(mini))
+    )
+    tiff = b"II*\x00" + struct.pack("<I", 8) + ifd0 + ifd1 + struct.pack("<I", 0) + mini
+    app1 = b"Exif\x00\x00" + tiff
+    corpo = _jpeg(principal)
+    destino.write_bytes(corpo[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + corpo[2:])
+    return mini
+
+
+def _cena(tamanho: tuple[int, int], deslocada: bool = False) -> Image.Image:
+    img = Image.new("RGB", tamanho, "white")
+    draw = ImageDraw.Draw(img)
+    w, h = tamanho
+    if deslocada:
+        draw.rectangle([w // 2, h // 2, w - 1, h - 1], fill="black")
+        draw.line([w - 1, 0, 0, h - 1], fill="gray", width=max(2, w // 30))
+    else:
+        draw.rectangle([w // 8, h // 8, w // 2, h // 2], fill="black")
+        draw.line([0, 0, w - 1, h - 1], fill="gray", width=max(2, w // 30))
+    return img
+
+
+def test_u_ler_miniatura_exif(tmp_path: Path):
+    com = tmp_path / "com.jpg"
+    mini = _com_miniatura(com, _cena((640, 480)), _cena((160, 120)))
+    sem = tmp_path / "sem.jpg"
+    _desenho(sem, (64, 64))
+    lixo = tmp_path / "lixo.jpg"
+    lixo.write_bytes(b"nao e imagem")
+
+    assert ler_miniatura_exif(com) == mini
+    assert ler_miniatura_exif(sem) is None
+    assert ler_miniatura_exif(lixo) is None
+    assert ler_miniatura_exif(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_hash_da_miniatura_perto_do_hash_completo(tmp_path: Path):
+    p = tmp_path / "a.jpg"
+    _com_miniatura(p, _cena((1600, 1200)), _cena((160, 120)))
+
+    assert hash_visual_da_miniatura(p) - calcular_hash_visual(p) <= 4
+    assert hash_visual_da_miniatura(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_quase_duplicados_pela_miniatura_sem_descodificar(tmp_path: Path, monkeypatch):
+    for nome in ("a.jpg", "b.jpg"):
+        _com_miniatura(tmp_path / nome, _cena((1600, 1200)), _cena((160, 120)))
+    fotos = [Foto(tmp_path / "a.jpg"), Foto(tmp_path / "b.jpg")]
+
+    det = DetetarDuplicados(phash_da_miniatura=True)
+    monkeypatch.setattr(det, "_calcular_phash", lambda c: (_ for _ in ()).throw(AssertionError("descodificou")))
+
+    assert det.marcar_quase_duplicados(fotos, threshold=3) == 1
+
+
+def test_u_verificar_miniatura_desfaz_falso_positivo(tmp_path: Path):
+    # b foi editada (imagem diferente) mas manteve a miniatura de a
+    _com_miniatura(tmp_path / "a.jpg", _cena((800, 600)), _cena((160, 120)))
+    _com_miniatura(tmp_path / "b.jpg", _cena((800, 600), deslocada=True), _cena((160, 120)))
+    _com_miniatura(tmp_path / "c.jpg", _cena((800, 600)), _cena((160, 120)))
+
+    def fotos():
+        return [Foto(tmp_path / n) for n in ("a.jpg", "b.jpg", "c.jpg")]
+
+    so_miniatura = fotos()
+    DetetarDuplicados(phash_da_miniatura=True).marcar_quase_duplicados(so_miniatura, threshold=3)
+    assert sum(f.duplicada for f in so_miniatura) == 2
+
+    verificadas = fotos()
+    grupos = DetetarDuplicados(phash_da_miniatura=True, verificar_miniatura=True).detetar_quase_duplicados(
+        verificadas, threshold=3
+    )
+    assert [[f.nome_de_ficheiro for f in g.fotos] for g in grupos] == [["a.jpg", "c.jpg"]]
+    assert verificadas[1].duplicada is False
+
+    # mesmo resultado com o pHash em falta calculado no pool de processos
+    det = DetetarDuplicados(phash_da_miniatura=True, verificar_miniatura=True, workers_phash=2)
+    grupos = det.detetar_quase_duplicados(fotos(), threshold=3)
+    assert [[f.nome_de_ficheiro for f in g.fotos] for g in grupos] == [["a.jpg", "c.jpg"]]
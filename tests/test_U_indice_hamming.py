@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import imagehash
+import numpy as np
+import pytest
+
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.indice_hamming import IndiceHamming
+
+
+def _hashes_com_vizinhos(n: int, semente: int = 7) -> list[int]:
+    """Poucos "originais" aleatórios + cópias com 0-5 bits trocados, baralhados."""
+    rnd = random.Random(semente)
+    bases = [rnd.getrandbits(64) for _ in range(n // 4)]
+    valores = list(bases)
+    while len(valores) < n:
+        v = rnd.choice(bases)
+        for _ in range(rnd.randint(0, 5)):
+            v ^= 1 << rnd.randrange(64)
+        valores.append(v)
+    rnd.shuffle(valores)
+    return valores
+
+
+@pytest.mark.parametrize("t", [-1, 0, 1, 3, 6, 64])
+def test_u_indice_igual_a_pesquisa_linear(t: int):
+    valores = _hashes_com_vizinhos(400)
+    indice = IndiceHamming(t)
+
+    for v in valores[:200]:
+        indice.adicionar(v)
+    for v in valores:
+        linear = [i for i, w in enumerate(valores[:200]) if (v ^ w).bit_count() <= t]
+        assert indice.dentro(v) == linear
+        assert indice.primeiro_dentro(v) == (linear[0] if linear else None)
+
+
+def test_u_indice_hashes_pequenos():
+    indice = IndiceHamming(2, bits=4)
+    assert indice.primeiro_dentro(0b1111) is None
+
+    indice.adicionar(0b0000)
+    indice.adicionar(0b1110)
+
+    assert len(indice) == 2
+    assert indice.primeiro_dentro(0b1111) == 1
+    assert indice.dentro(0b0011) == [0]  # 0b1110 fica a 3
+
+
+def _fotos_com_phash(tmp_path: Path, valores: list[int]) -> list[Foto]:
+    fotos = []
+    for i, v in enumerate(valores):
+        foto = Foto(tmp_path / f"{i:04d}.jpg")
+        bits = np.array([(v >> (63 - b)) & 1 for b in range(64)], dtype=bool).reshape(8, 8)
+        foto.definir_hash_visual(imagehash.ImageHash(bits))
+        fotos.append(foto)
+    return fotos
+
+
+def test_u_quase_duplicados_mesmos_grupos_que_a_procura_linear(tmp_path: Path):
+    fotos = _fotos_com_phash(tmp_path, _hashes_com_vizinhos(300, semente=3))
+
+    # algoritmo anterior: primeiro representante (por ordem de criação) a distância <= threshold
+    esperado: list[tuple[imagehash.ImageHash, list[Foto]]] = []
+    for foto in fotos:
+        for h_rep, lista in esperado:
+            if foto.hash_visual - h_rep <= 3:
+                lista.append(foto)
+                break
+        else:
+            esperado.append((foto.hash_visual, [foto]))
+
+    grupos = DetetarDuplicados().detetar_quase_duplicados(fotos, threshold=3)
+
+    assert [g.fotos for g in grupos] == [tuple(lista) for _h, lista in esperado if len(lista) > 1]
+    assert [g.hash_visual for g in grupos] == [str(h) for h, lista in esperado if len(lista) > 1]
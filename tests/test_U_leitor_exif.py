@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import classes.foto as foto_module
+import classes.leitor_exif as leitor_module
+from classes.campos_foto import CAMPO_DATA
+from classes.foto import Foto
+from classes.leitor_exif import exif_de_bytes, exif_de_pillow, ler_exif
+
+
+def _exif_completo() -> Image.Exif:
+    exif = Image.Exif()
+    exif[306] = "2019:01:01 00:00:00"
+    exif.get_ifd(0x8769)[36867] = "2020:02:03 04:05:06"
+    gps = exif.get_ifd(0x8825)
+    gps[1] = "N"
+    gps[2] = (38.0, 43.0, 20.5)
+    gps[3] = "W"
+    gps[4] = (9.0, 8.0, 20.0)
+    return exif
+
+
+def _guardar(destino: Path, formato: str = "JPEG", exif: Image.Exif | None = None) -> Path:
+    img = Image.new("RGB", (8, 8), "white")
+    if exif is None:
+        img.save(destino, format=formato)
+    else:
+        img.save(destino, format=formato, exif=exif)
+    return destino
+
+
+def test_u_ler_exif_jpeg_le_data_do_ifd_exif_e_gps(tmp_path):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+
+    exif = ler_exif(p)
+
+    assert exif[36867] == "2020:02:03 04:05:06"
+    assert exif[306] == "2019:01:01 00:00:00"
+    assert exif[34853] == {1: "N", 2: ((38, 1), (43, 1), (41, 2)), 3: "W", 4: ((9, 1), (8, 1), (20, 1))}
+
+
+def test_u_ler_exif_so_data_nao_visita_ifd_gps(tmp_path):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+
+    exif = ler_exif(p, campos=(CAMPO_DATA,))
+
+    assert exif[36867] == "2020:02:03 04:05:06"
+    assert 34853 not in exif
+
+
+def test_u_ler_exif_igual_ao_pillow(tmp_path):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+    foto_rapida, foto_pillow = Foto(p), Foto(p)
+
+    foto_rapida.preencher_a_partir_do_exif(ler_exif(p))
+    with Image.open(p) as img:
+        foto_pillow.preencher_a_partir_do_exif(exif_de_pillow(img.getexif()))
+
+    assert foto_rapida.data_de_captura == foto_pillow.data_de_captura == datetime(2020, 2, 3, 4, 5, 6)
+    assert foto_rapida.local_gps == pytest.approx(foto_pillow.local_gps)
+    assert foto_rapida.local_gps == pytest.approx((38 + 43 / 60 + 20.5 / 3600, -(9 + 8 / 60 + 20 / 3600)))
+
+
+def test_u_ler_exif_jpeg_sem_exif_devolve_vazio(tmp_path):
+    assert ler_exif(_guardar(tmp_path / "a.jpg")) == {}
+
+
+def test_u_ler_exif_tiff(tmp_path):
+    exif = Image.Exif()
+    exif[306] = "2018:07:08 09:10:11"
+    p = _guardar(tmp_path / "a.tif", formato="TIFF", exif=exif)
+
+    assert ler_exif(p) == {306: "2018:07:08 09:10:11"}
+
+
+def test_u_ler_exif_formato_nao_suportado_devolve_none(tmp_path):
+    assert ler_exif(_guardar(tmp_path / "a.png", formato="PNG")) is None
+    assert ler_exif(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_ler_exif_app1_para_la_da_leitura_inicial(tmp_path, monkeypatch):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+    monkeypatch.setattr(leitor_module, "TAMANHO_LEITURA_EXIF", 30)
+
+    exif = ler_exif(p)
+
+    assert exif is not None and exif[36867] == "2020:02:03 04:05:06"
+
+
+def test_u_exif_de_bytes_truncado_cai_para_none(tmp_path):
+    dados = _guardar(tmp_path / "a.jpg", exif=_exif_completo()).read_bytes()
+    assert exif_de_bytes(dados)[36867] == "2020:02:03 04:05:06"
+    assert exif_de_bytes(dados[:60]) is None
+
+
+def test_u_exif_de_pillow_resolve_ifd_exif_e_gps(tmp_path):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+
+    with Image.open(p) as img:
+        exif = exif_de_pillow(img.getexif())
+
+    assert exif[36867] == "2020:02:03 04:05:06"
+    assert isinstance(exif[34853], dict) and exif[34853][1] == "N"
+
+
+def test_u_foto_extrair_metadados_nao_abre_pillow_em_jpeg(tmp_path, monkeypatch):
+    p = _guardar(tmp_path / "a.jpg", exif=_exif_completo())
+
+    def falhar(*_args, **_kwargs):
+        raise AssertionError("Image.open não devia ser chamado")
+
+    monkeypatch.setattr(foto_module.Image, "open", falhar)
+    foto = Foto(p)
+    foto.extrair_metadados()
+
+    assert foto.data_de_captura == datetime(2020, 2, 3, 4, 5, 6)
+    assert foto.local_gps is not None
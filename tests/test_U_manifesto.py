@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+
+import classes.foto as foto_module
+from classes.campos_foto import CAMPO_DATA, CAMPO_GPS, CAMPO_HASH
+from classes.construtor_de_fotos import ConstrutorDeFotos
+from classes.manifesto_scan import ManifestoScan, caminho_manifesto
+
+
+def _contar_image_open(monkeypatch) -> list:
+    chamadas = []
+    original = foto_module.Image.open
+
+    def open_contado(*args, **kwargs):
+        chamadas.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(foto_module.Image, "open", open_contado)
+    return chamadas
+
+
+def test_u_manifesto_fica_ao_lado_da_raiz_destino(tmp_path: Path):
+    raiz = tmp_path / "Foto_Organizada"
+    assert caminho_manifesto(raiz).parent == tmp_path
+
+
+def test_u_manifesto_segundo_scan_reutiliza_ficheiros_inalterados(tmp_path: Path, monkeypatch):
+    a = tmp_path / "a.jpg"
+    b = tmp_path / "b.jpg"
+    a.write_bytes(b"AAA")
+    b.write_bytes(b"BBB")
+    destino = tmp_path / "manifesto.json"
+
+    # 1ª execução: processa tudo e guarda
+    m1 = ManifestoScan.carregar(destino)
+    fotos1 = ConstrutorDeFotos(manifesto=m1).construir([a, b])
+    m1.guardar()
+    assert m1.processadas == 2 and m1.reutilizadas == 0
+
+    # 2ª execução: nada mudou => não abre nenhum ficheiro
+    chamadas = _contar_image_open(monkeypatch)
+    m2 = ManifestoScan.carregar(destino)
+    fotos2 = ConstrutorDeFotos(manifesto=m2).construir([a, b])
+
+    assert chamadas == []
+    assert m2.reutilizadas == 2 and m2.processadas == 0
+    for f1, f2 in zip(fotos1, fotos2):
+        assert f2.hash_conteudo == f1.hash_conteudo
+        assert f2.data_de_captura == f1.data_de_captura
+        assert f2.local_gps == f1.local_gps
+
+
+def test_u_manifesto_ficheiro_alterado_e_reprocessado(tmp_path: Path):
+    a = tmp_path / "a.jpg"
+    a.write_bytes(b"AAA")
+    destino = tmp_path / "manifesto.json"
+
+    m1 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m1).construir([a])
+    m1.guardar()
+
+    a.write_bytes(b"AAAA")  # tamanho muda
+    st = a.stat()
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    m2 = ManifestoScan.carregar(destino)
+    (foto,) = ConstrutorDeFotos(manifesto=m2).construir([a])
+
+    assert m2.processadas == 1 and m2.reutilizadas == 0
+    assert foto.hash_conteudo == hashlib.md5(b"AAAA").hexdigest()
+
+
+def test_u_manifesto_remove_entradas_de_ficheiros_que_desapareceram(tmp_path: Path):
+    a = tmp_path / "a.jpg"
+    b = tmp_path / "b.jpg"
+    a.write_bytes(b"A")
+    b.write_bytes(b"B")
+    destino = tmp_path / "manifesto.json"
+
+    m1 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m1).construir([a, b])
+    m1.guardar()
+
+    b.unlink()
+    m2 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m2).construir([a])
+    m2.guardar()
+
+    assert len(ManifestoScan.carregar(destino)) == 1
+
+
+def test_u_manifesto_mantem_entradas_nao_vistas_nesta_execucao(tmp_path: Path):
+    a = tmp_path / "a.jpg"
+    b = tmp_path / "b.jpg"
+    a.write_bytes(b"A")
+    b.write_bytes(b"B")
+    destino = tmp_path / "manifesto.json"
+
+    m1 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m1).construir([a, b])
+    m1.guardar()
+
+    # ex.: --limite 1 — b não foi vista, mas continua a existir
+    m2 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m2).construir([a])
+    m2.guardar()
+
+    m3 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m3).construir([a, b])
+    assert m3.reutilizadas == 2 and m3.processadas == 0
+
+
+def test_u_manifesto_regista_fotos_sem_hash_e_reutiliza(tmp_path: Path, monkeypatch):
+    a = tmp_path / "a.jpg"
+    a.write_bytes(b"AAA")
+    destino = tmp_path / "manifesto.json"
+    campos = frozenset({CAMPO_DATA, CAMPO_GPS})  # o hash fica para os níveis dos duplicados
+
+    m1 = ManifestoScan.carregar(destino)
+    ConstrutorDeFotos(manifesto=m1, campos=campos).construir([a])
+    m1.guardar()
+    assert m1.processadas == 1
+
+    chamadas = _contar_image_open(monkeypatch)
+    m2 = ManifestoScan.carregar(destino)
+    (foto,) = ConstrutorDeFotos(manifesto=m2, campos=campos).construir([a])
+
+    assert chamadas == [] and m2.reutilizadas == 1
+    assert not foto.conhecido(CAMPO_HASH)  # não guardado => por calcular, não "None"
+    assert foto.hash_conteudo == hashlib.md5(b"AAA").hexdigest()
+
+
+def test_u_manifesto_corrompido_e_tratado_como_vazio(tmp_path: Path):
+    destino = tmp_path / "manifesto.json"
+    destino.write_text("{isto não é json", encoding="utf-8")
+
+    assert len(ManifestoScan.carregar(destino)) == 0
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+
+import classes.motor_de_hash as motor_module
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.motor_de_hash import MotorDeHash, hash_ficheiro
+
+
+def test_u_hash_ficheiro_igual_ao_hashlib_para_varios_blocos(tmp_path: Path):
+    p = tmp_path / "a.bin"
+    conteudo = bytes(range(256)) * 1000  # 256 KB
+    p.write_bytes(conteudo)
+
+    for bloco in (1, 7, 4096, 1024 * 1024):
+        assert hash_ficheiro(p, "md5", tamanho_bloco=bloco) == hashlib.md5(conteudo).hexdigest()
+    assert hash_ficheiro(p, "sha256") == hashlib.sha256(conteudo).hexdigest()
+
+
+def test_u_hash_ficheiro_none_para_pasta_ou_inexistente(tmp_path: Path):
+    assert hash_ficheiro(tmp_path) is None
+    assert hash_ficheiro(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_motor_calcula_em_paralelo(tmp_path: Path, monkeypatch):
+    caminhos = []
+    for i in range(12):
+        p = tmp_path / f"{i}.jpg"
+        p.write_bytes(str(i).encode() * 100)
+        caminhos.append(p)
+
+    threads = set()
+    original = motor_module.hash_ficheiro
+
+    def espiao(*args, **kwargs):
+        threads.add(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(motor_module, "hash_ficheiro", espiao)
+
+    hashes = MotorDeHash(max_workers=4).calcular(caminhos)
+
+    assert hashes == {p: hashlib.md5(p.read_bytes()).hexdigest() for p in caminhos}
+    assert all(nome.startswith("hash") for nome in threads)
+
+
+def test_u_motor_preenche_so_as_fotos_sem_hash(tmp_path: Path):
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    a.write_bytes(b"A")
+    b.write_bytes(b"B")
+    fa, fb, fc = Foto(a), Foto(b), Foto(tmp_path / "nao_existe.jpg")
+    fb.definir_hash_conteudo("ja_calculado")
+
+    n = MotorDeHash(max_workers=2).preencher([fa, fb, fc])
+
+    assert n == 1
+    assert fa.hash_conteudo == hashlib.md5(b"A").hexdigest()
+    assert fb.hash_conteudo == "ja_calculado"
+    assert fc.hash_conteudo is None
+
+
+def test_u_detetar_usa_o_motor_para_hashes_em_falta(tmp_path: Path):
+    pedidos = []
+
+    class MotorEspiao(MotorDeHash):
+        def calcular(self, caminhos):
+            caminhos = list(caminhos)
+            pedidos.append(caminhos)
+            return super().calcular(caminhos)
+
+    fotos = []
+    for nome in ("a.jpg", "b.jpg", "c.jpg"):
+        p = tmp_path / nome
+        p.write_bytes(b"igual" if nome != "c.jpg" else b"outro")
+        fotos.append(Foto(p))
+
+    grupos = DetetarDuplicados(motor_de_hash=MotorEspiao()).detetar(fotos)
+
+    assert len(pedidos) == 1 and len(pedidos[0]) == 3  # um só pedido com todas as que faltam
+    assert len(grupos) == 1
+    assert [f.duplicada for f in fotos] == [False, True, False]
+
+
+def test_u_hash_ficheiro_grande_por_mmap_igual_ao_hashlib(tmp_path: Path, monkeypatch):
+    p = tmp_path / "panorama.tif"
+    conteudo = bytes(range(256)) * 4000  # ~1 MB
+    p.write_bytes(conteudo)
+
+    mapeados = []
+    original = motor_module.mapear_ficheiro
+
+    def espiao(f):
+        mapa = original(f)
+        mapeados.append(mapa is not None)
+        return mapa
+
+    monkeypatch.setattr(motor_module, "mapear_ficheiro", espiao)
+
+    assert hash_ficheiro(p, tamanho_bloco=4096, limiar_mmap=64 * 1024) == hashlib.md5(conteudo).hexdigest()
+    assert mapeados == [True]
+    # abaixo do limiar (ou limiar None) continua a ler em blocos
+    assert hash_ficheiro(p, tamanho_bloco=4096, limiar_mmap=None) == hashlib.md5(conteudo).hexdigest()
+    assert hash_ficheiro(p, tamanho_bloco=4096) == hashlib.md5(conteudo).hexdigest()
+    assert mapeados == [True]
+
+
+def test_u_hash_ficheiro_continua_em_blocos_se_mmap_falhar(tmp_path: Path, monkeypatch):
+    p = tmp_path / "a.bin"
+    conteudo = b"abc" * 100_000
+    p.write_bytes(conteudo)
+    monkeypatch.setattr(motor_module, "mapear_ficheiro", lambda _f: None)
+
+    assert hash_ficheiro(p, tamanho_bloco=1000, limiar_mmap=1) == hashlib.md5(conteudo).hexdigest()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import imagehash
+import numpy as np
+import pytest
+
+import classes.motor_hamming as motor_module
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.indice_hamming import IndiceHamming
+from classes.motor_hamming import IndiceHammingNumPy, contar_bits, distancias, empacotar, pares_dentro
+
+
+def _valores(n: int, semente: int = 11) -> list[int]:
+    """Originais aleatórios + cópias com poucos bits trocados (há pares perto e longe)."""
+    rnd = random.Random(semente)
+    bases = [rnd.getrandbits(64) for _ in range(n // 3)]
+    valores = list(bases)
+    while len(valores) < n:
+        v = rnd.choice(bases)
+        for _ in range(rnd.randint(0, 6)):
+            v ^= 1 << rnd.randrange(64)
+        valores.append(v)
+    rnd.shuffle(valores)
+    return valores
+
+
+def test_u_empacotar_e_distancias_iguais_ao_imagehash():
+    valores = _valores(50)
+    hashes = [imagehash.hex_to_hash(f"{v:016x}") for v in valores]
+    arr = empacotar(hashes)
+
+    assert arr.dtype == np.uint64
+    assert arr.tolist() == valores
+    assert distancias(valores[0], arr).tolist() == [hashes[0] - h for h in hashes]
+
+
+def test_u_contar_bits_sem_bitwise_count(monkeypatch):
+    arr = np.array([0, 1, 2**64 - 1, 0xF0F0], dtype=np.uint64)
+    monkeypatch.delattr(motor_module.np, "bitwise_count", raising=False)
+
+    assert contar_bits(arr).tolist() == [0, 1, 64, 8]
+
+
+@pytest.mark.parametrize("tamanho_bloco", [7, 64, 1024])
+def test_u_pares_dentro_igual_a_forca_bruta(tamanho_bloco: int):
+    valores = _valores(150)
+    esperado = [
+        [i, j]
+        for i in range(len(valores))
+        for j in range(i + 1, len(valores))
+        if (valores[i] ^ valores[j]).bit_count() <= 4
+    ]
+
+    pares = pares_dentro(empacotar(valores), 4, tamanho_bloco=tamanho_bloco)
+
+    assert pares.shape[1] == 2
+    assert pares.tolist() == esperado
+    assert pares_dentro(empacotar([]), 4).shape == (0, 2)
+
+
+@pytest.mark.parametrize("t", [0, 3, 10])
+def test_u_indice_numpy_igual_ao_indice_por_faixas(t: int):
+    valores = _valores(300)
+    faixas, numpy_ = IndiceHamming(t), IndiceHammingNumPy(t, tamanho_bloco=16)
+
+    for v in valores:
+        assert numpy_.primeiro_dentro(v) == faixas.primeiro_dentro(v)
+        assert numpy_.dentro(v) == faixas.dentro(v)
+        if faixas.primeiro_dentro(v) is None:
+            assert numpy_.adicionar(v) == faixas.adicionar(v)
+    assert len(numpy_) == len(faixas)
+
+
+def test_u_indice_numpy_recusa_hashes_grandes():
+    with pytest.raises(ValueError):
+        IndiceHammingNumPy(3, bits=256)
+
+
+def test_u_quase_duplicados_backend_numpy_da_os_mesmos_grupos(tmp_path: Path):
+    def fotos():
+        lista = []
+        for i, v in enumerate(_valores(200, semente=5)):
+            foto = Foto(tmp_path / f"{i:04d}.jpg")
+            foto.definir_hash_visual(imagehash.hex_to_hash(f"{v:016x}"))
+            lista.append(foto)
+        return lista
+
+    por_faixas = DetetarDuplicados().detetar_quase_duplicados(fotos(), threshold=4)
+    vetorizado = DetetarDuplicados(indice_hamming=IndiceHammingNumPy).detetar_quase_duplicados(fotos(), threshold=4)
+
+    assert por_faixas
+    assert [[f.caminho for f in g.fotos] for g in vetorizado] == [[f.caminho for f in g.fotos] for g in por_faixas]
@@ -70,3 +70,11 @@ def test_u_relatorio_distribuicao_por_pasta(tmp_path: Path):
     assert resumo.distribuicao_por_pasta[pasta2] == 1
     assert pasta2 in resumo.distribuicao_por_pasta
     # SKIP não entra na distribuição (porque não é mover)
+
+
+def test_u_relatorio_conta_nao_decodificaveis(tmp_path: Path):
+    res_exec = ResultadoExecucao(total=0, movidas=0, skipped=0, erros=0)
+
+    assert Relatorio().gerar(operacoes=[], resultado=res_exec, registos=[]).nao_decodificaveis is None
+    resumo = Relatorio().gerar(operacoes=[], resultado=res_exec, registos=[], nao_decodificaveis=2)
+    assert resumo.nao_decodificaveis == 2
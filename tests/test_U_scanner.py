@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from classes.scanner_de_ficheiros import ScannerDeFicheiros
+
+
+def _criar_arvore(raiz: Path) -> set[Path]:
+    fotos = {
+        raiz / "a.jpg",
+        raiz / "B.JPEG",
+        raiz / "2024" / "c.png",
+        raiz / "2024" / "05" / "d.webp",
+        raiz / "2024" / "05" / "e.heic",
+        raiz / "outra" / "f.tif",
+    }
+    for p in fotos:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"x")
+
+    # ruído: extensões não suportadas e pasta com nome de foto
+    (raiz / "notas.txt").write_bytes(b"x")
+    (raiz / "2024" / "video.mp4").write_bytes(b"x")
+    (raiz / "pasta.jpg").mkdir()
+    return fotos
+
+
+def test_u_scanner_encontra_fotos_recursivamente_e_filtra_extensoes(tmp_path: Path):
+    esperado = _criar_arvore(tmp_path)
+
+    encontrados = ScannerDeFicheiros(max_workers=4).listar(tmp_path)
+
+    assert set(encontrados) == esperado
+    assert len(encontrados) == len(esperado)  # sem repetidos
+
+
+def test_u_scanner_serial_e_paralelo_dao_o_mesmo_resultado(tmp_path: Path):
+    _criar_arvore(tmp_path)
+
+    serial = ScannerDeFicheiros(max_workers=1).listar(tmp_path)
+    paralelo = ScannerDeFicheiros(max_workers=8).listar(tmp_path)
+
+    assert serial == paralelo == sorted(serial)
+
+
+def test_u_scanner_paralelo_devolve_sempre_a_mesma_ordem(tmp_path: Path):
+    for i in range(20):
+        pasta = tmp_path / f"p{i % 5}" / f"s{i}"
+        pasta.mkdir(parents=True)
+        (pasta / f"{i}.jpg").write_bytes(b"x")
+
+    scanner = ScannerDeFicheiros(max_workers=8)
+    primeira = scanner.listar_ficheiros(tmp_path)
+
+    assert [e.caminho for e in primeira] == sorted(e.caminho for e in primeira)
+    for _ in range(5):
+        assert scanner.listar_ficheiros(tmp_path) == primeira
+
+
+def test_u_scanner_respeita_limite(tmp_path: Path):
+    esperado = _criar_arvore(tmp_path)
+
+    for workers in (1, 4):
+        encontrados = ScannerDeFicheiros(max_workers=workers).listar(tmp_path, limite=3)
+        assert len(encontrados) == 3
+        assert set(encontrados) <= esperado
+
+    assert ScannerDeFicheiros().listar(tmp_path, limite=0) == []
+
+
+def test_u_scanner_limite_da_sempre_as_primeiras_por_caminho(tmp_path: Path):
+    for p in range(12):
+        pasta = tmp_path / f"p{p:02d}"
+        pasta.mkdir()
+        for f in range(8):
+            (pasta / f"{f}.jpg").write_bytes(b"x")
+        (tmp_path / f"p{p:02d}.jpg").write_bytes(b"x")  # ficheiro entre pastas na ordem de caminho
+
+    completa = ScannerDeFicheiros(max_workers=1).listar(tmp_path)
+    for workers in (1, 8):
+        scanner = ScannerDeFicheiros(max_workers=workers)
+        for _ in range(5):
+            assert scanner.listar(tmp_path, limite=20) == completa[:20]
+        assert list(scanner.iterar(tmp_path, limite=20)) == completa[:20]
+
+
+def test_u_scanner_pasta_inexistente_devolve_vazio(tmp_path: Path):
+    assert ScannerDeFicheiros().listar(tmp_path / "nao_existe") == []
+
+
+def _criar(raiz: Path, relativos: list[str]) -> None:
+    for rel in relativos:
+        p = raiz / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"x")
+
+
+def _relativos(raiz: Path, encontrados: list[Path]) -> set[str]:
+    return {p.relative_to(raiz).as_posix() for p in encontrados}
+
+
+def test_u_scanner_excluir_poda_subarvores_por_nome_e_caminho(tmp_path: Path):
+    _criar(tmp_path, [
+        "a.jpg",
+        "@eaDir/a.jpg/SYNOFOTO_THUMB_M.jpg",
+        ".git/objects/x.png",
+        "2019/b.jpg",
+        "2020/c.jpg",
+        "2020/lixo.tmp.jpg",
+    ])
+
+    scanner = ScannerDeFicheiros(max_workers=2, excluir=("@eaDir", ".git", "2019/*", "*.tmp.jpg"))
+
+    assert _relativos(tmp_path, scanner.listar(tmp_path)) == {"a.jpg", "2020/c.jpg"}
+
+
+def test_u_scanner_incluir_so_ficheiros_que_correspondem(tmp_path: Path):
+    _criar(tmp_path, ["IMG_1.jpg", "DSC_2.jpg", "sub/IMG_3.png", "2023/x.jpg"])
+
+    scanner = ScannerDeFicheiros(max_workers=1, incluir=("IMG_*", "2023/*"))
+
+    assert _relativos(tmp_path, scanner.listar(tmp_path)) == {"IMG_1.jpg", "sub/IMG_3.png", "2023/x.jpg"}
+
+
+def test_u_scanner_profundidade_maxima(tmp_path: Path):
+    _criar(tmp_path, ["a.jpg", "n1/b.jpg", "n1/n2/c.jpg"])
+
+    def com_profundidade(n):
+        return _relativos(tmp_path, ScannerDeFicheiros(max_workers=2, profundidade_maxima=n).listar(tmp_path))
+
+    assert com_profundidade(0) == {"a.jpg"}
+    assert com_profundidade(1) == {"a.jpg", "n1/b.jpg"}
+    assert com_profundidade(None) == {"a.jpg", "n1/b.jpg", "n1/n2/c.jpg"}
+
+
+def test_u_scanner_pastas_excluidas_por_caminho(tmp_path: Path):
+    _criar(tmp_path, ["a.jpg", "Foto_Organizada/2024/01/a.jpg", "outra/Foto_Organizada/b.jpg"])
+
+    scanner = ScannerDeFicheiros(max_workers=2, pastas_excluidas=(tmp_path / "Foto_Organizada",))
+
+    # só a pasta concreta é podada (não outras com o mesmo nome)
+    assert _relativos(tmp_path, scanner.listar(tmp_path)) == {"a.jpg", "outra/Foto_Organizada/b.jpg"}
+
+
+def test_u_scanner_aceita_igual_ao_scan(tmp_path: Path):
+    todos = [
+        "a.jpg", "IMG_1.jpg", "notas.txt", "@eaDir/IMG_2.jpg", "2019/IMG_3.jpg",
+        "n1/IMG_4.png", "n1/n2/IMG_5.jpg", "Foto_Organizada/IMG_6.jpg",
+    ]
+    _criar(tmp_path, todos)
+    scanner = ScannerDeFicheiros(
+        max_workers=1,
+        incluir=("IMG_*",),
+        excluir=("@eaDir", "2019/*"),
+        profundidade_maxima=1,
+        pastas_excluidas=(tmp_path / "Foto_Organizada",),
+    )
+
+    aceites = {rel for rel in todos if scanner.aceita(tmp_path, tmp_path / rel)}
+
+    assert aceites == _relativos(tmp_path, scanner.listar(tmp_path)) == {"IMG_1.jpg", "n1/IMG_4.png"}
+    assert not scanner.aceita(tmp_path, tmp_path.parent / "fora.jpg")
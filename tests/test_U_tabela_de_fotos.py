@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import imagehash
+import pytest
+
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.plano_de_operacoes import PlanoDeOperacoes
+from classes.regra_de_organizacao import RegraPorData, RegraPorLocal
+from classes.tabela_de_fotos import TabelaDeFotos
+
+
+def _foto(caminho: Path, i: int, gps=True, hash_=True) -> Foto:
+    f = Foto(caminho, formato="JPEG", dimensoes=(4000, 3000))
+    f.aplicar_metadados(
+        datetime(2023, 5, 14, 18, 30, i % 60, 123456),
+        (38.722222, -9.138889) if gps else None,
+        hashlib.md5(str(i).encode()).hexdigest() if hash_ else None,
+    )
+    f.definir_hash_visual(imagehash.hex_to_hash(f"{(i * 2654435761) % 2**64:016x}"))
+    return f
+
+
+def test_u_foto_tem_slots_sem_dict(tmp_path: Path):
+    f = Foto(tmp_path / "a.jpg")
+    assert not hasattr(f, "__dict__")
+    with pytest.raises(AttributeError):
+        f.atributo_inventado = 1
+
+
+def test_u_tabela_preserva_todos_os_campos(tmp_path: Path):
+    fotos = [
+        _foto(tmp_path / "2023" / "IMG_1.jpg", 1),
+        _foto(tmp_path / "2023" / "ção ñ.jpg", 2, gps=False),
+        _foto(tmp_path / "outra" / "c.jpg", 3, hash_=False),
+    ]
+    fotos[1].marcar_como_duplicado()
+    sem_data = Foto(tmp_path / "x.png")
+
+    tabela = TabelaDeFotos.de_fotos(fotos + [sem_data])
+
+    assert len(tabela) == 4
+    for f, linha in zip(fotos + [sem_data], tabela):
+        assert linha.caminho == f.caminho
+        assert linha.nome_de_ficheiro == f.nome_de_ficheiro
+        assert linha.data_de_captura == f.data_de_captura
+        assert linha.local_gps == f.local_gps
+        assert linha.hash_conteudo == f.hash_conteudo
+        assert linha.hash_visual == f.hash_visual
+        assert linha.dimensoes == f.dimensoes
+        assert linha.formato == f.formato
+        assert linha.duplicada == f.duplicada
+
+    assert tabela[-1].caminho == sem_data.caminho
+    with pytest.raises(IndexError):
+        tabela[4]
+
+
+def test_u_tabela_funciona_com_plano_e_regras(tmp_path: Path):
+    tabela = TabelaDeFotos.de_fotos([_foto(tmp_path / "a.jpg", 1), _foto(tmp_path / "b.jpg", 2, gps=False)])
+    raiz = tmp_path / "Foto_Organizada"
+
+    ops = PlanoDeOperacoes(regra=RegraPorData(), raiz_destino=raiz).gerar(tabela)
+    assert [op.destino for op in ops] == [raiz / "2023" / "05" / "a.jpg", raiz / "2023" / "05" / "b.jpg"]
+
+    ops = PlanoDeOperacoes(regra=RegraPorLocal(precision=3), raiz_destino=raiz).gerar(tabela)
+    assert ops[0].destino.parent.name == "GPS_38.722_-9.139"
+    assert ops[1].destino.parent.name == "SemLocal"
+
+
+def test_u_tabela_funciona_com_detetar_duplicados(tmp_path: Path):
+    a, b, c = tmp_path / "a.jpg", tmp_path / "b.jpg", tmp_path / "c.jpg"
+    a.write_bytes(b"igual")
+    b.write_bytes(b"igual")
+    c.write_bytes(b"outro")  # mesmo tamanho => precisa de hash
+    tabela = TabelaDeFotos.de_fotos([Foto(a), Foto(b), Foto(c)])
+
+    grupos = DetetarDuplicados().detetar(tabela)
+
+    assert len(grupos) == 1
+    assert [linha.duplicada for linha in tabela] == [False, True, False]
+    # o hash calculado pela vista ficou guardado na tabela
+    assert tabela[2].hash_conteudo == hashlib.md5(b"outro").hexdigest()
+
+
+def test_u_tabela_preserva_datas_com_fuso(tmp_path: Path):
+    datas = [
+        datetime(2023, 5, 14, 18, 30, 0, 250000, tzinfo=timezone(timedelta(hours=9))),
+        datetime(2023, 5, 14, 11, 0, 0, tzinfo=timezone(-timedelta(hours=3, minutes=30))),
+        datetime(2023, 5, 14, 12, 0, 0),  # "naive" continua naive
+    ]
+    fotos = []
+    for i, data in enumerate(datas):
+        f = Foto(tmp_path / f"{i}.jpg")
+        f.aplicar_metadados(data, None, None)
+        fotos.append(f)
+
+    tabela = TabelaDeFotos.de_fotos(fotos)
+
+    for data, linha in zip(datas, tabela):
+        assert linha.data_de_captura == data
+        assert linha.data_de_captura.utcoffset() == data.utcoffset()
+        assert linha.data_de_captura.replace(tzinfo=None) == data.replace(tzinfo=None)  # mesma hora local
+
+
+def test_u_tabela_duplicados_escolhe_o_mais_antigo_entre_fusos(tmp_path: Path):
+    # 18:00+09:00 (09:00 UTC) é anterior a 10:00+00:00, apesar da hora local maior
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    a.write_bytes(b"igual")
+    b.write_bytes(b"igual")
+    fotos = [Foto(a), Foto(b)]
+    fotos[0].aplicar_metadados(datetime(2023, 5, 14, 10, 0, tzinfo=timezone.utc), None, None)
+    fotos[1].aplicar_metadados(datetime(2023, 5, 14, 18, 0, tzinfo=timezone(timedelta(hours=9))), None, None)
+    tabela = TabelaDeFotos.de_fotos(fotos)
+
+    DetetarDuplicados().detetar(tabela)
+
+    assert [linha.duplicada for linha in tabela] == [True, False]
+
+
+def test_u_tabela_ocupa_muito_menos_que_objetos_foto(tmp_path: Path):
+    n = 5000
+    tabela = TabelaDeFotos.de_fotos(
+        _foto(tmp_path / "2023" / f"{i % 20:02d}" / f"IMG_20230514_{i:06d}.jpg", i) for i in range(n)
+    )
+
+    # ~100 bytes/foto (vs. ~900 bytes de um objeto Foto com Path/datetime/tuple/str)
+    assert tabela.memoria_aproximada() / n < 128
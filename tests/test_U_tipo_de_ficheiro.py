@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import classes.foto as foto_module
+from classes.detetar_duplicados import DetetarDuplicados
+from classes.foto import Foto
+from classes.analisador_de_fotos import AnalisadorDeFotos
+from classes.construtor_de_fotos import ConstrutorDeFotos
+from classes.dimensoes_imagem import ler_dimensoes
+from classes.scanner_de_ficheiros import FicheiroEncontrado, ScannerDeFicheiros
+from classes.tipo_de_ficheiro import (
+    descrever_falha,
+    detetar_formato,
+    detetar_formato_ficheiro,
+    formato_decodificavel,
+)
+
+
+def _bytes_imagem(formato: str) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buf, format=formato)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("formato", ["JPEG", "PNG", "WEBP", "TIFF"])
+def test_u_tipo_reconhece_formatos_do_pillow(formato: str):
+    assert detetar_formato(_bytes_imagem(formato)[:32]) == formato
+
+
+def test_u_tipo_reconhece_heif_e_avif_pela_caixa_ftyp():
+    heic = b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic"
+    avif = b"\x00\x00\x00\x1cftypavif\x00\x00\x00\x00avifmif1miaf"
+    mp4 = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2"
+
+    assert detetar_formato(heic) == "HEIF"
+    assert detetar_formato(avif) == "AVIF"
+    assert detetar_formato(mp4) is None
+
+
+def test_u_tipo_nao_imagem_devolve_none(tmp_path: Path):
+    p = tmp_path / "falso.jpg"
+    p.write_bytes(b"isto e texto")
+
+    assert detetar_formato(b"") is None
+    assert detetar_formato_ficheiro(p) is None
+    assert detetar_formato_ficheiro(tmp_path / "nao_existe.jpg") is None
+
+
+def test_u_tipo_decodificavel():
+    assert formato_decodificavel(None) is True  # não verificado => deixa tentar
+    assert formato_decodificavel("JPEG") is True
+    assert formato_decodificavel("FORMATO_INVENTADO") is False
+
+
+def test_u_scanner_detetar_tipo_usa_conteudo_e_nao_extensao(tmp_path: Path):
+    (tmp_path / "sem_extensao").write_bytes(_bytes_imagem("PNG"))
+    (tmp_path / "foto.JPG").write_bytes(_bytes_imagem("JPEG"))
+    (tmp_path / "falso.jpg").write_bytes(b"nao sou imagem")
+
+    encontrados = ScannerDeFicheiros(max_workers=2, detetar_tipo=True).listar_ficheiros(tmp_path)
+
+    por_nome = {e.caminho.name: e.formato for e in encontrados}
+    assert por_nome == {"sem_extensao": "PNG", "foto.JPG": "JPEG"}
+
+
+def test_u_foto_formato_nao_decodificavel_nao_abre_pillow(tmp_path: Path, monkeypatch):
+    p = tmp_path / "a.heic"
+    p.write_bytes(b"\x00\x00\x00\x18ftypheic")
+
+    chamadas = []
+    monkeypatch.setattr(foto_module.Image, "open", lambda *a, **k: chamadas.append(a) or 1 / 0)
+    monkeypatch.setattr(foto_module, "formato_decodificavel", lambda fmt: fmt != "HEIF")
+
+    foto = Foto(p, formato="HEIF")
+    foto.extrair_metadados()
+
+    assert foto.formato == "HEIF"
+    assert foto.decodificavel is False
+    assert chamadas == []
+    assert foto.data_de_captura is not None  # fallback mtime
+
+    # pHash também não tenta
+    det = DetetarDuplicados()
+    monkeypatch.setattr(det, "_calcular_phash", lambda c: chamadas.append(c))
+    det.detetar_quase_duplicados([foto])
+    assert chamadas == []
+
+
+def test_u_descrever_falha():
+    assert descrever_falha(OSError("image file is truncated")) == "OSError: image file is truncated"
+    assert descrever_falha(ValueError()) == "ValueError"
+
+
+def test_u_foto_falha_do_pillow_fica_registada_e_nao_reabre(tmp_path: Path, monkeypatch):
+    p = tmp_path / "corrompida.jpg"
+    p.write_bytes(b"isto nao e uma imagem")
+    foto = Foto(p)
+
+    foto.extrair_metadados()
+
+    assert foto.decodificavel is False
+    assert foto.falha_descodificacao.startswith("UnidentifiedImageError")
+    assert foto.data_de_captura is not None  # fallback mtime
+
+    # fases seguintes nem tentam abrir
+    aberturas = []
+    monkeypatch.setattr(foto_module.Image, "open", lambda *a, **k: aberturas.append(a))
+    foto.extrair_metadados()
+    det = DetetarDuplicados()
+    monkeypatch.setattr(det, "_calcular_phash", lambda c: aberturas.append(c))
+    det.marcar_quase_duplicados([foto])
+    assert aberturas == []
+
+
+def test_u_foto_so_guarda_a_primeira_falha(tmp_path: Path):
+    foto = Foto(tmp_path / "a.jpg")
+    assert foto.falha_descodificacao is None
+
+    foto.registar_falha_descodificacao("primeira")
+    foto.registar_falha_descodificacao("segunda")
+
+    assert foto.falha_descodificacao == "primeira"
+    assert Foto(tmp_path / "b.heic", formato="FORMATO_INVENTADO").falha_descodificacao.startswith("formato sem suporte")
+
+
+def test_u_phash_falhado_fica_registado(tmp_path: Path):
+    p = tmp_path / "truncada.png"
+    p.write_bytes(_bytes_imagem("PNG")[:40])  # cabeçalho válido, dados cortados
+    foto = Foto(p)
+
+    assert DetetarDuplicados()._phash_de(foto) is None
+    assert foto.decodificavel is False
+    assert foto.falha_descodificacao
+
+
+def test_u_analisador_regista_falha(tmp_path: Path):
+    p = tmp_path / "corrompida.jpg"
+    p.write_bytes(b"\xff\xd8\xff lixo")
+    foto = Foto(p)
+
+    AnalisadorDeFotos().analisar(foto)
+
+    assert foto.hash_conteudo is not None  # o hash não depende do Pillow
+    assert foto.hash_visual is None
+    assert foto.decodificavel is False
+    assert foto.data_de_captura is not None
+
+
+def test_u_falha_da_sondagem_de_dimensoes_segue_para_a_foto(tmp_path: Path):
+    p = tmp_path / "sem_plugin.heic"
+    p.write_bytes(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic" + b"\x00" * 64)
+    falhas = {}
+
+    assert ler_dimensoes(p, falhas) is None
+    assert p in falhas
+
+    fotos = ConstrutorDeFotos().construir([FicheiroEncontrado(p, falha=falhas[p])])
+    assert fotos[0].falha_descodificacao == falhas[p]
+    assert fotos[0].decodificavel is False
+
+
+def test_u_falha_no_worker_volta_para_a_foto(tmp_path: Path):
+    caminhos = []
+    for i in range(3):
+        p = tmp_path / f"{i}.jpg"
+        p.write_bytes(_bytes_imagem("JPEG") if i != 1 else b"lixo")
+        caminhos.append(p)
+
+    fotos = ConstrutorDeFotos(analisador=AnalisadorDeFotos(), workers=2, tamanho_lote=1).construir(caminhos)
+
+    assert [f.decodificavel for f in fotos] == [True, False, True]
+    assert fotos[1].falha_descodificacao.startswith("UnidentifiedImageError")
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from classes.vigia_de_pasta import FonteInotify, FontePolling, VigiaDePasta
+
+
+class FonteFalsa:
+    """Fonte controlada pelo teste: devolve o que estiver em `proximos`."""
+    def __init__(self) -> None:
+        self.proximos: List[Path] = []
+        self.fechada = False
+
+    def ler(self, timeout: Optional[float]) -> List[Path]:
+        saida, self.proximos = self.proximos, []
+        return saida
+
+    def fechar(self) -> None:
+        self.fechada = True
+
+
+class Relogio:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _criar(tmp_path: Path, nomes: List[str]) -> List[Path]:
+    caminhos = []
+    for n in nomes:
+        p = tmp_path / n
+        p.write_bytes(b"x")
+        caminhos.append(p)
+    return caminhos
+
+
+def test_u_vigia_espera_pelo_debounce_antes_de_processar(tmp_path: Path):
+    fonte, relogio, lotes = FonteFalsa(), Relogio(), []
+    vigia = VigiaDePasta(tmp_path, lotes.append, debounce=2.0, fonte=fonte, relogio=relogio)
+
+    (a,) = _criar(tmp_path, ["a.jpg"])
+    fonte.proximos = [a]
+    assert vigia.passo(timeout=0) == 0  # ainda dentro do debounce
+
+    relogio.t = 1.5
+    fonte.proximos = [a]  # nova escrita => reinicia debounce
+    assert vigia.passo(timeout=0) == 0
+
+    relogio.t = 3.0
+    assert vigia.passo(timeout=0) == 0
+
+    relogio.t = 3.6
+    assert vigia.passo(timeout=0) == 1
+    assert lotes == [[a]]
+
+
+def test_u_vigia_divide_em_lotes_e_filtra_extensoes(tmp_path: Path):
+    fonte, relogio, lotes = FonteFalsa(), Relogio(), []
+    vigia = VigiaDePasta(tmp_path, lotes.append, debounce=0.0, tamanho_lote=2, fonte=fonte, relogio=relogio)
+
+    fotos = _criar(tmp_path, ["1.jpg", "2.png", "3.heic", "notas.txt"])
+    fonte.proximos = fotos + [tmp_path / "desapareceu.jpg"]
+
+    assert vigia.passo(timeout=0) == 3
+    assert [len(l) for l in lotes] == [2, 1]
+    assert sorted(p.name for l in lotes for p in l) == ["1.jpg", "2.png", "3.heic"]
+
+
+def test_u_vigia_executar_despacha_pendentes_e_fecha_fonte(tmp_path: Path):
+    fonte, relogio, lotes = FonteFalsa(), Relogio(), []
+    vigia = VigiaDePasta(tmp_path, lotes.append, debounce=60.0, fonte=fonte, relogio=relogio)
+    vigia.adicionar(_criar(tmp_path, ["a.jpg"]))
+
+    parar = threading.Event()
+    parar.set()
+    vigia.executar(parar=parar)
+
+    assert len(lotes) == 1
+    assert fonte.fechada
+
+
+def test_u_polling_so_reporta_ficheiros_estaveis(tmp_path: Path):
+    fonte = FontePolling(tmp_path, intervalo=0.0)
+    p = tmp_path / "a.jpg"
+    p.write_bytes(b"x")
+
+    assert fonte.ler(timeout=0) == []  # 1º poll: visto pela primeira vez
+    assert fonte.ler(timeout=0) == [p]  # 2º poll: igual => estável
+    assert fonte.ler(timeout=0) == []  # não repete
+
+    p.write_bytes(b"xy")  # mudou
+    assert fonte.ler(timeout=0) == []
+    assert fonte.ler(timeout=0) == [p]
+
+
+def test_u_polling_nao_repete_ficheiros_ja_existentes(tmp_path: Path):
+    (a,) = _criar(tmp_path, ["a.jpg"])
+    lotes: List[List[Path]] = []
+    vigia = VigiaDePasta(tmp_path, lotes.append, debounce=0.0, fonte=FontePolling(tmp_path, intervalo=0.0))
+
+    vigia.adicionar_existentes([a])
+    for _ in range(3):
+        vigia.passo(timeout=0)
+    assert lotes == [[a]]
+
+    (b,) = _criar(tmp_path, ["b.jpg"])  # chega depois: reportado quando estável
+    for _ in range(3):
+        vigia.passo(timeout=0)
+    assert lotes == [[a], [b]]
+
+
+def test_u_vigia_filtro_substitui_as_extensoes(tmp_path: Path):
+    fonte, relogio, lotes = FonteFalsa(), Relogio(), []
+    vigia = VigiaDePasta(
+        tmp_path, lotes.append, debounce=0.0, fonte=fonte, relogio=relogio,
+        filtro=lambda p: p.name.startswith("IMG_"),
+    )
+
+    fonte.proximos = _criar(tmp_path, ["IMG_1.jpg", "DSC_2.jpg"])
+
+    assert vigia.passo(timeout=0) == 1
+    assert lotes == [[tmp_path / "IMG_1.jpg"]]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify só existe em Linux")
+def test_u_inotify_reporta_ficheiro_fechado_e_pastas_novas(tmp_path: Path):
+    try:
+        fonte = FonteInotify(tmp_path)
+    except OSError:
+        pytest.skip("inotify indisponível neste ambiente")
+
+    try:
+        (tmp_path / "a.jpg").write_bytes(b"x")
+        sub = tmp_path / "sub"
+        sub.mkdir()
+
+        vistos = set()
+        for _ in range(5):
+            vistos.update(fonte.ler(timeout=0.5))
+            if tmp_path / "a.jpg" in vistos:
+                break
+        assert tmp_path / "a.jpg" in vistos
+
+        # a pasta nova passou a ser vigiada
+        (sub / "b.jpg").write_bytes(b"y")
+        for _ in range(5):
+            vistos.update(fonte.ler(timeout=0.5))
+            if sub / "b.jpg" in vistos:
+                break
+        assert sub / "b.jpg" in vistos
+    finally:
+        fonte.fechar()